@@ -1,14 +1,46 @@
 import tkinter as tk
+import argparse
 import random
 import os
-from PIL import Image, ImageTk  # You need to install Pillow library
-import pygame  # Import the pygame library
+import sys
+import time
+from animation import Animator
+from rps_engine import Match, MOVES, STARTING_HP, BACKGROUND, INTENSE, SUPERINTENSE, GAMEOVER, determine_winner, get_random_move
+from round_state import RoundMachine, BUFFER, INPUT_POLICIES
+from replay import GAME_RPS, NEW_GAME, INPUT, CPU, RESULT, Replay, ReplayWriter, ScriptedPlayer, session_seed, seed_arg, verify
+# Pillow (via sprite_cache/sprite_atlas) and pygame (via audio) are imported inside main() so their cost shows up per phase
+
+# Decoded character sprites are shared between rounds; raise the budget on machines with more memory.
+# This is for the default sprite size, the cache scales it with the sprite area at other sizes.
+SPRITE_CACHE_BUDGET = 64 * 1024 * 1024
+sprite_cache = None  # Created once Pillow is imported
+
+# Sprite size follows the window: each character may take this share of its width and height
+SPRITE_WIDTH_SHARE = 0.4
+SPRITE_HEIGHT_SHARE = 0.5
+RESIZE_SETTLE_MS = 150  # Wait for <Configure> events to stop before switching sprite levels
+layout_scale = 1.0  # Icon canvas and animation distances relative to the original 80 px icons
+resize_job = None
+
+# Music tracks, from calmest to most intense; the bank only ever escalates within a game
+MUSIC_TRACKS = [
+    (BACKGROUND, "music/background.mp3"),
+    (INTENSE, "music/intense.mp3"),
+    (SUPERINTENSE, "music/superintense.mp3"),
+    (GAMEOVER, "music/gameover.mp3"),
+]
+music = None  # Created after the window first paints; until then the music functions do nothing
 
-# Track if intense music has started
-intense_music_started = False
+# The session's RNGs, seeded in main(). Outcomes (the CPU's moves) get their own stream so that which sprites
+# and phrases happen to be picked can never change them, e.g. on a machine with different image folders.
+rng = random.Random()
+cosmetic_rng = random.Random()
+recorder = None  # ReplayWriter for --record, or None
+cpu = None  # AdaptiveOpponent for --cpu adaptive (a ScriptedPlayer when replaying one); None picks uniformly
+cpu_profile = None  # Where the adaptive CPU's tables are saved
 
-# Track if super intense music has started
-superintense_music_started = False
+rounds = None  # RoundMachine every key press and click goes through, created in main()
+rounds_played = 0  # Rounds actually applied to the match, to check the machine never skips or doubles one
 
 # Define winning and losing phrases
 winning_phrases = [
@@ -25,59 +57,61 @@ losing_phrases = [
 ]
 
 class Character:
-    def __init__(self, name, hp, img_prefix):
+    def __init__(self, name, side, img_prefix):
         self.name = name
-        self.hp = hp
+        self.side = side  # Index of this character in the match state
         self.img_prefix = img_prefix
         self.image_label = None
-        self.wins = 0
         self.last_image_path = None  # Store the last selected image path
+        self.shown = None  # (hp, file) of the image on screen
+
+    # HP and wins live in the headless match state so the rules can run without a display
+    @property
+    def hp(self):
+        return match.hp[self.side]
+
+    @property
+    def wins(self):
+        return match.wins[self.side]
 
     def get_image(self):
-        try:
-            folder_path = f"images/{self.img_prefix}_{self.hp}"
-            images = [os.path.join(folder_path, file) for file in os.listdir(folder_path) if file.endswith(".png")]
-            if self.last_image_path:
-                images = [img for img in images if img != self.last_image_path]  # Exclude the last selected image
-            if images:
-                image_path = random.choice(images)
-                self.last_image_path = image_path  # Store the new selected image path
-                image = Image.open(image_path)
-                max_size = (375, 375)  # Increase the maximum size to 375x375 pixels
-                image.thumbnail(max_size, Image.LANCZOS)
-                return ImageTk.PhotoImage(image)
-            else:
-                print(f"No images found in {folder_path}")
-                return None
-        except FileNotFoundError:
+        folder_path = sprite_cache.folder_path(self.img_prefix, self.hp)
+        files = sprite_cache.list_files(self.img_prefix, self.hp)
+        if files is None:
             print(f"Folder {folder_path} not found")
             return None
+        images = [os.path.join(folder_path, file) for file in files]
+        if self.last_image_path:
+            images = [img for img in images if img != self.last_image_path]  # Exclude the last selected image
+        if images:
+            image_path = cosmetic_rng.choice(images)
+            self.last_image_path = image_path  # Store the new selected image path
+            self.shown = (self.hp, os.path.basename(image_path))
+            return sprite_cache.get(self.img_prefix, *self.shown)
+        else:
+            print(f"No images found in {folder_path}")
+            return None
+
+    def current_image(self):
+        # The image already on screen, at the cache's current size
+        return sprite_cache.get(self.img_prefix, *self.shown) if self.shown else None
 
 def init_characters(reset_wins=False):
-    global loli1, loli2, intense_music_started, superintense_music_started
-    if reset_wins or loli1 is None or loli2 is None:
-        loli1 = Character("Loli 1", 4, "loli1")
-        loli2 = Character("Loli 2", 4, "loli2")
+    global loli1, loli2, match
+    reset = reset_wins or loli1 is None or loli2 is None
+    if reset:
+        match = Match(STARTING_HP)
+        loli1 = Character("Loli 1", 0, "loli1")
+        loli2 = Character("Loli 2", 1, "loli2")
     else:
-        loli1.hp = 4
-        loli2.hp = 4
-    intense_music_started = False  # Reset intense music flag
-    superintense_music_started = False  # Reset super intense music flag
+        match.new_game()
+    if recorder:
+        recorder.event(NEW_GAME, reset)
+    if rounds:
+        rounds.reset()
     update_gui(reset=True)
     play_background_music()  # Play the background music when characters are initialized
 
-def get_random_move():
-    moves = ["rock", "paper", "scissors"]
-    return random.choice(moves)
-
-def determine_winner(move1, move2):
-    if move1 == move2:
-        return None
-    elif (move1 == "rock" and move2 == "scissors") or (move1 == "scissors" and move2 == "paper") or (move1 == "paper" and move2 == "rock"):
-        return 1
-    else:
-        return 2
-
 def update_gui(reset=False):
     # Get a new random image for each character
     loli1_image = loli1.get_image()
@@ -105,49 +139,42 @@ def update_gui(reset=False):
         canvas.delete("all")
         enable_buttons()
 
+def prefetch_sprites():
+    for character in (loli1, loli2):
+        sprite_cache.prefetch(root, character.img_prefix, character.hp)
+
 def animate_icons(player_move, opponent_move, callback):
     # Display the chosen icons over each character
     player_icon = move_icons[player_move]
     opponent_icon = move_icons[opponent_move]
 
     # Adjust the initial y-coordinate to move the icons higher up
-    player_icon_item = canvas.create_image(150, 70, image=player_icon)
-    opponent_icon_item = canvas.create_image(450, 70, image=opponent_icon)
+    s = layout_scale  # Positions and distances are for 80 px icons on a 600x125 canvas
+    player_icon_item = canvas.create_image(150 * s, 70 * s, image=player_icon)
+    opponent_icon_item = canvas.create_image(450 * s, 70 * s, image=opponent_icon)
 
     winner = determine_winner(player_move, opponent_move)
 
+    def finish():
+        canvas.delete(player_icon_item, opponent_icon_item)  # Remove icons after the animation
+        callback()
+
     def move_winner():
         if winner == 1:
             canvas.tag_raise(player_icon_item, opponent_icon_item)  # Bring the winner icon to the front
-            for _ in range(30):
-                canvas.move(player_icon_item, 10, 0)
-                canvas.update()
-                canvas.after(15)
-            canvas.after(500, callback)
+            animator.move(canvas, player_icon_item, 300 * s, 0, 450, on_done=lambda: animator.wait(500, finish))
         elif winner == 2:
             canvas.tag_raise(opponent_icon_item, player_icon_item)  # Bring the winner icon to the front
-            for _ in range(30):
-                canvas.move(opponent_icon_item, -10, 0)
-                canvas.update()
-                canvas.after(15)
-            canvas.after(500, callback)
+            animator.move(canvas, opponent_icon_item, -300 * s, 0, 450, on_done=lambda: animator.wait(500, finish))
         else:
-            # Move closer to each other
-            for _ in range(17):  # Adjust this value to get them closer without crossing
-                canvas.move(player_icon_item, 7, 0)
-                canvas.move(opponent_icon_item, -7, 0)
-                canvas.update()
-                canvas.after(15)
-            # Bounce back
-            for _ in range(15):
-                canvas.move(player_icon_item, -5, 0)
-                canvas.move(opponent_icon_item, 5, 0)
-                canvas.update()
-                canvas.after(15)
-            canvas.after(500, callback)
-
-    canvas.after(500, move_winner)
-    canvas.after(1500, lambda: canvas.delete("all"))  # Remove icons after the animation
+            # Move closer to each other without crossing, then bounce back
+            def bounce_back():
+                animator.move(canvas, player_icon_item, -75 * s, 0, 225)
+                animator.move(canvas, opponent_icon_item, 75 * s, 0, 225, on_done=lambda: animator.wait(500, finish))
+            animator.move(canvas, player_icon_item, 119 * s, 0, 255)
+            animator.move(canvas, opponent_icon_item, -119 * s, 0, 255, on_done=bounce_back)
+
+    animator.wait(500, move_winner)
 
 def disable_buttons():
     root.unbind("<Left>")
@@ -170,156 +197,366 @@ def enable_buttons():
     root.unbind("<space>")  # Unbind the space bar to prevent starting a new game mid-game
 
 def play_background_music():
-    pygame.mixer.music.load("music/background.mp3")  # Load the background music file
-    pygame.mixer.music.play(-1)  # Play the background music in a loop
-
-def play_intense_music():
-    global intense_music_started
-    if not intense_music_started:
-        pygame.mixer.music.load("music/intense.mp3")  # Load the intense music file
-        pygame.mixer.music.play(-1)  # Play the intense music in a loop
-        intense_music_started = True
-
-def play_superintense_music():
-    global superintense_music_started
-    if not superintense_music_started:
-        pygame.mixer.music.load("music/superintense.mp3")  # Load the superintense music file
-        pygame.mixer.music.play(-1)  # Play the superintense music in a loop
-        superintense_music_started = True
+    if music:
+        music.play(BACKGROUND)  # Play the background music in a loop
+
+def play_tier_music(tier):
+    if music:
+        music.escalate(tier)  # Play the intense/superintense music in a loop, unless something more intense is on
+
+def play_gameover_music():
+    if music:
+        music.play(GAMEOVER, loops=0)  # Play the game over music once
+
+def queue_move(player_choice):
+    rounds.submit(player_choice)  # Starts the round now if idle, otherwise buffers it per the input policy
 
 def player_move(player_choice):
-    global intense_music_started, superintense_music_started
+    # Only ever called by the round machine, once the previous round has fully resolved
+    global rounds_played
+    if match.over:
+        rounds.done(game_over=True)  # A late key press after the final round: release the machine all the same
+        return
     move1 = player_choice
-    move2 = get_random_move()
+    move2 = cpu.choose() if cpu else get_random_move(rng)
 
     round_result = f"{loli1.name} chooses {move1}, {loli2.name} chooses {move2}"
 
-    winner = determine_winner(move1, move2)
+    winner = match.play_round(move1, move2)
+    rounds_played += 1
+    if cpu:
+        cpu.observe(move1, move2)
+        if match.over and cpu_profile:
+            cpu.save(cpu_profile)
+    if recorder:
+        recorder.event(INPUT, MOVES.index(move1))
+        recorder.event(CPU, MOVES.index(move2))
+        recorder.event(RESULT, winner or 0, match.winner or 0)
+        if match.over:
+            recorder.flush()
     if winner == 1:
-        loli2.hp -= 1
         round_result += f"\n{loli2.name} loses 1 HP! Remaining HP: {loli2.hp}"
-        round_result += f"\nCPU: {random.choice(losing_phrases)}"
+        round_result += f"\nCPU: {cosmetic_rng.choice(losing_phrases)}"
     elif winner == 2:
-        loli1.hp -= 1
         round_result += f"\n{loli1.name} loses 1 HP! Remaining HP: {loli1.hp}"
-        round_result += f"\nCPU: {random.choice(winning_phrases)}"
+        round_result += f"\nCPU: {cosmetic_rng.choice(winning_phrases)}"
     else:
         round_result += "\nIt's a tie! No HP lost."
 
+    prefetch_sprites()  # Decode the new HP tiers while the icons animate
+
     def show_results():
+        rounds.resolving()
         result_label.config(text=round_result)
-        if (loli1.hp == 1 or loli2.hp == 1) and not intense_music_started:
-            play_intense_music()  # Play intense music if either character is down to 1 hit point
-        if loli1.hp == 1 and loli2.hp == 1 and not superintense_music_started:
-            play_superintense_music()  # Play superintense music if both characters are down to 1 hit point
+        tier = match.music_tier()
+        if tier in (INTENSE, SUPERINTENSE):
+            play_tier_music(tier)  # Intense once either character is down to 1 hit point, superintense once both are
 
         if loli1.hp == 0:
-            pygame.mixer.music.load("music/gameover.mp3")  # Load the game over music
-            pygame.mixer.music.play()  # Play the game over music once
-            loli2.wins += 1  # Increment Loli 2's win count
+            play_gameover_music()
             update_gui()  # Update GUI to show the new win count
             result_label.config(text=round_result + f"\n{loli1.name} has been defeated! {loli2.name} wins the game!")
             disable_buttons()
         elif loli2.hp == 0:
-            pygame.mixer.music.load("music/gameover.mp3")  # Load the game over music
-            pygame.mixer.music.play()  # Play the game over music once
-            loli1.wins += 1  # Increment Loli 1's win count
+            play_gameover_music()
             update_gui()  # Update GUI to show the new win count
             result_label.config(text=round_result + f"\n{loli2.name} has been defeated! {loli1.name} wins the game!")
             disable_buttons()
         update_gui()  # Always update the GUI at the end of a round
+        rounds.done(match.over)  # May start the next buffered round right away
 
     animate_icons(move1, move2, show_results)
+    rounds.feedback()  # The icons are on the canvas
 
 def select_rock(event):
-    player_move("rock")
+    queue_move("rock")
 
 def select_paper(event):
-    player_move("paper")
+    queue_move("paper")
 
 def select_scissors(event):
-    player_move("scissors")
+    queue_move("scissors")
 
 def start_new_game(event):
     init_characters(reset_wins=False)
 
-# Initialize pygame
-pygame.init()
-
-# Create the main window
-root = tk.Tk()
-root.title("Rock, Paper, Scissors - Battle")
-root.attributes('-fullscreen', True)  # Set full screen mode
-
-# Add key bindings
-root.bind("<Left>", select_rock)
-root.bind("<Down>", select_paper)
-root.bind("<Right>", select_scissors)
-
-# Create and place widgets for the characters and their hit points
-frame = tk.Frame(root)
-frame.pack()
-
-loli1_win_label = tk.Label(frame, text="Wins: 0", font=("Helvetica", 14))
-loli1_win_label.grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)  # Adjust position of Loli 1's win label
+class StartupProfile:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []  # (name, seconds)
+
+    def mark(self, name):
+        # Close the phase that started at the previous mark
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self, title):
+        if not self.enabled:
+            return
+        print(f"Startup profile ({title}):")
+        for name, seconds in self.phases:
+            print(f"  {name:<16} {seconds * 1000:8.1f} ms")
+        print(f"  {'total':<16} {(self.last - self.start) * 1000:8.1f} ms")
+
+def build_window():
+    global root, frame, canvas, animator, result_label, button_frame, play_again_button
+    global loli1_win_label, loli1_image_label, loli1_hp_label, loli2_image_label, loli2_hp_label, loli2_win_label
+    global rock_button, paper_button, scissors_button
+
+    # Create the main window
+    root = tk.Tk()
+    root.title("Rock, Paper, Scissors - Battle")
+    root.attributes('-fullscreen', True)  # Set full screen mode
+
+    # Add key bindings
+    root.bind("<Left>", select_rock)
+    root.bind("<Down>", select_paper)
+    root.bind("<Right>", select_scissors)
 
-loli1_image_label = tk.Label(frame, image=None)
-loli1_image_label.grid(row=0, column=1, padx=5, pady=5)  # Use grid layout and reduce padding
+    # Create and place widgets for the characters and their hit points
+    frame = tk.Frame(root)
+    frame.pack()
 
-loli1_hp_label = tk.Label(frame, text="", font=("Helvetica", 14))
-loli1_hp_label.grid(row=1, column=1, padx=5, pady=0)  # Use grid layout and reduce padding
+    loli1_win_label = tk.Label(frame, text="Wins: 0", font=("Helvetica", 14))
+    loli1_win_label.grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)  # Adjust position of Loli 1's win label
 
-loli2_image_label = tk.Label(frame, image=None)
-loli2_image_label.grid(row=0, column=2, padx=5, pady=5)  # Use grid layout and reduce padding
+    loli1_image_label = tk.Label(frame, image=None)
+    loli1_image_label.grid(row=0, column=1, padx=5, pady=5)  # Use grid layout and reduce padding
 
-loli2_hp_label = tk.Label(frame, text="", font=("Helvetica", 14))
-loli2_hp_label.grid(row=1, column=2, padx=5, pady=0)  # Use grid layout and reduce padding
+    loli1_hp_label = tk.Label(frame, text="", font=("Helvetica", 14))
+    loli1_hp_label.grid(row=1, column=1, padx=5, pady=0)  # Use grid layout and reduce padding
 
-loli2_win_label = tk.Label(frame, text="Wins: 0", font=("Helvetica", 14))
-loli2_win_label.grid(row=0, column=3, padx=5, pady=5, sticky=tk.E)  # Adjust position of Loli 2's win label
+    loli2_image_label = tk.Label(frame, image=None)
+    loli2_image_label.grid(row=0, column=2, padx=5, pady=5)  # Use grid layout and reduce padding
 
-# Create a canvas for animations
-canvas = tk.Canvas(root, width=600, height=125)
-canvas.pack()
+    loli2_hp_label = tk.Label(frame, text="", font=("Helvetica", 14))
+    loli2_hp_label.grid(row=1, column=2, padx=5, pady=0)  # Use grid layout and reduce padding
 
-# Create and place widgets for the result
-result_label = tk.Label(root, text="Make your move!", font=("Helvetica", 14))
-result_label.pack(pady=0)  # Move up by removing padding
+    loli2_win_label = tk.Label(frame, text="Wins: 0", font=("Helvetica", 14))
+    loli2_win_label.grid(row=0, column=3, padx=5, pady=5, sticky=tk.E)  # Adjust position of Loli 2's win label
 
-# Create and place buttons for player choices using images
-button_frame = tk.Frame(root)
-button_frame.pack(pady=0)  # Move up by removing padding
+    # Create a canvas for animations
+    canvas = tk.Canvas(root, width=600, height=125)
+    canvas.pack()
+    animator = Animator(canvas)  # Drives the icon animations from after() callbacks
 
-# Load images for rock, paper, scissors
-rock_image = ImageTk.PhotoImage(Image.open("images/rock.png").resize((80, 80), Image.LANCZOS))
-paper_image = ImageTk.PhotoImage(Image.open("images/paper.png").resize((80, 80), Image.LANCZOS))
-scissors_image = ImageTk.PhotoImage(Image.open("images/scissors.png").resize((80, 80), Image.LANCZOS))
+    # Create and place widgets for the result
+    result_label = tk.Label(root, text="Make your move!", font=("Helvetica", 14))
+    result_label.pack(pady=0)  # Move up by removing padding
 
-# Store icons in a dictionary for easy access
-move_icons = {
-    "rock": rock_image,
-    "paper": paper_image,
-    "scissors": scissors_image
-}
+    # Create and place buttons for player choices; their images are set once the icons are decoded
+    button_frame = tk.Frame(root)
+    button_frame.pack(pady=0)  # Move up by removing padding
 
-rock_button = tk.Button(button_frame, image=rock_image, command=lambda: player_move("rock"))
-rock_button.grid(row=0, column=0, padx=5)  # Use grid layout and reduce padding
+    rock_button = tk.Button(button_frame, command=lambda: queue_move("rock"))
+    rock_button.grid(row=0, column=0, padx=5)  # Use grid layout and reduce padding
 
-paper_button = tk.Button(button_frame, image=paper_image, command=lambda: player_move("paper"))
-paper_button.grid(row=0, column=1, padx=5)  # Use grid layout and reduce padding
+    paper_button = tk.Button(button_frame, command=lambda: queue_move("paper"))
+    paper_button.grid(row=0, column=1, padx=5)  # Use grid layout and reduce padding
 
-scissors_button = tk.Button(button_frame, image=scissors_image, command=lambda: player_move("scissors"))
-scissors_button.grid(row=0, column=2, padx=5)  # Use grid layout and reduce padding
+    scissors_button = tk.Button(button_frame, command=lambda: queue_move("scissors"))
+    scissors_button.grid(row=0, column=2, padx=5)  # Use grid layout and reduce padding
 
-# Create and place the "Play Again" button
-play_again_button = tk.Button(root, text="Play Again", command=lambda: init_characters(reset_wins=False), font=("Helvetica", 14))
-play_again_button.pack(pady=0)  # Move up by removing padding
-play_again_button.pack_forget()  # Hide the "Play Again" button initially
+    # Create and place the "Play Again" button
+    play_again_button = tk.Button(root, text="Play Again", command=lambda: init_characters(reset_wins=False), font=("Helvetica", 14))
+    play_again_button.pack(pady=0)  # Move up by removing padding
+    play_again_button.pack_forget()  # Hide the "Play Again" button initially
 
-# Initialize characters and update GUI
+def load_assets():
+    # Everything the first frame needs: the atlas (if fresh), the move icons and the starting sprites
+    global sprite_cache
+    from sprite_atlas import SpriteAtlas
+    from sprite_cache import SpriteCache
+    level = sprite_level_for(root.winfo_screenwidth(), root.winfo_screenheight())  # Fullscreen: the window is the screen
+    sprite_cache = SpriteCache(budget_bytes=SPRITE_CACHE_BUDGET, atlas=SpriteAtlas.open_if_fresh(), level=level)  # No atlas -> loose folders
+    sprite_cache.on_tier_ready = refresh_tier
+    show_move_icons(level)
+
+    # Initialize characters and update GUI
+    init_characters()
+    root.bind("<Configure>", window_resized)
+
+def sprite_level_for(width, height):
+    from sprite_cache import nearest_level
+    return nearest_level(min(width * SPRITE_WIDTH_SHARE, height * SPRITE_HEIGHT_SHARE))
+
+def show_move_icons(level):
+    # Load images for rock, paper, scissors and store them in a dictionary for easy access
+    global move_icons, layout_scale
+    from sprite_cache import ICON_LEVELS, DEFAULT_LEVEL
+    move_icons = {move: sprite_cache.load_icon(move) for move in ("rock", "paper", "scissors")}
+    rock_button.config(image=move_icons["rock"])
+    paper_button.config(image=move_icons["paper"])
+    scissors_button.config(image=move_icons["scissors"])
+    layout_scale = ICON_LEVELS[level] / ICON_LEVELS[DEFAULT_LEVEL]
+    canvas.config(width=round(600 * layout_scale), height=round(125 * layout_scale))
+
+def window_resized(event):
+    # <Configure> fires for every widget and many times during a resize; act once the root has settled
+    global resize_job
+    if event.widget is not root:
+        return
+    if resize_job:
+        root.after_cancel(resize_job)
+    resize_job = root.after(RESIZE_SETTLE_MS, apply_window_size)
+
+def apply_window_size():
+    global resize_job
+    resize_job = None
+    level = sprite_level_for(root.winfo_width(), root.winfo_height())
+    # Builds just this level on the worker; until it is ready the labels keep the images they have
+    sprite_cache.set_level(root, level, [(c.img_prefix, c.hp) for c in (loli1, loli2)], on_ready=show_level)
+
+def show_level(level):
+    # Everything for the new size is decoded by now, so this only swaps images
+    show_move_icons(level)
+    for character, label in ((loli1, loli1_image_label), (loli2, loli2_image_label)):
+        show_current_image(character, label)
+
+def refresh_tier(prefix, hp):
+    # A sprite shown at a stand-in size has now been built at the right one; swap it in
+    for character, label in ((loli1, loli1_image_label), (loli2, loli2_image_label)):
+        if character.img_prefix == prefix and character.shown and character.shown[0] == hp:
+            show_current_image(character, label)
+
+def show_current_image(character, label):
+    image = character.current_image()
+    if image:
+        label.config(image=image)
+        label.image = image  # Keep a reference
+
+def load_audio():
+    global music
+    import pygame  # Import the pygame library
+    from audio import AudioBank
+    pygame.mixer.init()  # Only the mixer is used, so skip initialising the rest of pygame
+    music = AudioBank(MUSIC_TRACKS)
+    music.preload()  # Decode all music tracks on a background thread so switching never hits the disk
+    play_background_music()
+
+def load_deferred(profile):
+    # Runs once the first frame is on screen: audio and the sprites of the next HP tier
+    load_audio()
+    for character in (loli1, loli2):
+        sprite_cache.prefetch(root, character.img_prefix, character.hp - 1)
+    profile.mark("audio")
+    profile.report("deferred assets queued")
+    if profile.enabled:
+        report_background_loads(profile.start)
+
+def report_background_loads(start):
+    if music.loading():
+        root.after(100, report_background_loads, start)
+        return
+    stats = music.stats()
+    print(f"  music decoded in background: {sum(stats['load_ms'].values()):.1f} ms "
+          f"(done {(time.perf_counter() - start) * 1000:.1f} ms after start)")
+
+def schedule_replay(path):
+    # Re-inject the recorded inputs at their recorded times; the seeded RNG makes the CPU answer the same way
+    replay = Replay(path)
+    for ms, kind, a in replay.inputs()[1:]:  # The first NEW_GAME is the one load_assets() already started
+        if kind == INPUT:
+            root.after(ms, queue_move, MOVES[a])
+        else:
+            root.after(ms, init_characters, bool(a))
+
+def main(argv=None):
+    global recorder, rounds, cpu, cpu_profile
+    parser = argparse.ArgumentParser(description="Rock, Paper, Scissors - Battle")
+    parser.add_argument("--profile-startup", action="store_true", help="print a per-phase startup timing breakdown")
+    parser.add_argument("--seed", type=seed_arg, help="seed for the CPU's moves (default: random, printed at startup)")
+    parser.add_argument("--cpu", choices=["random", "adaptive"], default="random", help="random moves, or learn to predict the player's")
+    parser.add_argument("--player", default="default", help="profile the adaptive CPU loads and saves what it learned under")
+    parser.add_argument("--record", metavar="LOG", help="write a replay log of this session")
+    parser.add_argument("--replay", metavar="LOG", help="re-execute a replay log headlessly and check its outcomes")
+    parser.add_argument("--realtime", action="store_true", help="with --replay, play the log back in the window at the recorded pace")
+    parser.add_argument("--input-policy", choices=INPUT_POLICIES, default=BUFFER, help="what to do with key presses during a round")
+    parser.add_argument("--input-queue", type=int, default=2, help="presses kept by the buffer policy")
+    parser.add_argument("--input-stats", action="store_true", help="print input latency and round accounting on exit")
+    parser.add_argument("--profile-log", metavar="FILE", help="append per-second handler timing histograms to FILE as JSON lines")
+    parser.add_argument("--profile-overlay", action="store_true", help="show the slowest handlers in an overlay")
+    args = parser.parse_args(argv)
+    if args.input_queue < 1:
+        parser.error("--input-queue must be at least 1")
+    if args.replay and not args.realtime:
+        raise SystemExit(0 if verify(args.replay) else 1)
+
+    replay = Replay(args.replay) if args.replay else None
+    seed = replay.seed if replay else session_seed(args.seed)
+    print(f"Session seed: {seed}")
+    rng.seed(seed)
+    cosmetic_rng.seed(seed + 1)
+    if replay and replay.cpu == "adaptive":
+        cpu = ScriptedPlayer(MOVES[a] for a in replay.cpu_moves())  # Its moves depended on the profile it started from
+    elif args.cpu == "adaptive" and not replay:
+        from rps_opponent import AdaptiveOpponent, profile_path
+        try:
+            cpu_profile = profile_path(args.player)
+        except ValueError as e:
+            parser.error(str(e))
+        cpu = AdaptiveOpponent.load(cpu_profile, rng)
+        print(f"Adaptive CPU for {args.player}: {cpu.rounds} rounds of history")
+    if args.record:
+        recorder = ReplayWriter(args.record, GAME_RPS, seed, args.cpu)
+    rounds = RoundMachine(player_move, args.input_policy, args.input_queue)
+    profile = StartupProfile(args.profile_startup)
+
+    import sprite_atlas  # Pulls in Pillow, the slowest import on the kiosks
+    profile.mark("imports")
+    profiler = start_profiler(args) if args.profile_log or args.profile_overlay else None
+    build_window()
+    if profiler:
+        profiler.track_animator(animator)
+        profiler.install(root)
+    profile.mark("tk")
+    load_assets()
+    profile.mark("asset decode")
+    root.update()  # Map the window and paint the first frame before loading anything non-critical
+    profile.mark("first frame")
+    profile.report("first interactive frame")
+
+    root.after(0, load_deferred, profile)
+    if args.replay:
+        schedule_replay(args.replay)
+    # Start the Tkinter event loop
+    try:
+        root.mainloop()
+    finally:
+        if recorder:
+            recorder.close()
+        if cpu_profile:
+            cpu.save(cpu_profile)
+        if args.input_stats:
+            report_input_stats()
+        if profiler:
+            profiler.close()
+
+def start_profiler(args):
+    from profiling import Profiler
+    profiler = Profiler(args.profile_log, args.profile_overlay)
+    profiler.instrument(sys.modules[__name__], "update_gui", "animate_icons", "play_background_music",
+                        "play_tier_music", "play_gameover_music", prefix="LoliRPS")
+    profiler.instrument(Character, "get_image")
+    profiler.hook()  # Before build_window, so the move and Play Again buttons are timed too
+    return profiler
+
+def report_input_stats():
+    stats = rounds.stats()
+    print(f"Input ({stats['policy']}): {stats['submitted']} presses, {stats['started']} rounds started, "
+          f"{stats['resolved']} resolved, {stats['dropped']} dropped, {stats['pending']} pending")
+    print(f"  press -> icons:  p50 {stats['feedback']['p50_ms']} ms, p95 {stats['feedback']['p95_ms']} ms, max {stats['feedback']['max_ms']} ms")
+    print(f"  press -> result: p50 {stats['result']['p50_ms']} ms, p95 {stats['result']['p95_ms']} ms, max {stats['result']['max_ms']} ms")
+    consistent = stats["consistent"] and rounds_played == stats["started"]
+    print(f"  {rounds_played} rounds applied: {'no dropped or doubled rounds' if consistent else 'ACCOUNTING MISMATCH'}")
+
+root = None
 loli1 = None
 loli2 = None
-init_characters()
+match = None
 
-# Start the Tkinter event loop
-root.mainloop()
+if __name__ == "__main__":
+    main()
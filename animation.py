@@ -0,0 +1,87 @@
+"""Small after()-driven tween scheduler for canvas animations."""
+import time
+
+FRAME_MS = 16  # Target frame interval, roughly 60 fps
+
+
+class Tween:
+    def __init__(self, start, duration, step, on_done):
+        self.start = start  # Monotonic time in seconds at which the tween begins
+        self.duration = duration
+        self.step = step  # Called with progress in [0, 1] on every frame
+        self.on_done = on_done
+        self.cancelled = False
+
+
+class Animator:
+    def __init__(self, widget, frame_ms=FRAME_MS):
+        self.widget = widget  # Any Tk widget, only used for after()
+        self.frame_ms = frame_ms
+        self.tweens = []
+        self.frames = 0
+        self.dropped_frames = 0
+        self._after_id = None
+        self._last_tick = None
+
+    def add(self, duration_ms, step=None, on_done=None, delay_ms=0):
+        tween = Tween(time.monotonic() + delay_ms / 1000, duration_ms / 1000, step, on_done)
+        self.tweens.append(tween)
+        if self._after_id is None:
+            self._last_tick = time.monotonic()
+            self._after_id = self.widget.after(self.frame_ms, self._tick)
+        return tween
+
+    def wait(self, delay_ms, on_done):
+        # A tween with no body, used to sequence callbacks on the same clock as the motion
+        return self.add(0, None, on_done, delay_ms)
+
+    def move(self, canvas, item, dx, dy, duration_ms, on_done=None, delay_ms=0):
+        applied = [0.0, 0.0]  # Offset already applied to the item, so every frame moves by the remainder
+
+        def step(progress):
+            target_x, target_y = dx * progress, dy * progress
+            canvas.move(item, target_x - applied[0], target_y - applied[1])
+            applied[0], applied[1] = target_x, target_y
+
+        return self.add(duration_ms, step, on_done, delay_ms)
+
+    def cancel(self, tween):
+        tween.cancelled = True
+
+    def cancel_all(self):
+        for tween in self.tweens:
+            tween.cancelled = True
+        self.tweens = []
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        now = time.monotonic()
+        # Interpolation is time based, so a late tick simply skips the frames we missed
+        late_frames = int((now - self._last_tick) * 1000 / self.frame_ms) - 1
+        if late_frames > 0:
+            self.dropped_frames += late_frames
+        self._last_tick = now
+        self.frames += 1
+
+        finished = []
+        for tween in list(self.tweens):
+            if tween.cancelled or now < tween.start:
+                continue
+            progress = 1.0 if tween.duration <= 0 else min(1.0, (now - tween.start) / tween.duration)
+            if tween.step:
+                tween.step(progress)
+            if progress >= 1.0:
+                finished.append(tween)
+        self.tweens = [tween for tween in self.tweens if not tween.cancelled and tween not in finished]
+
+        # Completion callbacks may start new tweens, which then join the next frame
+        for tween in finished:
+            if tween.on_done:
+                tween.on_done()
+
+        if self.tweens:
+            self._after_id = self.widget.after(self.frame_ms, self._tick)
+        else:
+            self._after_id = None
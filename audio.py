@@ -0,0 +1,124 @@
+"""Preloaded music bank that crossfades between tracks on reserved mixer channels.
+
+play() never touches the disk: a track that is not decoded yet when it is asked for is moved to the front of
+the preload thread's queue, and that thread starts it on the channel as soon as it is ready.
+"""
+import threading
+import time
+
+import pygame  # Import the pygame library
+
+CROSSFADE_MS = 600  # Length of the fade between two tracks
+
+
+class AudioBank:
+    def __init__(self, tracks, crossfade_ms=CROSSFADE_MS):
+        # tracks is an ordered list of (name, path); the order doubles as the intensity ranking used by escalate()
+        self.paths = dict(tracks)
+        self.ranks = {name: rank for rank, (name, _) in enumerate(tracks)}
+        self.crossfade_ms = crossfade_ms
+        self.sounds = {}  # Only ever gains entries, so play() reads it without locking
+        self.load_times = {}  # name -> seconds spent decoding the track
+        self.switch_times = []  # seconds spent inside each play() call
+        self.current = None
+        self._locks = {name: threading.Lock() for name in self.paths}  # Held only while that track decodes
+        self._loader = None
+        self._channels = None
+        self._active = 0  # Index of the channel currently playing
+        self._switch_lock = threading.Lock()  # Channel switches, from play() or the preload thread; never held long
+        self._wanted = None  # (name, loops, fade_ms) play() asked for before the track was decoded
+
+    def preload(self, background=True):
+        # Decode every track up front, on a worker thread unless background is False
+        if background:
+            self._loader = threading.Thread(target=self._load_all, name="audio-preload", daemon=True)
+            self._loader.start()
+        else:
+            self._load_all()
+
+    def _load_all(self):
+        remaining = list(self.paths)
+        while remaining:
+            wanted = self._wanted
+            name = wanted[0] if wanted and wanted[0] in remaining else remaining[0]  # What play() waits for goes first
+            remaining.remove(name)
+            try:
+                self._load(name)
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Could not preload {name} music: {e}")
+            self._start_wanted()
+
+    def loading(self):
+        return self._loader is not None and self._loader.is_alive()
+
+    def _load(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            return sound
+        with self._locks[name]:
+            sound = self.sounds.get(name)  # Another thread may have finished it while we waited
+            if sound is None:
+                start = time.perf_counter()
+                sound = pygame.mixer.Sound(self.paths[name])  # Decodes the whole file into memory
+                self.load_times[name] = time.perf_counter() - start
+                self.sounds[name] = sound
+            return sound
+
+    def _get_channels(self):
+        if self._channels is None:
+            pygame.mixer.set_reserved(2)  # Keep two channels out of the automatic allocation for music
+            self._channels = (pygame.mixer.Channel(0), pygame.mixer.Channel(1))
+        return self._channels
+
+    def play(self, name, loops=-1):
+        if name == self.current:
+            return
+        start = time.perf_counter()
+        channels = self._get_channels()
+        with self._switch_lock:
+            fade_ms = self.crossfade_ms if self.current else 0
+            if self.current is not None:
+                channels[self._active].fadeout(self.crossfade_ms)
+                self._active = 1 - self._active
+            sound = self.sounds.get(name)  # None until the preload thread has decoded it
+            if sound is None:
+                # Still decoding (e.g. the background track right at startup): the preload thread starts it
+                self._wanted = (name, loops, fade_ms)
+            else:
+                self._wanted = None
+                channels[self._active].play(sound, loops=loops, fade_ms=fade_ms)
+            self.current = name
+        if sound is None and not self.loading():
+            self.preload()  # Nothing is decoding (no preload yet, or this track failed): try it again off the Tk thread
+        self.switch_times.append(time.perf_counter() - start)
+
+    def _start_wanted(self):
+        # Preload thread: play what play() asked for once it has been decoded
+        with self._switch_lock:
+            if self._wanted is None or self._wanted[0] not in self.sounds:
+                return
+            name, loops, fade_ms = self._wanted
+            self._wanted = None
+            self._get_channels()[self._active].play(self.sounds[name], loops=loops, fade_ms=fade_ms)
+
+    def escalate(self, name, loops=-1):
+        # Only ever move to a more intense track, so e.g. superintense is not replaced by intense
+        if self.current is None or self.ranks[name] > self.ranks[self.current]:
+            self.play(name, loops)
+
+    def stop(self):
+        with self._switch_lock:
+            if self._channels is not None:
+                for channel in self._channels:
+                    channel.stop()
+            self._wanted = None
+            self.current = None
+
+    def stats(self):
+        switches = sorted(self.switch_times)
+        return {
+            "load_ms": {name: round(seconds * 1000, 2) for name, seconds in self.load_times.items()},
+            "switches": len(switches),
+            "switch_ms_max": round(switches[-1] * 1000, 3) if switches else 0.0,
+            "switch_ms_median": round(switches[len(switches) // 2] * 1000, 3) if switches else 0.0,
+        }
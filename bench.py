@@ -0,0 +1,371 @@
+"""Benchmarks for the hot paths of both games, compared against a stored baseline.
+
+    python bench.py --save-baseline     # record this machine's numbers
+    python bench.py                     # compare, exit 1 if anything got slower than the tolerance allows
+
+Tk-dependent benchmarks use a hidden root. Without a display they fall back to stand-in widgets and a
+pixel copy in place of PhotoImage, and their names get a [headless] suffix so the two are never compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+import types
+import tkinter as tk
+
+BASELINE_PATH = "bench_baseline.json"
+TOLERANCE = 0.25  # Allowed slowdown before a benchmark counts as a regression
+REPEAT = 7
+CONFIRM_RUNS = 2  # Re-measurements of a suspected regression before it counts, to ride out a noisy machine
+FIXTURE_FILES = 4  # Sprites per loliN_HP folder in the generated image tree
+FIXTURE_SIZE = (800, 800)
+
+BENCHMARKS = []  # (name, function returning seconds per operation)
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS.append((name, fn))
+        return fn
+    return register
+
+
+def per_op(fn, setup=None, repeat=REPEAT, min_time=0.2):
+    # Best of `repeat` runs, each long enough to be timed reliably
+    if setup is None:
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat, number)) / number
+    # setup runs untimed before every single operation, e.g. to empty a cache
+    best = float("inf")
+    for _ in range(repeat):
+        total, count = 0.0, 0
+        while total < min_time:
+            setup()
+            start = time.perf_counter()
+            fn()
+            total += time.perf_counter() - start
+            count += 1
+        best = min(best, total / count)
+    return best
+
+
+class Context:
+    # Shared fixtures, built lazily by the benchmarks that need them
+    def __init__(self):
+        self.tmp = tempfile.mkdtemp(prefix="bench-")
+        self.root = None
+        self.headless = False
+        try:
+            self.root = tk.Tk()
+            self.root.withdraw()
+        except tk.TclError:
+            self.headless = True
+        self._images = None
+
+    def suffix(self):
+        return "[headless]" if self.headless else ""
+
+    def images(self):
+        if self._images is None:
+            from PIL import Image
+            rng = random.Random(0)
+            self._images = os.path.join(self.tmp, "images")
+            for prefix in ("loli1", "loli2"):
+                for hp in range(5):
+                    folder = os.path.join(self._images, f"{prefix}_{hp}")
+                    os.makedirs(folder)
+                    for i in range(FIXTURE_FILES):
+                        pixels = rng.randbytes(FIXTURE_SIZE[0] * FIXTURE_SIZE[1] * 3)
+                        Image.frombytes("RGB", FIXTURE_SIZE, pixels).save(os.path.join(folder, f"{i}.png"))
+            for move in ("rock", "paper", "scissors"):
+                Image.new("RGBA", (200, 200), (255, 0, 0, 255)).save(os.path.join(self._images, f"{move}.png"))
+        return self._images
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class HeadlessPhotoImage:
+    # Copies the pixels like a PhotoImage would, without needing a display
+    def __init__(self, image):
+        self.pixels = image.tobytes()
+
+
+class HeadlessWidget:
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def configure(self, **kwargs):
+        self.options.update(kwargs)
+    config = configure
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None  # pack, grid, destroy, title, ...
+
+
+HEADLESS_TK = types.SimpleNamespace(Frame=HeadlessWidget, Button=HeadlessWidget, Label=HeadlessWidget,
+                                    Toplevel=HeadlessWidget, LEFT=tk.LEFT, RIGHT=tk.RIGHT, TclError=tk.TclError)
+
+
+def rps_character(ctx):
+    import LoliRPS
+    import sprite_cache
+    from rps_engine import Match
+    if ctx.headless:
+        sprite_cache.ImageTk = types.SimpleNamespace(PhotoImage=HeadlessPhotoImage)
+    LoliRPS.match = Match()
+    return LoliRPS, LoliRPS.Character("Loli 1", 0, "loli1")
+
+
+@benchmark("rps.get_image.cold")
+def bench_get_image_cold(ctx):
+    LoliRPS, character = rps_character(ctx)
+    from sprite_cache import SpriteCache
+    images = ctx.images()
+
+    def fresh_cache():
+        LoliRPS.sprite_cache = SpriteCache(image_dir=images)  # Nothing decoded, nothing listed
+    return per_op(character.get_image, setup=fresh_cache)
+
+
+@benchmark("rps.get_image.warm")
+def bench_get_image_warm(ctx):
+    LoliRPS, character = rps_character(ctx)
+    from sprite_cache import SpriteCache
+    LoliRPS.sprite_cache = SpriteCache(image_dir=ctx.images())
+    for _ in range(FIXTURE_FILES * 4):
+        character.get_image()
+    return per_op(character.get_image)
+
+
+@benchmark("rps.determine_winner")
+def bench_determine_winner(ctx):
+    from rps_engine import MOVES, determine_winner
+    pairs = [(a, b) for a in MOVES for b in MOVES]
+
+    def all_pairs():
+        for a, b in pairs:
+            determine_winner(a, b)
+    return per_op(all_pairs) / len(pairs)
+
+
+@benchmark("rps.round")
+def bench_round(ctx):
+    # A full round as the game resolves it: CPU move, rules, HP and wins
+    from rps_engine import Match, get_random_move
+    rng = random.Random(1)
+    match = Match()
+
+    def one_round():
+        if match.over:
+            match.new_game()
+        match.play_round(get_random_move(rng), get_random_move(rng))
+    return per_op(one_round)
+
+
+@benchmark("rps.cpu.adaptive")
+def bench_cpu_adaptive(ctx):
+    # One prediction plus one update, against a player with a habit the model has already picked up
+    from rps_engine import MOVES
+    from rps_opponent import AdaptiveOpponent
+    model = AdaptiveOpponent(random.Random(1))
+    moves = [MOVES[i % 3] for i in range(300)]
+    for move in moves:
+        model.observe(move, model.choose())
+    state = iter(moves * 10_000)
+
+    def one_round():
+        model.observe(next(state), model.choose())
+    return per_op(one_round)
+
+
+def engarde_positions(count=200, seed=3):
+    # Mid-game states reached by heuristic play, for the move-selection benchmarks
+    from engarde_engine import EngardeState, heuristic_move
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = EngardeState.new_game(rng)
+        for _ in range(rng.randrange(6)):
+            if state.winner is not None:
+                break
+            state.apply(heuristic_move(state, rng))
+        if state.winner is None:
+            positions.append(state)
+    return positions
+
+
+@benchmark("engarde.apply_undo")
+def bench_apply_undo(ctx):
+    positions = engarde_positions()
+
+    def transitions():
+        for state in positions:
+            for step in state.legal_moves():
+                state.apply(step)
+                state.undo()
+    moves = sum(len(state.legal_moves()) for state in positions)
+    return per_op(transitions) / moves
+
+
+@benchmark("engarde.cpu.heuristic")
+def bench_cpu_heuristic(ctx):
+    from engarde_ai import HeuristicPlayer
+    player = HeuristicPlayer(random.Random(1))
+    positions = engarde_positions()
+    return per_op(lambda: [player.choose(state) for state in positions]) / len(positions)
+
+
+@benchmark("engarde.cpu.search_depth3")
+def bench_cpu_search(ctx):
+    # Fixed depth with a budget it never hits, so the number measures work rather than the clock
+    from engarde_ai import SearchPlayer
+    positions = engarde_positions(40)
+
+    def choose_all():
+        player = SearchPlayer(budget_ms=60_000, max_depth=3)
+        for state in positions:
+            player.choose(state)
+    return per_op(choose_all, repeat=5) / len(positions)
+
+
+@benchmark("engarde.redraw")
+def bench_redraw(ctx):
+    # update_board (which includes show_hand) after every move of a scripted game, then again
+    import engarde
+    from engarde_engine import heuristic_move
+    if ctx.headless:
+        engarde.tk = HEADLESS_TK
+    rng = random.Random(2)
+    game = engarde.Game(ctx.root)
+    states = []
+    state = game.state.copy()
+    while len(states) < 12:
+        state.apply(heuristic_move(state, rng))
+        if state.winner is not None:
+            break  # A finished state would run end_game, which drops the hand and skips show_hand from then on
+        states.append(state.copy())
+    start = game.state
+
+    def replay():
+        for s in states:
+            game.state = s
+            game.update_board()
+        game.state = start
+        game.update_board()
+    return per_op(replay) / (len(states) + 1)
+
+
+@benchmark("engarde.redraw.full")
+def bench_redraw_full(ctx):
+    # Worst case: every cell and hand button relabelled
+    import engarde
+    if ctx.headless:
+        engarde.tk = HEADLESS_TK
+    game = engarde.Game(ctx.root)
+
+    def invalidate():
+        game.cell_text = [None] * game.board_size
+        game.hand_text = [None] * len(game.hand_text)
+    return per_op(game.update_board, setup=invalidate)
+
+
+def run(names=None, exact=False):
+    # exact: names are full benchmark names (as reported), not substrings
+    ctx = Context()
+    results = {}
+    try:
+        for name, fn in BENCHMARKS:
+            if name.startswith(("rps.get_image", "engarde.redraw")):
+                name += ctx.suffix()
+            if names and not (name in names if exact else any(part in name for part in names)):
+                continue
+            seconds = fn(ctx)
+            results[name] = seconds * 1e6
+            print(f"  {name:<34} {seconds * 1e6:12.2f} us/op")
+    finally:
+        ctx.close()
+    return {
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "headless": ctx.headless,
+        "us_per_op": results,
+    }
+
+
+def compare(run_results, baseline, tolerance):
+    # Returns the names of benchmarks that regressed
+    regressions = []
+    print(f"\nAgainst baseline from {baseline.get('machine')} (tolerance {tolerance:.0%}):")
+    for name, now in run_results["us_per_op"].items():
+        before = baseline["us_per_op"].get(name)
+        if before is None:
+            print(f"  {name:<34} (no baseline)")
+            continue
+        change = now / before - 1
+        regressed = change > tolerance
+        print(f"  {name:<34} {before:12.2f} -> {now:12.2f} us/op  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LoliRPS and En Garde hot paths")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, e.g. 0.25 for 25%%")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    print("Running benchmarks:")
+    results = run(args.names)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                merged = json.load(f)
+            merged.update({key: value for key, value in results.items() if key != "us_per_op"})
+            merged["us_per_op"].update(results["us_per_op"])  # A filtered run only replaces what it measured
+            results = merged
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for _ in range(CONFIRM_RUNS):
+        if not regressions:
+            break
+        print(f"\nRe-measuring {len(regressions)} suspected regression(s):")
+        again = run(regressions, exact=True)["us_per_op"]
+        for name in regressions:
+            results["us_per_op"][name] = min(results["us_per_op"][name], again[name])  # Noise only ever slows a run down
+        regressions = compare({"us_per_op": {name: results["us_per_op"][name] for name in regressions}},
+                              baseline, args.tolerance)
+    if regressions:
+        print("\n" + "!" * 60)
+        print(f"PERFORMANCE REGRESSION in {len(regressions)} benchmark(s): {', '.join(regressions)}")
+        print("!" * 60)
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,221 +1,208 @@
 import tkinter as tk
+import argparse
+import os
 import random
-
-class Card:
-    def __init__(self, value):
-        self.value = value
-
-    def __str__(self):
-        return str(self.value)
-
-class Player:
-    def __init__(self, name, position):
-        self.name = name
-        self.hand = []
-        self.position = position
-
-    def draw_card(self, deck):
-        if deck:
-            self.hand.append(deck.pop(0))
-
-    def play_card(self, index):
-        if index < len(self.hand):
-            return self.hand.pop(index)
-        return None
-
-    def __str__(self):
-        return f'{self.name}: ' + ', '.join(str(card) for card in self.hand)
+from engarde_engine import EngardeState, PLAYER, CPU, DRAW
+from engarde_ai import CPU_PLAYERS, DIFFICULTY, HeuristicPlayer, make_cpu_player
+from engarde_tablebase import TABLEBASE_PATH, Tablebase
+from engarde_policy import POLICY_PATH
+from replay import GAME_ENGARDE, INPUT, CPU as CPU_EVENT, RESULT, Replay, ReplayWriter, ScriptedPlayer, session_seed, seed_arg, verify
 
 class Game:
-    def __init__(self, root):
-        self.deck = [Card(value) for value in range(1, 6)] * 5
-        random.shuffle(self.deck)
-        self.player = Player("Player", 0)
-        self.cpu = Player("CPU", 22)
+    # Tk view over an EngardeState; all rules live in engarde_engine
+    def __init__(self, root, cpu_player=None, tablebase=None, rng=None, recorder=None):
+        self.rng = rng or random  # The session's RNG; seeding it makes the deal and the heuristic CPU reproducible
+        self.state = EngardeState.new_game(self.rng)  # Shuffles the deck and deals 5 cards each
         self.root = root
-        self.board = [' ' for _ in range(23)]
+        self.cpu_player = cpu_player or HeuristicPlayer(self.rng)  # Anything with choose(state) -> step
+        self.recorder = recorder  # ReplayWriter for --record, or None
+        self.cpu_request = None  # Outstanding asynchronous CPU decision, if the player supports request()
+        self.tablebase = tablebase  # Solved endgames; once the deck is empty the CPU plays straight from it
+        self.board_size = self.state.board_size
         self.player_hand_frame = None  # Initialize player_hand_frame to None
+        self.hand_buttons = []  # Pooled hand buttons, relabelled instead of recreated
+        self.hand_text = []  # Label currently shown on each pooled hand button
+        self.hand_shown = 0  # How many of the pooled buttons are packed
+        self.move_window = None  # Persistent "Move Player" dialog, created on first use
+        self.pending_move = None  # Card value waiting for a direction in the move dialog
         self.game_over = False  # Add a flag to check if the game is over
         self.create_widgets()
 
-    def deal(self):
-        for _ in range(5):
-            self.player.draw_card(self.deck)
-            self.cpu.draw_card(self.deck)
-
     def create_widgets(self):
         self.board_frame = tk.Frame(self.root)
         self.board_frame.pack()
         self.buttons = []
-        for i in range(23):
+        self.cell_text = []  # Text currently shown on each board button, so redraws only touch changed cells
+        for i in range(self.board_size):
             btn = tk.Button(self.board_frame, text=' ', width=2, height=1)
             btn.grid(row=0, column=i)
             self.buttons.append(btn)
-        self.update_board()
+            self.cell_text.append(' ')
 
         self.player_hand_frame = tk.Frame(self.root)
         self.player_hand_frame.pack()
-        self.deal()
-        self.show_hand()
+        self.update_board()
+
+    def set_cell(self, i, text):
+        if self.cell_text[i] != text:
+            try:
+                self.buttons[i].configure(text=text)
+                self.cell_text[i] = text
+            except tk.TclError:
+                pass
 
     def update_board(self):
         if self.board_frame and self.buttons:
-            for i in range(23):
-                try:
-                    if i == self.player.position:
-                        self.buttons[i].configure(text='P')
-                    elif i == self.cpu.position:
-                        self.buttons[i].configure(text='C')
-                    else:
-                        self.buttons[i].configure(text=' ')
-                except tk.TclError:
-                    pass
-            
+            player_pos, cpu_pos = self.state.pos
+            for i in range(self.board_size):
+                if i == player_pos and i == cpu_pos:
+                    self.set_cell(i, 'C' if self.state.winner == CPU else 'P')  # The winner takes the cell
+                elif i == player_pos:
+                    self.set_cell(i, 'P')
+                elif i == cpu_pos:
+                    self.set_cell(i, 'C')
+                else:
+                    self.set_cell(i, ' ')
+
             self.show_hand()
-            
+
             if self.is_game_over() and not self.game_over:
-                winner = "Player wins!" if self.player.position < self.cpu.position else "CPU wins!"
-                self.end_game(winner)
+                if self.state.winner == DRAW:
+                    self.end_game("Out of cards, it's a draw!")
+                else:
+                    self.end_game("Player wins!" if self.state.winner == PLAYER else "CPU wins!")
 
     def show_hand(self):
         if self.is_game_over():  # Check if the game is over
             return  # If the game is over, do not show the hand
 
-        if self.player_hand_frame:
-            self.player_hand_frame.destroy()  # Destroy existing frame
-        self.player_hand_frame = tk.Frame(self.root)  # Re-create the frame
-        self.player_hand_frame.pack()
-        for index, card in enumerate(self.player.hand):
-            btn = tk.Button(self.player_hand_frame, text=str(card), command=lambda i=index: self.play_round(i))
-            btn.pack(side=tk.LEFT)
+        if not self.player_hand_frame:
+            return
+
+        hand = self.state.hand_values(PLAYER)
+        # Grow the pool only when the hand is bigger than ever before, then relabel in place
+        while len(self.hand_buttons) < len(hand):
+            index = len(self.hand_buttons)
+            btn = tk.Button(self.player_hand_frame, command=lambda i=index: self.play_round(i))
+            self.hand_buttons.append(btn)
+            self.hand_text.append(None)
+        for index, value in enumerate(hand):
+            if self.hand_text[index] != str(value):
+                self.hand_buttons[index].configure(text=str(value))
+                self.hand_text[index] = str(value)
+        # Buttons are only ever hidden from the end, so packing in index order keeps them in order
+        for index in range(self.hand_shown, len(hand)):
+            self.hand_buttons[index].pack(side=tk.LEFT)
+        for index in range(len(hand), self.hand_shown):
+            self.hand_buttons[index].pack_forget()
+        self.hand_shown = len(hand)
 
     def is_game_over(self):
-        # Check if either player has won
-        return self.player.position == self.cpu.position
+        # Check if either player has won or the cards ran out
+        return self.state.winner is not None
 
     def play_round(self, player_index):
-        self.player_current_card = player_index  # Store the current card index
-        player_card = self.player.play_card(player_index)
-        
-        self.ask_player_move(player_card.value, player_card)
-        
-    def ask_player_move(self, value, player_card):
-        move_window = tk.Toplevel(self.root)
-        move_window.title("Move Player")
-
-        label = tk.Label(move_window, text="Do you want to move left or right?")
+        hand = self.state.hand_values(PLAYER)
+        if self.is_game_over() or self.state.turn != PLAYER or self.cpu_request or player_index >= len(hand):
+            return
+        self.ask_player_move(hand[player_index])
+
+    def ask_player_move(self, value):
+        if self.move_window is None:
+            self.create_move_window()
+        self.pending_move = value  # The card stays in the hand until a direction is chosen
+        self.move_window.deiconify()
+        self.move_window.lift()
+        self.move_window.grab_set()  # Modal, so a second card can't be played while this one is pending
+
+    def create_move_window(self):
+        self.move_window = tk.Toplevel(self.root)
+        self.move_window.title("Move Player")
+        self.move_window.protocol("WM_DELETE_WINDOW", self.cancel_move)  # Hide instead of destroying
+
+        label = tk.Label(self.move_window, text="Do you want to move left or right?")
         label.pack()
 
-        left_btn = tk.Button(move_window, text="Left", command=lambda: self.move_and_close(move_window, self.player, -value, player_card))
+        left_btn = tk.Button(self.move_window, text="Left", command=lambda: self.move_and_close(-1))
         left_btn.pack(side=tk.LEFT)
 
-        right_btn = tk.Button(move_window, text="Right", command=lambda: self.move_and_close(move_window, self.player, value, player_card))
+        right_btn = tk.Button(self.move_window, text="Right", command=lambda: self.move_and_close(1))
         right_btn.pack(side=tk.RIGHT)
 
-    def move_and_close(self, window, player, value, player_card):
-        if self.is_game_over():  # Check if the game is over
-            return  # If the game is over, do nothing
+    def hide_move_window(self):
+        self.move_window.grab_release()
+        self.move_window.withdraw()
+
+    def cancel_move(self):
+        self.pending_move = None
+        self.hide_move_window()
 
-        if self.can_move(player, value):
-            self.move_player(player, value)
-            if not self.is_game_over():  # Only draw a card if the game is not over
-                self.player.draw_card(self.deck)
-            window.destroy()
+    def move_and_close(self, direction):
+        value = self.pending_move
+        self.pending_move = None
+        self.hide_move_window()
+        if value is None or self.is_game_over():  # Check if the game is over
+            return  # If the game is over, do nothing
+        self.play_step(value * direction)
+
+    def play_step(self, step):
+        # The player's move, from the dialog or a replay
+        if self.is_game_over() or self.state.turn != PLAYER or self.cpu_request:
+            return
+        if self.can_move(step):
+            if self.recorder:
+                self.recorder.event(INPUT, step)
+            self.state.apply(step)  # Plays the card, moves, and draws unless the move won
+            self.update_board()
             if not self.is_game_over():  # Only let the CPU play if the game is not over
-                self.cpu_play(player_card)
+                self.cpu_play(abs(step))
         else:
-            self.player.hand.insert(self.player_current_card, player_card)
-            window.destroy()
-            self.show_hand()
+            self.show_hand()  # Illegal direction, the card stays in the hand
 
-    def can_move(self, player, value):
-        new_pos = player.position + value
-        if player == self.player:
-            return 0 <= new_pos < 23
-        else:
-            return 0 <= new_pos < 23
+    def can_move(self, step):
+        return self.state.is_legal(step)
 
-    def cpu_play(self, player_card):
+    def cpu_play(self, player_value):
         if self.is_game_over():  # Check if the game is over
             return  # If the game is over, do nothing
 
-        for cpu_index, cpu_card in enumerate(self.cpu.hand):
-            move_left = self.cpu.position - cpu_card.value
-            move_right = self.cpu.position + cpu_card.value
-
-            if move_right == self.player.position:
-                self.cpu.hand.pop(cpu_index)
-                self.cpu.position = move_right
-                self.update_board()
-                self.end_game("CPU wins!")
-                return
-            elif move_left == self.player.position:
-                self.cpu.hand.pop(cpu_index)
-                self.cpu.position = move_left
-                self.update_board()
-                self.end_game("CPU wins!")
-                return
-        else:
-            cpu_index = random.randint(0, len(self.cpu.hand)-1)
-            cpu_card = self.cpu.play_card(cpu_index)
-            self.cpu.draw_card(self.deck)
-            self.cpu_move(cpu_card.value)
-
-        print(f'Player plays: {player_card}')
-        print(f'CPU plays: {cpu_card}')
-
-        self.show_hand()
-
-    def cpu_move(self, value):
-        move_left = self.cpu.position - value
-        move_right = self.cpu.position + value
-
-        if move_right == self.player.position:
-            self.cpu.position = move_right
-            self.update_board()
-            self.end_game("CPU wins!")
-        elif move_left == self.player.position:
-            self.cpu.position = move_left
-            self.update_board()
-            self.end_game("CPU wins!")
-        elif 0 <= move_right < 23 and move_right < self.player.position:
-            self.cpu.position = move_right
-        else:
-            self.cpu.position = move_left
+        move = self.tablebase.best_move(self.state) if self.tablebase else None
+        if move is not None:
+            self.apply_cpu_move(player_value, move, from_tablebase=True)
+            return
+        if hasattr(self.cpu_player, "request"):
+            # Think in the background and keep the window responsive; the move arrives through root.after
+            self.cpu_request = self.cpu_player.request(self.state, self.root, lambda move: self.apply_cpu_move(player_value, move))
+            return
+        self.apply_cpu_move(player_value, self.cpu_player.choose(self.state))
+
+    def apply_cpu_move(self, player_value, move, from_tablebase=False):
+        self.cpu_request = None
+        if self.is_game_over():
+            return
+        if self.recorder:
+            self.recorder.event(CPU_EVENT, move, from_tablebase)
+        self.state.apply(move)
+
+        print(f'Player plays: {player_value}')
+        print(f'CPU plays: {abs(move)}')
 
         self.update_board()
 
-    def move_player(self, player, value):
-        new_pos = player.position + value
-        if player == self.player:
-            if 0 <= new_pos < 23:
-                player.position = new_pos
-                if player.position == self.cpu.position:
-                    self.update_board()
-                    self.end_game("Player wins!")
-        else:
-            if 0 <= new_pos < 23:
-                player.position = new_pos
-                if player.position == self.player.position:
-                    self.update_board()
-                    self.end_game("CPU wins!")
-
-        self.update_board()
+    def cancel_cpu(self):
+        # Abandon a pending asynchronous CPU decision, e.g. when the window closes
+        if self.cpu_request:
+            self.cpu_request.cancel()
+            self.cpu_request = None
 
     def end_game(self, message):
         if not self.game_over:  # Check if the game has already ended
             self.game_over = True  # Set the game over flag
+            if self.recorder:
+                self.recorder.event(RESULT, self.state.winner)
+                self.recorder.flush()
 
-            # Update the board to reflect the final positions
-            if "CPU wins!" in message:
-                self.board[self.player.position] = ' '  # Clear player's icon
-                self.board[self.cpu.position] = 'C'  # Set CPU's icon
-                self.buttons[self.player.position].configure(text='C')  # Manually set the button text to 'C'
-            else:
-                self.board[self.cpu.position] = ' '  # Clear CPU's icon
-                self.board[self.player.position] = 'P'  # Set player's icon
-            
-            self.update_board()  # Refresh the board
+            self.update_board()  # Refresh the board to reflect the final positions
 
             # Destroy the player's hand frame if it exists
             if self.player_hand_frame:
@@ -227,9 +214,81 @@ class Game:
             end_label.pack()
 
 def main():
+    parser = argparse.ArgumentParser(description="En Garde")
+    parser.add_argument("--cpu", choices=sorted(CPU_PLAYERS), default="heuristic", help="CPU strategy")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY), default="normal", help="strength of the search CPU")
+    parser.add_argument("--budget-ms", type=int, help="override the search CPU's per-move time budget")
+    parser.add_argument("--cpu-stats", action="store_true", help="print search statistics after every CPU move")
+    parser.add_argument("--playouts", type=int, help="playouts per candidate move for the montecarlo CPU")
+    parser.add_argument("--workers", type=int, help="worker processes for the montecarlo CPU (default: all cores)")
+    parser.add_argument("--policy", default=POLICY_PATH, help="policy file trained by engarde_policy.py, for the policy CPU")
+    parser.add_argument("--tablebase", default=TABLEBASE_PATH, help="endgame tablebase built by engarde_tablebase.py (skipped if missing)")
+    parser.add_argument("--seed", type=seed_arg, help="seed for the deal and the heuristic CPU (default: random, printed at startup)")
+    parser.add_argument("--record", metavar="LOG", help="write a replay log of this session")
+    parser.add_argument("--replay", metavar="LOG", help="re-execute a replay log headlessly and check its outcomes")
+    parser.add_argument("--realtime", action="store_true", help="with --replay, play the log back in the window at the recorded pace")
+    parser.add_argument("--profile-log", metavar="FILE", help="append per-second handler timing histograms to FILE as JSON lines")
+    parser.add_argument("--profile-overlay", action="store_true", help="show the slowest handlers in an overlay")
+    args = parser.parse_args()
+
+    if args.replay and not args.realtime:
+        raise SystemExit(0 if verify(args.replay) else 1)
+    if args.replay:
+        replay_realtime(args.replay)
+        return
+
+    options = {}
+    if args.cpu == "search":
+        options = {"difficulty": args.difficulty, "verbose": args.cpu_stats}
+        if args.budget_ms is not None:
+            options["budget_ms"] = args.budget_ms
+    elif args.cpu == "montecarlo":
+        options = {"verbose": args.cpu_stats}
+        for name in ("budget_ms", "playouts", "workers"):
+            if getattr(args, name) is not None:
+                options[name] = getattr(args, name)
+    elif args.cpu == "policy":
+        if not os.path.exists(args.policy):
+            parser.error(f"{args.policy} not found, run 'python engarde_policy.py train' first")
+        options = {"path": args.policy}
+
+    seed = session_seed(args.seed)
+    print(f"Session seed: {seed}")
+    rng = random.Random(seed)
+    if args.cpu == "heuristic":
+        options = {"rng": rng}
+    cpu_player = make_cpu_player(args.cpu, **options)
+    if hasattr(cpu_player, "warm_up"):
+        cpu_player.warm_up()  # Start the worker processes before the window shows
+    recorder = ReplayWriter(args.record, GAME_ENGARDE, seed, args.cpu) if args.record else None
     root = tk.Tk()
     root.title("En Garde")
-    game = Game(root)
+    profiler = None
+    if args.profile_log or args.profile_overlay:
+        from profiling import Profiler
+        profiler = Profiler(args.profile_log, args.profile_overlay)
+        profiler.instrument(Game, "update_board", "show_hand", "cpu_play", "apply_cpu_move")
+        profiler.install(root)  # Hand buttons, the move dialog and after() callbacks from here on
+    game = Game(root, cpu_player, Tablebase.open_if_present(args.tablebase), rng, recorder)
+    try:
+        root.mainloop()
+    finally:
+        game.cancel_cpu()
+        if hasattr(cpu_player, "close"):
+            cpu_player.close()
+        if recorder:
+            recorder.close()
+        if profiler:
+            profiler.close()
+
+def replay_realtime(path):
+    # Same deal from the recorded seed, the player's moves at their recorded times, and the CPU's moves from the log
+    replay = Replay(path)
+    root = tk.Tk()
+    root.title(f"En Garde - replay of {path}")
+    game = Game(root, ScriptedPlayer(replay.cpu_moves()), rng=random.Random(replay.seed))
+    for ms, kind, step in replay.inputs():
+        root.after(ms, game.play_step, step)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,350 @@
+"""Pluggable En Garde CPU players.
+
+Every player has choose(state) -> step for the side to move, and stats() -> dict.
+Players that also have request(state, root, callback) are asked asynchronously by the Tk view.
+"""
+import math
+import random
+import time
+
+from engarde_engine import CARD_VALUES, MAX_VALUE, POSITION_KEYS, HAND_KEYS, DECK_KEYS, TURN_KEY, heuristic_move, lethal_moves
+from engarde_mc import MonteCarloPlayer
+from engarde_policy import POLICY_PATH, PolicyPlayer
+
+WIN = 1.0
+LEAF_HIT = 0.9  # Leaf value of being in reach of the opponent with the right card in hand
+DEADLINE_CHECK_MASK = 1023  # Look at the clock every 1024 nodes
+
+_key_rng = random.Random(0xE6A2)
+OPPONENT_SIZE_KEYS = [_key_rng.getrandbits(64) for _ in range(64)]  # [opponent hand size]
+
+# Named strength levels for SearchPlayer: per-move budget and depth cap
+DIFFICULTY = {
+    "easy": {"budget_ms": 20, "max_depth": 1},
+    "normal": {"budget_ms": 150, "max_depth": 4},
+    "hard": {"budget_ms": 600, "max_depth": 30},
+}
+
+
+class HeuristicPlayer:
+    # The original cpu_play behaviour
+    def __init__(self, rng=random):
+        self.rng = rng
+
+    def choose(self, state):
+        return heuristic_move(state, self.rng)
+
+    def stats(self):
+        return {}
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    def __init__(self, bits=18):
+        self.size = 1 << bits
+        self.mask = self.size - 1
+        self.keys = [None] * self.size
+        self.entries = [None] * self.size  # (depth, value, best move, generation)
+        self.generation = 0  # Bumped for every root search so stale entries lose their slot first
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, h):
+        self.probes += 1
+        i = h & self.mask
+        if self.keys[i] == h:
+            return self.entries[i]
+        return None
+
+    def store(self, h, depth, value, move):
+        i = h & self.mask
+        old = self.entries[i]
+        # Depth-preferred replacement, except that the same position or an entry from an older search always yields
+        if old is not None and self.keys[i] != h and old[3] == self.generation and old[0] > depth:
+            return
+        if old is not None and self.keys[i] != h:
+            self.overwrites += 1
+        self.keys[i] = h
+        self.entries[i] = (depth, value, move, self.generation)
+        self.stores += 1
+
+
+class SearchPlayer:
+    """Iterative-deepening expectimax over what the side to move cannot see.
+
+    The searcher knows its own hand, both positions and the pool of unseen cards (deck plus opponent hand).
+    Its own draws are chance nodes over that pool. At opponent nodes the hidden hand is a uniformly random
+    subset of the pool, and the opponent plays the best card it holds.
+    """
+
+    def __init__(self, budget_ms=150, max_depth=4, tt_bits=18, verbose=False):
+        self.budget = budget_ms / 1000
+        self.max_depth = max_depth
+        self.tt = TranspositionTable(tt_bits)
+        self.verbose = verbose
+        self.last = {}  # Stats of the most recent choose()
+        self.total_nodes = 0
+        self.total_time = 0.0
+
+    @classmethod
+    def for_difficulty(cls, name, **kwargs):
+        return cls(**dict(DIFFICULTY[name], **kwargs))
+
+    def choose(self, state):
+        lethal = lethal_moves(state)
+        if lethal:
+            return lethal[0]
+
+        side = state.turn
+        self.board_size = state.board_size
+        self.me = state.pos[side]
+        self.opp = state.pos[1 - side]
+        self.hand = state.hands[side][:]
+        self.hand_size = state.hand_size[side]
+        self.unseen = state.unseen_counts(side)
+        self.opp_size = state.hand_size[1 - side]
+        self.deck_size = sum(state.deck_counts)
+        self.h = self._hash()
+
+        self.tt.new_search()
+        self.nodes = 0
+        probes, hits = self.tt.probes, self.tt.hits
+        start = time.perf_counter()
+        self.deadline = start + self.budget
+
+        moves = state.legal_moves()
+        best_move, best_value, completed = moves[0], None, 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value, move = self._root(moves, best_move, depth)
+            except SearchTimeout:
+                break
+            best_move, best_value, completed = move, value, depth
+            if abs(value) >= WIN:
+                break  # Proven win or loss, deeper search can't change it
+
+        elapsed = time.perf_counter() - start
+        self.total_nodes += self.nodes
+        self.total_time += elapsed
+        self.last = {
+            "depth": completed,
+            "value": best_value,
+            "nodes": self.nodes,
+            "ms": elapsed * 1000,
+            "nodes_per_sec": self.nodes / elapsed if elapsed else 0.0,
+            "tt_hit_rate": (self.tt.hits - hits) / max(1, self.tt.probes - probes),
+        }
+        if self.verbose:
+            print("CPU search: " + ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in self.last.items()))
+        return best_move
+
+    def stats(self):
+        return dict(self.last,
+                    total_nodes=self.total_nodes,
+                    overall_nodes_per_sec=self.total_nodes / self.total_time if self.total_time else 0.0,
+                    tt_hit_rate_overall=self.tt.hits / max(1, self.tt.probes),
+                    tt_overwrites=self.tt.overwrites)
+
+    def _hash(self):
+        h = POSITION_KEYS[0][self.me] ^ POSITION_KEYS[1][self.opp] ^ OPPONENT_SIZE_KEYS[self.opp_size]
+        for value in CARD_VALUES:
+            h ^= HAND_KEYS[0][value][self.hand[value]] ^ DECK_KEYS[value][self.unseen[value]]
+        return h
+
+    def _tick(self):
+        self.nodes += 1
+        if not self.nodes & DEADLINE_CHECK_MASK and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _order(self, moves, first):
+        # Previous best first, then moves that end out of the opponent's reach
+        opp = self.opp
+        return sorted(moves, key=lambda step: (step != first, abs(self.me + step - opp) <= MAX_VALUE))
+
+    def _root(self, moves, first, depth):
+        best_value, best_move = -2.0, first
+        for step in self._order(moves, first):
+            value = self._after_my_move(step, depth)
+            if value > best_value:
+                best_value, best_move = value, step
+        return best_value, best_move
+
+    def _my_moves(self):
+        moves = []
+        for value in CARD_VALUES:
+            if self.hand[value]:
+                if self.me - value >= 0:
+                    moves.append(-value)
+                if self.me + value < self.board_size:
+                    moves.append(value)
+        return moves
+
+    def _max_node(self, depth):
+        # Our turn
+        self._tick()
+        if self.hand_size == 0:
+            return 0.0
+        if depth == 0:
+            distance = abs(self.me - self.opp)
+            return LEAF_HIT if distance <= MAX_VALUE and self.hand[distance] else 0.0
+        h = self.h
+        entry = self.tt.probe(h)
+        first = None
+        if entry is not None:
+            if entry[0] >= depth:
+                self.tt.hits += 1
+                return entry[1]
+            first = entry[2]
+        best_value, best_move = -2.0, None
+        for step in self._order(self._my_moves(), first):
+            value = self._after_my_move(step, depth)
+            if value > best_value:
+                best_value, best_move = value, step
+                if value >= WIN:
+                    break
+        self.tt.store(h, depth, best_value, best_move)
+        return best_value
+
+    def _after_my_move(self, step, depth):
+        value = abs(step)
+        hand, unseen = self.hand, self.unseen
+        keys = HAND_KEYS[0]
+        old_h = self.h
+        self.h ^= keys[value][hand[value]] ^ keys[value][hand[value] - 1]
+        hand[value] -= 1
+        self.hand_size -= 1
+        old_pos = self.me
+        self.me += step
+        self.h ^= POSITION_KEYS[0][old_pos] ^ POSITION_KEYS[0][self.me] ^ TURN_KEY
+
+        if self.me == self.opp:
+            result = WIN
+        elif self.deck_size:
+            # Chance node: our draw comes from the unseen pool
+            result = 0.0
+            pool = self.deck_size + self.opp_size
+            self.deck_size -= 1
+            self.hand_size += 1
+            base_h = self.h
+            for card in CARD_VALUES:
+                count = unseen[card]
+                if not count:
+                    continue
+                self.h = base_h ^ keys[card][hand[card]] ^ keys[card][hand[card] + 1] ^ DECK_KEYS[card][count] ^ DECK_KEYS[card][count - 1]
+                hand[card] += 1
+                unseen[card] = count - 1
+                result += count / pool * self._min_node(depth - 1)
+                hand[card] -= 1
+                unseen[card] = count
+            self.h = base_h
+            self.deck_size += 1
+            self.hand_size -= 1
+        else:
+            result = self._min_node(depth - 1)
+
+        self.me = old_pos
+        hand[value] += 1
+        self.hand_size += 1
+        self.h = old_h
+        return result
+
+    def _none_held(self, cards):
+        # Probability that a random opponent hand holds none of `cards` of the unseen pool
+        pool = self.deck_size + self.opp_size
+        return math.comb(pool - cards, self.opp_size) / math.comb(pool, self.opp_size)
+
+    def _min_node(self, depth):
+        # Opponent's turn, with its hand hidden
+        self._tick()
+        if self.opp_size == 0:
+            return 0.0
+        if depth == 0:
+            distance = abs(self.me - self.opp)
+            if distance <= MAX_VALUE and self.unseen[distance]:
+                return -LEAF_HIT * (1 - self._none_held(self.unseen[distance]))
+            return 0.0
+        h = self.h
+        entry = self.tt.probe(h)
+        if entry is not None and entry[0] >= depth:
+            self.tt.hits += 1
+            return entry[1]
+
+        # Best outcome (for the opponent) of playing each card value it might hold
+        outcomes = []
+        for value in CARD_VALUES:
+            if self.unseen[value]:
+                outcome = None
+                for step in (-value, value):
+                    if 0 <= self.opp + step < self.board_size:
+                        result = self._after_opponent_move(step, depth)
+                        if outcome is None or result < outcome:
+                            outcome = result
+                if outcome is not None:
+                    outcomes.append((outcome, value))
+        if not outcomes:
+            return 0.0
+        outcomes.sort()
+
+        # The opponent plays its best card: weight each outcome by P(holds it and none of the better ones)
+        expected = 0.0
+        excluded = 0
+        none_before = 1.0
+        for outcome, value in outcomes:
+            excluded += self.unseen[value]
+            none_after = self._none_held(excluded)
+            expected += (none_before - none_after) * outcome
+            none_before = none_after
+        if none_before > 0:
+            # The rest is hands whose cards all step off the board; average over the hands that can move instead
+            expected /= 1 - none_before
+        self.tt.store(h, depth, expected, None)
+        return expected
+
+    def _after_opponent_move(self, step, depth):
+        value = abs(step)
+        unseen = self.unseen
+        old_h = self.h
+        count = unseen[value]
+        self.h ^= DECK_KEYS[value][count] ^ DECK_KEYS[value][count - 1] ^ TURN_KEY
+        unseen[value] = count - 1
+        old_pos = self.opp
+        self.opp += step
+        self.h ^= POSITION_KEYS[1][old_pos] ^ POSITION_KEYS[1][self.opp]
+
+        if self.opp == self.me:
+            result = -WIN
+        elif self.deck_size:
+            # The opponent draws an unseen card: the pool is unchanged, only its hand size is
+            self.deck_size -= 1
+            result = self._max_node(depth - 1)
+            self.deck_size += 1
+        else:
+            self.opp_size -= 1
+            self.h ^= OPPONENT_SIZE_KEYS[self.opp_size + 1] ^ OPPONENT_SIZE_KEYS[self.opp_size]
+            result = self._max_node(depth - 1)
+            self.opp_size += 1
+
+        self.opp = old_pos
+        unseen[value] = count
+        self.h = old_h
+        return result
+
+
+CPU_PLAYERS = {
+    "heuristic": lambda rng=random, **kwargs: HeuristicPlayer(rng),
+    "search": lambda difficulty="normal", **kwargs: SearchPlayer.for_difficulty(difficulty, **kwargs),
+    "montecarlo": lambda **kwargs: MonteCarloPlayer(**kwargs),
+    "policy": lambda path=POLICY_PATH, rng=random, **kwargs: PolicyPlayer(path, rng),
+}
+
+
+def make_cpu_player(name, **kwargs):
+    return CPU_PLAYERS[name](**kwargs)
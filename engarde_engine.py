@@ -0,0 +1,229 @@
+"""Headless En Garde rules: compact state, Zobrist hashing, apply/undo and move generation.
+
+Moves are signed steps: +3 plays a 3 and moves right, -3 plays a 3 and moves left.
+"""
+import random
+from collections import deque
+
+BOARD_SIZE = 23
+START_POSITIONS = (0, 22)
+HAND_SIZE = 5
+CARD_VALUES = range(1, 6)
+DECK = [value for value in CARD_VALUES] * 5  # Same composition as the original [Card(value) ...] * 5
+MAX_VALUE = max(CARD_VALUES)
+
+PLAYER = 0
+CPU = 1
+DRAW = 2  # Value of state.winner when both hands run out
+
+_zobrist_rng = random.Random(0x5EED)  # Fixed seed so hashes are stable between runs and processes
+_MAX_COUNT = len(DECK)
+
+
+def _keys(*shape):
+    if len(shape) == 1:
+        return [_zobrist_rng.getrandbits(64) for _ in range(shape[0])]
+    return [_keys(*shape[1:]) for _ in range(shape[0])]
+
+
+POSITION_KEYS = _keys(2, 64)  # [side][position], wide enough for any board size we simulate
+HAND_KEYS = _keys(2, MAX_VALUE + 1, _MAX_COUNT + 1)  # [side][value][count]
+DECK_KEYS = _keys(MAX_VALUE + 1, _MAX_COUNT + 1)  # [value][count]
+TURN_KEY = _zobrist_rng.getrandbits(64)
+
+
+class EngardeState:
+    __slots__ = ("board_size", "pos", "hands", "hand_size", "deck", "deck_counts", "turn", "winner", "hash", "history")
+
+    def __init__(self, board_size=BOARD_SIZE, positions=START_POSITIONS, hands=None, deck=(), turn=PLAYER):
+        self.board_size = board_size
+        self.pos = list(positions)
+        self.hands = [[0] * (MAX_VALUE + 1), [0] * (MAX_VALUE + 1)]  # [side][value] -> number of cards held
+        for side, values in enumerate(hands or ((), ())):
+            for value in values:
+                self.hands[side][value] += 1
+        self.hand_size = [sum(self.hands[0]), sum(self.hands[1])]
+        self.deck = deque(deck)  # Draw order; search never reads it and draws explicit values instead
+        self.deck_counts = [0] * (MAX_VALUE + 1)
+        for value in self.deck:
+            self.deck_counts[value] += 1
+        self.turn = turn
+        self.winner = None
+        self.history = []
+        self.hash = self.full_hash()
+        self._check_exhausted()
+
+    @classmethod
+    def new_game(cls, rng=random, board_size=BOARD_SIZE, deck=DECK, hand_size=HAND_SIZE):
+        cards = list(deck)
+        rng.shuffle(cards)
+        hands = ([], [])
+        for _ in range(hand_size):  # Deal alternately, like Game.deal
+            hands[PLAYER].append(cards.pop(0))
+            hands[CPU].append(cards.pop(0))
+        return cls(board_size, (0, board_size - 1), hands, cards)
+
+    def copy(self):
+        other = EngardeState.__new__(EngardeState)
+        other.board_size = self.board_size
+        other.pos = self.pos[:]
+        other.hands = [self.hands[0][:], self.hands[1][:]]
+        other.hand_size = self.hand_size[:]
+        other.deck = deque(self.deck)
+        other.deck_counts = self.deck_counts[:]
+        other.turn = self.turn
+        other.winner = self.winner
+        other.hash = self.hash
+        other.history = []
+        return other
+
+    def full_hash(self):
+        h = TURN_KEY if self.turn == CPU else 0
+        for side in (PLAYER, CPU):
+            h ^= POSITION_KEYS[side][self.pos[side]]
+            for value in CARD_VALUES:
+                h ^= HAND_KEYS[side][value][self.hands[side][value]]
+        for value in CARD_VALUES:
+            h ^= DECK_KEYS[value][self.deck_counts[value]]
+        return h
+
+    def hand_values(self, side):
+        # The hand as a sorted list of card values, for display
+        return [value for value in CARD_VALUES for _ in range(self.hands[side][value])]
+
+    def is_legal(self, step):
+        if self.winner is not None or step == 0:
+            return False
+        value = abs(step)
+        return value <= MAX_VALUE and self.hands[self.turn][value] > 0 and 0 <= self.pos[self.turn] + step < self.board_size
+
+    def legal_moves(self):
+        # Same bounds as Game.can_move: every card in hand, either direction, staying on the board
+        if self.winner is not None:
+            return []
+        side = self.turn
+        position = self.pos[side]
+        hand = self.hands[side]
+        moves = []
+        for value in CARD_VALUES:
+            if hand[value]:
+                if position - value >= 0:
+                    moves.append(-value)
+                if position + value < self.board_size:
+                    moves.append(value)
+        return moves
+
+    def apply(self, step, draw=None):
+        # draw=None takes the top of the deck; search passes the value it is branching on instead
+        side = self.turn
+        value = abs(step)
+        hand = self.hands[side]
+        keys = HAND_KEYS[side]
+        h = self.hash
+
+        count = hand[value]
+        h ^= keys[value][count] ^ keys[value][count - 1]
+        hand[value] = count - 1
+        self.hand_size[side] -= 1
+
+        old = self.pos[side]
+        new = old + step
+        h ^= POSITION_KEYS[side][old] ^ POSITION_KEYS[side][new]
+        self.pos[side] = new
+
+        previous_winner = self.winner
+        drawn = 0
+        from_deck = False
+        if new == self.pos[1 - side]:
+            self.winner = side  # Landing on the opponent wins, no card is drawn
+        else:
+            if draw is None and self.deck:
+                draw = self.deck.popleft()
+                from_deck = True
+            if draw:
+                drawn = draw
+                deck_count = self.deck_counts[draw]
+                h ^= DECK_KEYS[draw][deck_count] ^ DECK_KEYS[draw][deck_count - 1]
+                self.deck_counts[draw] = deck_count - 1
+                count = hand[draw]
+                h ^= keys[draw][count] ^ keys[draw][count + 1]
+                hand[draw] = count + 1
+                self.hand_size[side] += 1
+
+        self.turn = 1 - side
+        self.hash = h ^ TURN_KEY
+        self.history.append((step, drawn, from_deck, previous_winner))
+        if self.winner is None:
+            self._check_exhausted()
+
+    def undo(self):
+        step, drawn, from_deck, previous_winner = self.history.pop()
+        side = 1 - self.turn
+        hand = self.hands[side]
+        keys = HAND_KEYS[side]
+        h = self.hash ^ TURN_KEY
+
+        if drawn:
+            count = hand[drawn]
+            h ^= keys[drawn][count] ^ keys[drawn][count - 1]
+            hand[drawn] = count - 1
+            self.hand_size[side] -= 1
+            deck_count = self.deck_counts[drawn]
+            h ^= DECK_KEYS[drawn][deck_count] ^ DECK_KEYS[drawn][deck_count + 1]
+            self.deck_counts[drawn] = deck_count + 1
+            if from_deck:
+                self.deck.appendleft(drawn)
+
+        new = self.pos[side]
+        old = new - step
+        h ^= POSITION_KEYS[side][new] ^ POSITION_KEYS[side][old]
+        self.pos[side] = old
+
+        value = abs(step)
+        count = hand[value]
+        h ^= keys[value][count] ^ keys[value][count + 1]
+        hand[value] = count + 1
+        self.hand_size[side] += 1
+
+        self.turn = side
+        self.winner = previous_winner
+        self.hash = h
+
+    def _check_exhausted(self):
+        # The side to move has nothing left to play: both hands are empty by then, so call it a draw
+        if self.winner is None and self.hand_size[self.turn] == 0:
+            self.winner = DRAW
+
+    def unseen_counts(self, side):
+        # Cards `side` cannot see: the deck plus the opponent's hand
+        other = self.hands[1 - side]
+        return [self.deck_counts[value] + other[value] for value in range(MAX_VALUE + 1)]
+
+
+def lethal_moves(state):
+    # Moves that land exactly on the opponent
+    target = state.pos[1 - state.turn] - state.pos[state.turn]
+    return [step for step in state.legal_moves() if step == target]
+
+
+def heuristic_move(state, rng=random):
+    # The original CPU: take a lethal card if there is one, otherwise play a random card towards the opponent
+    lethal = lethal_moves(state)
+    if lethal:
+        return lethal[0]
+    side = state.turn
+    hand = state.hands[side]
+    pick = rng.randrange(state.hand_size[side])  # Uniform over cards held, like random.randint on the hand list
+    for value in CARD_VALUES:
+        pick -= hand[value]
+        if pick < 0:
+            break
+    # cpu_move's rule, written for the CPU starting on the right and mirrored for the other side
+    forward = -1 if side == CPU else 1
+    me, other = state.pos[side], state.pos[1 - side]
+    backward_pos = me - forward * value
+    if 0 <= backward_pos < state.board_size and (backward_pos - other) * forward > 0:
+        return -forward * value  # Opponent is behind us: step back towards them without passing
+    if 0 <= me + forward * value < state.board_size:
+        return forward * value
+    return -forward * value  # Stepping forward would leave the board
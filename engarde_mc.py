@@ -0,0 +1,198 @@
+"""Monte Carlo En Garde CPU that spreads randomized playouts over a process pool.
+
+The Tk thread never waits on the pool: request() returns immediately and the chosen move comes back
+through root.after once every candidate is evaluated or the deadline passes.
+"""
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engarde_engine import CARD_VALUES, EngardeState, DRAW, heuristic_move, lethal_moves
+
+POLL_MS = 15  # How often the Tk thread checks for finished playout batches
+
+
+def sample_and_play(board_size, side, positions, own_hand, unseen, opp_size, step, rng):
+    # One playout: deal the opponent a random hand from the unseen pool, shuffle the rest into the deck,
+    # play `step`, then let both sides continue with the randomized heuristic
+    pool = [value for value in CARD_VALUES for _ in range(unseen[value])]
+    rng.shuffle(pool)
+    hands = [None, None]
+    hands[side] = [value for value in CARD_VALUES for _ in range(own_hand[value])]
+    hands[1 - side] = pool[:opp_size]
+    state = EngardeState(board_size, positions, hands, pool[opp_size:], turn=side)
+    state.apply(step)
+    while state.winner is None:
+        state.apply(heuristic_move(state, rng))
+    if state.winner == DRAW:
+        return 0.5
+    return 1.0 if state.winner == side else 0.0
+
+
+def run_playouts(board_size, side, positions, own_hand, unseen, opp_size, step, playouts, seed, deadline):
+    # Worker entry point; stops early once the wall-clock deadline has passed
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    score = 0.0
+    done = 0
+    while done < playouts:
+        score += sample_and_play(board_size, side, positions, own_hand, unseen, opp_size, step, rng)
+        done += 1
+        if not done & 63 and time.time() > deadline:
+            break
+    return step, score, done, time.perf_counter() - start
+
+
+class MonteCarloRequest:
+    # Handle for one asynchronous decision
+    def __init__(self, player, root, callback, futures, deadline, fallback):
+        self.player = player
+        self.root = root
+        self.callback = callback
+        self.futures = futures
+        self.deadline = deadline
+        self.fallback = fallback
+        self.results = {}  # step -> [score, playouts]
+        self.worker_time = 0.0
+        self.started = time.perf_counter()
+        self.cancelled = False
+        self.finished = False
+        self.after_id = root.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        # Drop the decision entirely; queued batches are cancelled, running ones stop at their deadline
+        self.cancelled = True
+        for future in self.futures:
+            future.cancel()
+        if not self.finished:
+            self.root.after_cancel(self.after_id)
+            self.finished = True
+
+    def _collect(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        step, score, done, elapsed = future.result()
+        totals = self.results.setdefault(step, [0.0, 0])
+        totals[0] += score
+        totals[1] += done
+        self.worker_time += elapsed
+
+    def _poll(self):
+        pending = []
+        for future in self.futures:
+            if future.done():
+                self._collect(future)
+            else:
+                pending.append(future)
+        self.futures = pending
+        if pending and time.time() < self.deadline:
+            self.after_id = self.root.after(POLL_MS, self._poll)
+            return
+        # Deadline passed: use whatever has come back
+        for future in pending:
+            future.cancel()
+        self.finished = True
+        move = self.player.pick(self.results, self.fallback, self.worker_time, time.perf_counter() - self.started)
+        if not self.cancelled:
+            self.callback(move)
+
+
+class MonteCarloPlayer:
+    def __init__(self, playouts=2000, budget_ms=1500, workers=None, verbose=False):
+        self.playouts = playouts  # Per candidate move
+        self.budget = budget_ms / 1000
+        self.workers = workers or os.cpu_count() or 1
+        self.verbose = verbose
+        self.executor = None
+        self.seed_rng = random.Random()
+        self.last = {}
+        self.total_playouts = 0
+        self.total_worker_time = 0.0
+
+    def _pool(self):
+        if self.executor is None:
+            # spawn, so workers don't inherit the Tk interpreter or any threads of the parent
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def warm_up(self):
+        # Start the worker processes ahead of the first decision
+        pool = self._pool()
+        for future in [pool.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _submit(self, state, deadline):
+        side = state.turn
+        args = (state.board_size, side, tuple(state.pos), state.hands[side][:], state.unseen_counts(side), state.hand_size[1 - side])
+        moves = state.legal_moves()
+        # Split every candidate into roughly one batch per core so a single move uses the whole pool
+        batches = max(1, self.workers // max(1, len(moves)) + 1)
+        per_batch = max(1, self.playouts // batches)
+        pool = self._pool()
+        futures = []
+        for step in moves:
+            for _ in range(batches):
+                futures.append(pool.submit(run_playouts, *args, step, per_batch, self.seed_rng.getrandbits(32), deadline))
+        return futures, moves[0]
+
+    def request(self, state, root, callback, budget_ms=None):
+        # Asynchronous choose(): callback(step) runs on the Tk thread via root.after
+        lethal = lethal_moves(state)
+        if lethal:
+            root.after(0, callback, lethal[0])
+            return None
+        deadline = time.time() + (budget_ms / 1000 if budget_ms is not None else self.budget)
+        futures, fallback = self._submit(state, deadline)
+        return MonteCarloRequest(self, root, callback, futures, deadline, fallback)
+
+    def choose(self, state):
+        # Blocking version for headless play
+        lethal = lethal_moves(state)
+        if lethal:
+            return lethal[0]
+        start = time.perf_counter()
+        deadline = time.time() + self.budget
+        futures, fallback = self._submit(state, deadline)
+        results = {}
+        worker_time = 0.0
+        for future in futures:
+            step, score, done, elapsed = future.result()
+            totals = results.setdefault(step, [0.0, 0])
+            totals[0] += score
+            totals[1] += done
+            worker_time += elapsed
+        return self.pick(results, fallback, worker_time, time.perf_counter() - start)
+
+    def pick(self, results, fallback, worker_time, wall_time):
+        move = fallback
+        best = -1.0
+        playouts = 0
+        for step, (score, done) in results.items():
+            playouts += done
+            if done and score / done > best:
+                move, best = step, score / done
+        self.total_playouts += playouts
+        self.total_worker_time += worker_time
+        self.last = {
+            "playouts": playouts,
+            "win_rate": best if best >= 0 else None,
+            "ms": wall_time * 1000,
+            "playouts_per_sec": playouts / wall_time if wall_time else 0.0,
+            "playouts_per_core_sec": playouts / worker_time if worker_time else 0.0,
+        }
+        if self.verbose:
+            print("CPU Monte Carlo: " + ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in self.last.items()))
+        return move
+
+    def stats(self):
+        return dict(self.last,
+                    workers=self.workers,
+                    total_playouts=self.total_playouts,
+                    overall_playouts_per_core_sec=self.total_playouts / self.total_worker_time if self.total_worker_time else 0.0)
@@ -0,0 +1,222 @@
+"""Self-play trained En Garde policy stored as a compact lookup table.
+
+    python engarde_policy.py train --iterations 20 --games 20000
+
+The table is indexed by an abstract state (distance to the opponent, the hand as a multiset, and how much
+of the deck is left). Each row ranks the ten actions "card value towards/away from the opponent", so playing
+is one row read plus a legality check. Training is Monte Carlo control: epsilon-greedy self-play games are
+spread over worker processes and every action is scored by the final result of its game.
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import time
+
+from engarde_engine import BOARD_SIZE, HAND_SIZE, CARD_VALUES, EngardeState, DRAW, heuristic_move, lethal_moves
+from engarde_tablebase import HANDS, HAND_RANKS
+
+POLICY_PATH = "engarde.policy"
+FORMAT_VERSION = 1
+MAGIC = b"ENGPOLCY"
+HEADER = struct.Struct("<8sHBBBB")  # magic, version, board size, hand size, actions, deck buckets
+DECK_BUCKETS = (1, 4, 8)  # Deck sizes where a new bucket starts: empty, 1-3, 4-7, 8 or more
+ACTIONS = 2 * len(CARD_VALUES)  # (value - 1) * 2 + 0 moves towards the opponent, + 1 away
+HAND_OFFSETS = [sum(len(hands) for hands in HANDS[:size]) for size in range(HAND_SIZE + 2)]
+
+
+def state_count(board_size):
+    return (len(DECK_BUCKETS) + 1) * HAND_OFFSETS[-1] * board_size
+
+
+def state_index(state, board_size=BOARD_SIZE):
+    # Abstract state of the side to move, or None if it doesn't fit the table
+    side = state.turn
+    hand = state.hands[side]
+    size = state.hand_size[side]
+    if size > HAND_SIZE or state.board_size != board_size:
+        return None
+    deck = len(state.deck)
+    bucket = sum(deck >= start for start in DECK_BUCKETS)
+    distance = abs(state.pos[1 - side] - state.pos[side])
+    return ((bucket * HAND_OFFSETS[-1]) + HAND_OFFSETS[size] + HAND_RANKS[size][tuple(hand)]) * board_size + distance
+
+
+def action_step(state, action):
+    # Signed step for an action, or None when it is illegal here
+    value = action // 2 + 1
+    side = state.turn
+    towards = 1 if state.pos[1 - side] > state.pos[side] else -1
+    step = value * (towards if action % 2 == 0 else -towards)
+    return step if state.is_legal(step) else None
+
+
+class PolicyTable:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.board_size, hand_size, actions, buckets = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} En Garde policy")
+        if (hand_size, actions, buckets) != (HAND_SIZE, ACTIONS, len(DECK_BUCKETS) + 1):
+            self._mm.close()
+            raise ValueError(f"{path} was trained for a different state abstraction")
+        if len(self._mm) != HEADER.size + state_count(self.board_size) * ACTIONS:
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+
+    def ranking(self, state):
+        index = state_index(state, self.board_size)
+        if index is None:
+            return None
+        offset = HEADER.size + index * ACTIONS
+        return self._mm[offset:offset + ACTIONS]
+
+    def close(self):
+        self._mm.close()
+
+
+class PolicyPlayer:
+    # CPU that plays straight from a trained PolicyTable
+    def __init__(self, path=POLICY_PATH, rng=random, table=None):
+        self.table = table or PolicyTable(path)  # Many players (e.g. server matches) can share one table
+        self.rng = rng
+        self.lookups = 0
+        self.fallbacks = 0
+
+    def choose(self, state):
+        lethal = lethal_moves(state)
+        if lethal:
+            return lethal[0]
+        ranking = self.table.ranking(state)
+        if ranking is not None:
+            self.lookups += 1
+            for action in ranking:
+                step = action_step(state, action)
+                if step is not None:
+                    return step
+        self.fallbacks += 1  # Outside the table, e.g. a bigger hand than it was trained for
+        return heuristic_move(state, self.rng)
+
+    def stats(self):
+        return {"lookups": self.lookups, "fallbacks": self.fallbacks}
+
+
+def write_policy(path, rankings, board_size=BOARD_SIZE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, board_size, HAND_SIZE, ACTIONS, len(DECK_BUCKETS) + 1))
+        out.write(rankings.astype("uint8").tobytes())
+    os.replace(tmp_path, path)
+
+
+# Training. NumPy is only needed here, not to play from the table.
+
+def _pick(state, rankings, epsilon, rng):
+    # rankings is the table body as bytes, laid out like the policy file
+    lethal = lethal_moves(state)
+    if lethal:
+        return lethal[0], None  # Always taken, so not worth learning
+    index = state_index(state)
+    if rng.random() < epsilon:
+        action = rng.randrange(ACTIONS)
+        while action_step(state, action) is None:
+            action = rng.randrange(ACTIONS)
+        return action_step(state, action), index * ACTIONS + action
+    for action in rankings[index * ACTIONS:(index + 1) * ACTIONS]:
+        step = action_step(state, action)
+        if step is not None:
+            return step, index * ACTIONS + action
+
+
+def self_play(rankings, games, epsilon, seed):
+    # Worker: epsilon-greedy games of the current policy against itself.
+    # Returns the visited state-action indices and the result (+1/0/-1) each one led to.
+    rng = random.Random(seed)
+    visited, results = [], []
+    for _ in range(games):
+        state = EngardeState.new_game(rng)
+        trace = ([], [])
+        while state.winner is None:
+            step, key = _pick(state, rankings, epsilon, rng)
+            if key is not None:
+                trace[state.turn].append(key)
+            state.apply(step)
+        for side in (0, 1):
+            result = 0 if state.winner == DRAW else 1 if state.winner == side else -1
+            visited += trace[side]
+            results += [result] * len(trace[side])
+    return visited, results
+
+
+def evaluate(rankings, games, seed):
+    # Worker: greedy policy against the heuristic CPU, alternating seats. Returns (wins, draws, losses).
+    rng = random.Random(seed)
+    tally = [0, 0, 0]
+    for game in range(games):
+        state = EngardeState.new_game(rng)
+        seat = game % 2
+        while state.winner is None:
+            if state.turn == seat:
+                state.apply(_pick(state, rankings, 0.0, rng)[0])
+            else:
+                state.apply(heuristic_move(state, rng))
+        tally[0 if state.winner == seat else 1 if state.winner == DRAW else 2] += 1
+    return tally
+
+
+def train(iterations=20, games=20000, epsilon=0.1, workers=None, seed=None, path=POLICY_PATH, eval_games=4000):
+    import numpy as np
+
+    workers = workers or os.cpu_count() or 1
+    seeds = random.Random(seed)
+    states = state_count(BOARD_SIZE)
+    score = np.zeros(states * ACTIONS)
+    visits = np.zeros(states * ACTIONS)
+    value = np.zeros((states, ACTIONS))
+    rankings = np.argsort(-value, axis=1, kind="stable").astype(np.uint8)
+    per_worker = max(1, games // workers)
+    with multiprocessing.Pool(workers) as pool:
+        for iteration in range(1, iterations + 1):
+            start = time.perf_counter()
+            jobs = [(rankings.tobytes(), per_worker, epsilon, seeds.getrandbits(32)) for _ in range(workers)]
+            for visited, results in pool.starmap(self_play, jobs):
+                np.add.at(score, visited, results)
+                np.add.at(visits, visited, 1)
+            value = (score / np.maximum(visits, 1)).reshape(states, ACTIONS)
+            value[visits.reshape(states, ACTIONS) == 0] = -2  # Untried actions rank last
+            rankings = np.argsort(-value, axis=1, kind="stable").astype(np.uint8)
+            jobs = [(rankings.tobytes(), max(2, eval_games // workers), seeds.getrandbits(32)) for _ in range(workers)]
+            wins, draws, losses = np.sum(pool.starmap(evaluate, jobs), axis=0)
+            played = wins + draws + losses
+            print(f"iteration {iteration}: {per_worker * workers} games in {time.perf_counter() - start:.1f}s, "
+                  f"{np.count_nonzero(visits) / visits.size:.1%} of the table visited, "
+                  f"vs heuristic {wins / played:.3f} won {draws / played:.3f} drawn")
+    write_policy(path, rankings)
+    return rankings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or inspect the En Garde self-play policy")
+    parser.add_argument("command", choices=["train", "info"])
+    parser.add_argument("--path", default=POLICY_PATH, help="policy file")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--games", type=int, default=20000, help="self-play games per iteration")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="exploration rate during self-play")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.iterations, args.games, args.epsilon, args.workers, args.seed, args.path)
+        print(f"Wrote {os.path.getsize(args.path) / 1024:.0f} KiB to {args.path}")
+    else:
+        table = PolicyTable(args.path)
+        print(f"{args.path}: board {table.board_size}, {state_count(table.board_size)} states x {ACTIONS} actions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Vectorised bulk simulation of En Garde games for balance work.
+
+    python engarde_sim.py --games 1000000 --board 23 --hand 5 --deck 1x5,2x5,3x5,4x5,5x5
+
+All games advance in lockstep, so the side to move is the same for every running game on each ply.
+"""
+import argparse
+import importlib
+import time
+
+import numpy as np
+
+from engarde_engine import BOARD_SIZE, DECK, HAND_SIZE, PLAYER, CPU, DRAW
+
+# A policy takes (rng, me, other, hand, hand_size, forward, board_size) for the running games and returns signed
+# steps. me/other are positions, hand is an (n, max value + 1) array of card counts, forward is +1 for the side
+# that started on the left and -1 for the other one.
+
+
+def heuristic_policy(rng, me, other, hand, hand_size, forward, board_size):
+    # engarde_engine.heuristic_move (the original cpu_move) for every game at once
+    value = np.argmax(np.cumsum(hand, axis=1) > rng.integers(0, hand_size)[:, None], axis=1)  # Uniform over cards held
+    backward_pos = me - forward * value
+    back = (backward_pos >= 0) & (backward_pos < board_size) & ((backward_pos - other) * forward > 0)
+    ahead = me + forward * value
+    steps = np.where(back | (ahead < 0) | (ahead >= board_size), -forward * value, forward * value)
+    target = other - me
+    distance = np.abs(target)
+    lethal = (distance < hand.shape[1]) & (hand[np.arange(len(me)), np.minimum(distance, hand.shape[1] - 1)] > 0)
+    return np.where(lethal, target, steps)
+
+
+def random_policy(rng, me, other, hand, hand_size, forward, board_size):
+    # Uniform over legal moves, like rng.choice(state.legal_moves())
+    values = np.arange(1, hand.shape[1])
+    held = hand[:, 1:] > 0
+    left = held & (me[:, None] - values >= 0)
+    right = held & (me[:, None] + values < board_size)
+    legal = np.concatenate([left, right], axis=1)
+    steps = np.concatenate([-values, values])
+    pick = np.argmax(legal * rng.random(legal.shape), axis=1)
+    return np.where(legal.any(axis=1), steps[pick], 0)  # 0 means stuck, only possible on tiny boards
+
+
+POLICIES = {
+    "heuristic": heuristic_policy,
+    "random": random_policy,
+}
+
+
+def load_policy(name):
+    # Either a name from POLICIES or "module:function" for a policy defined elsewhere
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown policy {name!r}, expected one of {sorted(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def parse_deck(text):
+    # "1x5,2x5,3" -> five 1s, five 2s and a single 3
+    deck = []
+    for item in text.split(","):
+        value, _, count = item.strip().partition("x")
+        deck += [int(value)] * int(count or 1)
+    return deck
+
+
+def simulate(games, player_policy=heuristic_policy, opponent_policy=heuristic_policy, board_size=BOARD_SIZE,
+             deck=DECK, hand_size=HAND_SIZE, seed=None):
+    deck = np.asarray(deck, dtype=np.int8)
+    if len(deck) < 2 * hand_size:
+        raise ValueError(f"a {len(deck)} card deck cannot deal two hands of {hand_size}")
+    if deck.min() < 1:
+        raise ValueError("card values must be at least 1")
+    rng = np.random.default_rng(seed)
+    width = int(deck.max()) + 1
+    decks = rng.permuted(np.tile(deck, (games, 1)), axis=1)
+    rows = np.arange(games)
+
+    hands = np.zeros((2, games, width), dtype=np.int8)
+    for side in (PLAYER, CPU):  # Dealt alternately, player first
+        np.add.at(hands[side], (np.repeat(rows, hand_size), decks[:, side:2 * hand_size:2].ravel()), 1)
+    hand_sizes = np.full((2, games), hand_size, dtype=np.int16)
+    positions = np.zeros((2, games), dtype=np.int16)
+    positions[CPU] = board_size - 1
+    cursor = np.full(games, 2 * hand_size, dtype=np.int16)  # Next card to draw
+    winner = np.full(games, -1, dtype=np.int8)
+    plies = np.zeros(games, dtype=np.int16)
+    stuck = 0
+
+    policies = (player_policy, opponent_policy)
+    forwards = (1, -1)
+    active = rows
+    side = PLAYER
+    while active.size:
+        other_side = 1 - side
+        me, other = positions[side, active], positions[other_side, active]
+        hand = hands[side, active]
+        steps = np.asarray(policies[side](rng, me, other, hand, hand_sizes[side, active], forwards[side], board_size), dtype=np.int16)
+
+        # A policy that cannot (or does not) make a legal move ends its game as a draw
+        values = np.abs(steps)
+        landing = me + steps
+        legal = (values > 0) & (values < width) & (landing >= 0) & (landing < board_size)
+        legal &= hand[np.arange(active.size), np.minimum(values, width - 1)] > 0
+        if not legal.all():
+            stuck += int((~legal).sum())
+            winner[active[~legal]] = DRAW
+            active, steps, values, landing = active[legal], steps[legal], values[legal], landing[legal]
+            other = other[legal]
+
+        hands[side, active, values] -= 1
+        positions[side, active] = landing
+        plies[active] += 1
+        hit = landing == other
+        winner[active[hit]] = side
+
+        # Everyone else draws from their own deck if it has cards left
+        drawing = active[~hit]
+        has_card = cursor[drawing] < len(deck)
+        drawing = drawing[has_card]
+        hands[side, drawing, decks[drawing, cursor[drawing]]] += 1
+        cursor[drawing] += 1
+        hand_sizes[side, active[~hit]] -= 1
+        hand_sizes[side, drawing] += 1
+
+        active = active[~hit]
+        exhausted = hand_sizes[other_side, active] == 0  # The next side has nothing to play
+        winner[active[exhausted]] = DRAW
+        active = active[~exhausted]
+        side = other_side
+
+    first, second = float(np.mean(winner == PLAYER)), float(np.mean(winner == CPU))
+    return {
+        "games": games,
+        "stuck": stuck,
+        "player_win_rate": first,  # The player always moves first
+        "cpu_win_rate": second,
+        "draw_rate": float(np.mean(winner == DRAW)),
+        "first_player_advantage": first - second,
+        "deck_ran_out_rate": float(np.mean(cursor == len(deck))),
+        "mean_length": float(plies.mean()),
+        "length_histogram": np.bincount(plies).tolist(),  # index = plies played in the game
+    }
+
+
+def print_report(stats, elapsed):
+    print(f"{stats['games']} games in {elapsed:.2f}s ({stats['games'] / elapsed:,.0f} games/s)")
+    if stats["stuck"]:
+        print(f"Stuck games:          {stats['stuck']} (no legal move, counted as draws)")
+    print(f"Player win rate:      {stats['player_win_rate']:.4f}")
+    print(f"CPU win rate:         {stats['cpu_win_rate']:.4f}")
+    print(f"Draw rate:            {stats['draw_rate']:.4f}")
+    print(f"First-player edge:    {stats['first_player_advantage']:+.4f}")
+    print(f"Deck ran out:         {stats['deck_ran_out_rate']:.4f}")
+    print(f"Mean game length:     {stats['mean_length']:.2f} plies")
+    print("Game length distribution:")
+    for length, count in enumerate(stats["length_histogram"]):
+        if count:
+            print(f"  {length:3d} plies: {count / stats['games']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate En Garde games in bulk")
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--board", type=int, default=BOARD_SIZE, help="number of cells")
+    parser.add_argument("--hand", type=int, default=HAND_SIZE, help="cards in each hand")
+    parser.add_argument("--deck", type=parse_deck, default=DECK, help="card values, e.g. 1x5,2x5,3x5,4x5,5x5")
+    parser.add_argument("--player", default="heuristic", help="policy for the side that moves first")
+    parser.add_argument("--opponent", default="heuristic", help="policy for the CPU side")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = simulate(args.games, load_policy(args.player), load_policy(args.opponent), args.board, args.deck, args.hand, args.seed)
+    print_report(stats, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
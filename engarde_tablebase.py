@@ -0,0 +1,244 @@
+"""Retrograde-analysis endgame tablebase for En Garde.
+
+Once the deck is empty nothing is hidden any more: the unseen cards are exactly the opponent's hand. Every
+such position is solved backwards from the last card and stored as one signed byte. Build it once with
+
+    python engarde_tablebase.py build
+
+Positions are seen from the side to move, with the board mirrored so that side is always on the left.
+A value of WIN_SCORE - n is a win in n plies, -(WIN_SCORE - n) a loss in n plies, and 0 a draw.
+"""
+import argparse
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+
+from engarde_engine import BOARD_SIZE, HAND_SIZE, CARD_VALUES, MAX_VALUE
+
+TABLEBASE_PATH = "engarde.tb"
+FORMAT_VERSION = 1
+MAGIC = b"ENGARDTB"
+HEADER = struct.Struct("<8sHBBB")  # magic, version, board size, hand size, max cards left in both hands
+WIN_SCORE = 100
+
+
+def hand_multisets(size):
+    # Every hand of `size` cards as a tuple of per-value counts, indexed like EngardeState.hands
+    hands = []
+    for combo in itertools.combinations_with_replacement(CARD_VALUES, size):
+        counts = [0] * (MAX_VALUE + 1)
+        for value in combo:
+            counts[value] += 1
+        hands.append(tuple(counts))
+    return hands
+
+
+HANDS = [hand_multisets(size) for size in range(HAND_SIZE + 1)]
+HAND_RANKS = [{hand: rank for rank, hand in enumerate(hands)} for hands in HANDS]
+
+
+def layers(max_cards, hand_size=HAND_SIZE):
+    # (mover cards, opponent cards) blocks in file order. With the deck empty the side to move holds
+    # the same number of cards as the opponent or one more, and every move spends a card.
+    return [(a, b) for total in range(1, max_cards + 1) for a in range(1, hand_size + 1)
+            for b in (a - 1, a) if a + b == total]
+
+
+def position_pairs(board_size):
+    # Canonical (mover, opponent) positions: mover strictly left of the opponent
+    return [(me, op) for me in range(board_size) for op in range(me + 1, board_size)]
+
+
+def layer_offsets(board_size, max_cards, hand_size=HAND_SIZE):
+    pairs = len(position_pairs(board_size))
+    offsets = {}
+    offset = HEADER.size
+    for a, b in layers(max_cards, hand_size):
+        offsets[(a, b)] = offset
+        offset += len(HANDS[a]) * len(HANDS[b]) * pairs
+    return offsets, offset
+
+
+def parent_score(child):
+    # Score of a move for the mover, given the score of the resulting position for the opponent
+    score = -child
+    return score - 1 if score > 0 else score + 1 if score < 0 else 0
+
+
+class Tablebase:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.board_size, self.hand_size, self.max_cards = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} En Garde tablebase")
+        self.offsets, size = layer_offsets(self.board_size, self.max_cards, self.hand_size)
+        if len(self._mm) != size:
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+        pairs = position_pairs(self.board_size)
+        self.pairs = len(pairs)
+        self.pair_index = {pair: i for i, pair in enumerate(pairs)}
+        self.probes = 0
+
+    @classmethod
+    def open_if_present(cls, path=TABLEBASE_PATH):
+        # The tablebase, or None when the CPU has to think for itself in the endgame too
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring tablebase: {e}")
+            return None
+
+    def lookup(self, hand, other, me, op):
+        # Score for the side to move holding `hand` at `me`, against `other` at `op`; None outside the table
+        a, b = sum(hand), sum(other)
+        if a == 0:
+            return 0  # Nothing left to play
+        offset = self.offsets.get((a, b))
+        if offset is None:
+            return None
+        if me > op:
+            me, op = self.board_size - 1 - me, self.board_size - 1 - op
+        index = (HAND_RANKS[a][tuple(hand)] * len(HANDS[b]) + HAND_RANKS[b][tuple(other)]) * self.pairs + self.pair_index[(me, op)]
+        self.probes += 1
+        value = self._mm[offset + index]
+        return value - 256 if value > 127 else value
+
+    def covers(self, state):
+        return (not state.deck and state.winner is None and state.board_size == self.board_size
+                and (state.hand_size[state.turn], state.hand_size[1 - state.turn]) in self.offsets)
+
+    def value(self, state):
+        if not self.covers(state):
+            return None
+        side = state.turn
+        return self.lookup(state.hands[side], state.unseen_counts(side), state.pos[side], state.pos[1 - side])
+
+    def best_move(self, state):
+        # Perfect move for the side to move, or None when the position is not in the table
+        if not self.covers(state):
+            return None
+        side = state.turn
+        hand = state.hands[side][:]
+        other = state.unseen_counts(side)  # With the deck empty this is exactly the opponent's hand
+        me, op = state.pos[side], state.pos[1 - side]
+        best_move, best_score = None, None
+        for step in state.legal_moves():
+            if me + step == op:
+                return step
+            value = abs(step)
+            hand[value] -= 1
+            child = self.lookup(other, hand, op, me + step)
+            hand[value] += 1
+            if child is None:
+                return None
+            score = parent_score(child)
+            if best_score is None or score > best_score:
+                best_move, best_score = step, score
+        return best_move
+
+    def close(self):
+        self._mm.close()
+
+
+# Generator. NumPy is only needed to build the table, not to probe it.
+
+def _solve_rows(a, b, successor, rows, board_size):
+    # Solve mover hands `rows` of layer (a, b). successor is the solved (b, a - 1) layer as a full
+    # [hand, opponent hand, position, opponent position] grid, or None when the opponent has no cards left.
+    import numpy as np
+
+    shape = (len(HANDS[b]), board_size, board_size)
+    if successor is None:
+        moved = np.zeros((len(HANDS[a - 1]),) + shape, dtype=np.int16)
+    else:
+        # Re-index to [our hand after the move, opponent hand, our new position, opponent position], as our score
+        moved = -successor.transpose(1, 0, 3, 2).astype(np.int16)
+        moved -= np.sign(moved)
+    me = np.arange(board_size)
+    result = np.empty((len(rows),) + shape, dtype=np.int8)
+    for out, rank in enumerate(rows):
+        hand = HANDS[a][rank]
+        best = np.full(shape, -WIN_SCORE, dtype=np.int16)
+        for value in CARD_VALUES:
+            if not hand[value]:
+                continue
+            after = list(hand)
+            after[value] -= 1
+            scores = moved[HAND_RANKS[a - 1][tuple(after)]]
+            for step in (value, -value):
+                candidate = np.full(shape, -WIN_SCORE, dtype=np.int16)
+                if step > 0:
+                    candidate[:, :board_size - step] = scores[:, step:]
+                else:
+                    candidate[:, -step:] = scores[:, :board_size + step]
+                landing = me + step
+                valid = (landing >= 0) & (landing < board_size)
+                candidate[:, me[valid], landing[valid]] = WIN_SCORE - 1  # Landing on the opponent
+                np.maximum(best, candidate, out=best)
+        best[:, me, me] = 0  # Both on one cell never happens; keep the byte tidy
+        result[out] = best
+    return result
+
+
+def build_tablebase(path=TABLEBASE_PATH, max_cards=2 * HAND_SIZE, board_size=BOARD_SIZE, workers=None, verbose=True):
+    import numpy as np
+
+    workers = workers or os.cpu_count() or 1
+    pairs = position_pairs(board_size)
+    me_index = np.array([me for me, op in pairs])
+    op_index = np.array([op for me, op in pairs])
+    offsets, size = layer_offsets(board_size, max_cards)
+    previous = None  # The last solved layer as a full grid
+    tmp_path = path + ".tmp"
+    with multiprocessing.Pool(workers) as pool, open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, board_size, HAND_SIZE, max_cards))
+        # Each layer only depends on the one with a card less, so it is split over the workers by mover hand
+        for a, b in layers(max_cards):
+            start = time.perf_counter()
+            successor = previous if b else None  # (b, a - 1), solved just before this one
+            ranks = list(range(len(HANDS[a])))
+            chunk = max(1, -(-len(ranks) // workers))
+            jobs = [(a, b, successor, ranks[i:i + chunk], board_size) for i in range(0, len(ranks), chunk)]
+            grid = np.concatenate(pool.starmap(_solve_rows, jobs))
+            previous = grid
+            assert out.tell() == offsets[(a, b)]
+            out.write(np.ascontiguousarray(grid[:, :, me_index, op_index]).tobytes())
+            if verbose:
+                print(f"layer {a}+{b} cards: {grid.shape[0] * grid.shape[1] * len(pairs)} positions in {time.perf_counter() - start:.2f}s")
+        assert out.tell() == size
+    os.replace(tmp_path, path)  # Never leave a half-written table where the game looks for it
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the En Garde endgame tablebase")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--path", default=TABLEBASE_PATH, help="tablebase file")
+    parser.add_argument("--max-cards", type=int, default=2 * HAND_SIZE,
+                        help="solve positions with at most this many cards left in both hands (deck empty)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        size = build_tablebase(args.path, args.max_cards, workers=args.workers)
+        print(f"Wrote {size / 1024 / 1024:.1f} MiB to {args.path} in {time.perf_counter() - start:.1f}s")
+    else:
+        tablebase = Tablebase.open_if_present(args.path)
+        if tablebase is None:
+            print(f"{args.path} is missing or unreadable")
+            raise SystemExit(1)
+        print(f"{args.path}: board {tablebase.board_size}, up to {tablebase.max_cards} cards in hand, "
+              f"{len(tablebase.offsets)} layers")
+
+
+if __name__ == "__main__":
+    main()
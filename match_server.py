@@ -0,0 +1,570 @@
+"""Headless multi-match server for LoliRPS and En Garde, plus a load generator for it.
+
+    python match_server.py serve --port 8765          # or --unix /tmp/mojo.sock
+    python match_server.py load --port 8765 --matches 5000 --concurrency 1000
+
+The protocol is one JSON object per line in each direction. Requests carry an "op" and may carry a "req"
+value, which is echoed in the response so a client can have many requests in flight:
+
+    {"op": "new", "game": "rps", "cpu": "adaptive", "player": "alice", "seed": 7, "req": 1}
+    {"op": "new", "game": "engarde", "cpu": "search", "difficulty": "normal"}
+    {"op": "move", "match": 12, "move": "rock"}        # En Garde: a signed step, e.g. -3
+    {"op": "quit", "match": 12}
+    {"op": "stats"}
+
+Every response has "ok", and "error" when it is false. Move responses carry both moves, the new state and,
+once the game is over, "winner" (after which the match is gone). A match that sees no request for
+--idle-timeout seconds is dropped with an unsolicited {"event": "expired", "match": id}.
+
+Each connection reads at most MAX_INFLIGHT requests ahead and waits for the client to drain its responses,
+so a slow or flooding client only ever holds a bounded amount of server memory. Search CPU moves run in a
+process pool; every other CPU answers in microseconds and runs inline. Adaptive RPS profiles are read and
+written on a thread, one write per profile at a time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from rps_engine import MOVES, Match, get_random_move
+from engarde_engine import EngardeState, PLAYER, CPU, DRAW
+from engarde_ai import DIFFICULTY, HeuristicPlayer, SearchPlayer
+from engarde_policy import POLICY_PATH, PolicyPlayer, PolicyTable
+from engarde_tablebase import TABLEBASE_PATH, Tablebase
+from replay import session_seed
+
+MAX_LINE = 4096  # Longest request line accepted
+MAX_INFLIGHT = 32  # Requests per connection being handled at once before the server stops reading
+WRITE_BUFFER = 64 * 1024  # Unsent bytes per connection before responses wait for the client
+MAX_MATCHES = 20000
+MAX_MATCHES_PER_CONNECTION = 2000
+IDLE_TIMEOUT_S = 60
+CPU_TIMEOUT_S = 5  # An offloaded move that takes longer falls back to the heuristic
+
+RPS_CPUS = ("random", "adaptive")
+ENGARDE_CPUS = ("heuristic", "search", "policy")
+WINNERS = {PLAYER: "player", CPU: "cpu", DRAW: "draw"}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def text_field(message, key, default=None):
+    # A string request field; anything else (a list, a number, ...) is the client's error, not a crash
+    value = message.get(key, default)
+    if value is not None and type(value) is not str:
+        raise ProtocolError(f"{key} must be a string")
+    return value
+
+
+_search_players = {}  # Per worker process, by difficulty, so the transposition table outlives single moves
+
+
+def search_move(difficulty, state):
+    # Worker: one SearchPlayer move
+    player = _search_players.get(difficulty)
+    if player is None:
+        player = _search_players[difficulty] = SearchPlayer.for_difficulty(difficulty)
+    return player.choose(state)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+class RpsMatch:
+    game = "rps"
+
+    def __init__(self, cpu, rng, opponent=None, profile=None):
+        # opponent: an AdaptiveOpponent already loaded from profile, which the server saves it back to at the end
+        if cpu not in RPS_CPUS:
+            raise ProtocolError(f"RPS cpu must be one of {RPS_CPUS}")
+        self.match = Match()
+        self.rng = rng
+        self.busy = False  # RPS answers inline, so never set
+        self.cpu = None
+        self.profile = profile
+        if cpu == "adaptive":
+            from rps_opponent import AdaptiveOpponent
+            self.cpu = opponent or AdaptiveOpponent(rng)
+
+    @property
+    def over(self):
+        return self.match.over
+
+    def winner(self):
+        return "player" if self.match.winner == 1 else "cpu"
+
+    def play(self, move):
+        if type(move) is not str or move not in MOVES:
+            raise ProtocolError(f"move must be one of {MOVES}")
+        cpu = self.cpu.choose() if self.cpu else get_random_move(self.rng)
+        winner = self.match.play_round(move, cpu)
+        if self.cpu:
+            self.cpu.observe(move, cpu)
+        return {"you": move, "cpu": cpu, "round": {None: "tie", 1: "player", 2: "cpu"}[winner]}
+
+    def view(self):
+        return {"hp": self.match.hp, "rounds": self.match.rounds}
+
+
+class EngardeMatch:
+    game = "engarde"
+
+    def __init__(self, cpu, rng, difficulty="normal", policy_table=None):
+        if cpu not in ENGARDE_CPUS:
+            raise ProtocolError(f"En Garde cpu must be one of {ENGARDE_CPUS}")
+        if difficulty not in DIFFICULTY:
+            raise ProtocolError(f"difficulty must be one of {tuple(DIFFICULTY)}")
+        self.state = EngardeState.new_game(rng)
+        self.busy = False  # Set while the CPU's answer is pending, so a second move can't slip in
+        self.offload = cpu == "search"
+        self.difficulty = difficulty
+        # Inline player: the CPU itself, or the fallback for a search that timed out
+        self.player = PolicyPlayer(rng=rng, table=policy_table) if cpu == "policy" else HeuristicPlayer(rng)
+
+    @property
+    def over(self):
+        return self.state.winner is not None
+
+    def winner(self):
+        return WINNERS[self.state.winner]
+
+    def play(self, step):
+        if type(step) is not int or not self.state.is_legal(step):  # Not isinstance: JSON true would pass as 1
+            raise ProtocolError(f"{step!r} is not a legal move, expected one of {self.state.legal_moves()}")
+        self.state.apply(step)
+        return {"you": step}
+
+    def view(self):
+        state = self.state
+        return {
+            "pos": state.pos,
+            "hand": state.hand_values(PLAYER),
+            "cpu_cards": state.hand_size[CPU],
+            "deck": len(state.deck),
+            "legal": state.legal_moves() if state.turn == PLAYER else [],
+        }
+
+
+class Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.write_lock = asyncio.Lock()
+        self.inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        self.matches = set()
+        self.closed = False
+
+    async def send(self, message):
+        if self.closed:
+            return
+        data = json.dumps(message, separators=(",", ":")).encode() + b"\n"
+        async with self.write_lock:
+            self.writer.write(data)
+            await self.writer.drain()  # Waits while the client isn't reading, so its backlog stays bounded
+
+
+class MatchServer:
+    def __init__(self, idle_timeout=IDLE_TIMEOUT_S, max_matches=MAX_MATCHES, workers=None,
+                 tablebase_path=TABLEBASE_PATH, policy_path=POLICY_PATH):
+        self.idle_timeout = idle_timeout
+        self.max_matches = max_matches
+        self.workers = workers or os.cpu_count() or 1
+        self.tablebase = Tablebase.open_if_present(tablebase_path)
+        self.policy_table = PolicyTable(policy_path) if os.path.exists(policy_path) else None
+        self.executor = None
+        self.matches = {}  # id -> (match, connection)
+        self.timers = {}  # id -> idle timer handle
+        self.profile_locks = weakref.WeakValueDictionary()  # Profile path -> asyncio.Lock, while anyone uses it
+        self.next_id = 1
+        self.counters = dict.fromkeys(("connections", "started", "finished", "expired", "quit", "rejected",
+                                       "moves", "offloaded", "cpu_timeouts", "errors"), 0)
+
+    async def start(self):
+        # Spawn the search workers up front so the first search move doesn't pay for it
+        loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+        if self.tablebase:
+            self.tablebase.close()
+        if self.policy_table:
+            self.policy_table.close()
+
+    async def serve_connection(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        conn = Connection(writer)
+        self.counters["connections"] += 1
+        tasks = set()
+        try:
+            while True:
+                await conn.inflight.acquire()  # Too many requests in progress: stop reading until one finishes
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await conn.send({"ok": False, "error": f"request longer than {MAX_LINE} bytes"})
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self._request(conn, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            conn.closed = True
+            for task in tasks:
+                task.cancel()
+            for match_id in list(conn.matches):
+                self._end(match_id)
+            writer.close()
+
+    async def _request(self, conn, line):
+        try:
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError
+            except ValueError:
+                message = {}
+                response = {"ok": False, "error": "expected one JSON object per line"}
+            else:
+                try:
+                    response = await self.handle(conn, message)
+                except ProtocolError as e:
+                    response = {"ok": False, "error": str(e)}
+                except Exception as e:
+                    # A bug, but the client still gets an answer for its req rather than waiting forever
+                    print(f"Error handling {message!r}: {e!r}")
+                    response = {"ok": False, "error": "internal server error"}
+            if not response["ok"]:
+                self.counters["errors"] += 1
+            if "req" in message:
+                response["req"] = message["req"]
+            await conn.send(response)
+        except ConnectionError:
+            pass  # The client went away; serve_connection cleans up
+        finally:
+            conn.inflight.release()
+
+    async def handle(self, conn, message):
+        op = text_field(message, "op")
+        if op == "new":
+            return await self._new(conn, message)
+        if op == "move":
+            return await self._move(conn, message)
+        if op == "quit":
+            match_id = self._owned(conn, message)
+            self._end(match_id)
+            self.counters["quit"] += 1
+            return {"ok": True, "match": match_id}
+        if op == "stats":
+            return {"ok": True, "active": len(self.matches), **self.counters}
+        raise ProtocolError(f"unknown op {op!r}, expected new, move, quit or stats")
+
+    def _check_capacity(self, conn):
+        if len(self.matches) >= self.max_matches or len(conn.matches) >= MAX_MATCHES_PER_CONNECTION:
+            self.counters["rejected"] += 1
+            raise ProtocolError("server full, try again later")
+
+    async def _new(self, conn, message):
+        self._check_capacity(conn)
+        seed = message.get("seed")
+        if seed is not None and type(seed) is not int:
+            raise ProtocolError("seed must be an integer")
+        rng = random.Random(session_seed(seed))
+        game = text_field(message, "game")
+        if game == "rps":
+            cpu, player = text_field(message, "cpu", "random"), text_field(message, "player")
+            if cpu == "adaptive" and player:
+                profile = self._profile_path(player)
+                opponent = await self._load_profile(profile, rng)
+                self._check_capacity(conn)  # Others may have filled the server while the profile was read
+                match = RpsMatch(cpu, rng, opponent, profile)
+            else:
+                match = RpsMatch(cpu, rng)
+        elif game == "engarde":
+            cpu = text_field(message, "cpu", "heuristic")
+            if cpu == "policy" and self.policy_table is None:
+                raise ProtocolError("the server has no policy file")
+            match = EngardeMatch(cpu, rng, text_field(message, "difficulty", "normal"), self.policy_table)
+        else:
+            raise ProtocolError("game must be rps or engarde")
+        match_id = self.next_id
+        self.next_id += 1
+        self.matches[match_id] = (match, conn)
+        conn.matches.add(match_id)
+        self._touch(match_id)
+        self.counters["started"] += 1
+        return {"ok": True, "match": match_id, "game": match.game, "state": match.view()}
+
+    def _profile_path(self, player):
+        from rps_opponent import profile_path
+        try:
+            return profile_path(player)
+        except ValueError as e:
+            raise ProtocolError(str(e))
+
+    def _profile_lock(self, path):
+        lock = self.profile_locks.get(path)
+        if lock is None:
+            lock = self.profile_locks[path] = asyncio.Lock()
+        return lock
+
+    async def _load_profile(self, path, rng):
+        # File I/O runs on the default thread pool so the event loop keeps serving other matches
+        from rps_opponent import AdaptiveOpponent
+        async with self._profile_lock(path):
+            return await asyncio.get_running_loop().run_in_executor(None, AdaptiveOpponent.load, path, rng)
+
+    async def _save_profile(self, match):
+        # One write per profile at a time, so two matches of the same player can't clobber each other's file
+        async with self._profile_lock(match.profile):
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, match.cpu.save, match.profile)
+            except OSError as e:
+                print(f"Could not save opponent profile {match.profile}: {e}")
+
+    def _owned(self, conn, message):
+        match_id = message.get("match")
+        if type(match_id) is not int:
+            raise ProtocolError("match must be an integer")
+        entry = self.matches.get(match_id)
+        if entry is None or entry[1] is not conn:
+            raise ProtocolError(f"no match {match_id!r} on this connection")
+        return match_id
+
+    async def _move(self, conn, message):
+        match_id = self._owned(conn, message)
+        match = self.matches[match_id][0]
+        if match.busy:
+            raise ProtocolError("the previous move is still being answered")
+        self._touch(match_id)
+        response = {"ok": True, "match": match_id}
+        response.update(match.play(message.get("move")))
+        self.counters["moves"] += 1
+        if match.game == "engarde" and not match.over:
+            match.busy = True
+            try:
+                response["cpu"] = await self._engarde_cpu_move(match)
+            finally:
+                match.busy = False
+            if match_id not in self.matches:
+                raise ProtocolError("match expired while the CPU was thinking")
+        response["state"] = match.view()
+        if match.over:
+            response["winner"] = match.winner()
+            self._end(match_id)
+            self.counters["finished"] += 1
+            if match.game == "rps" and match.profile:
+                await self._save_profile(match)
+        return response
+
+    async def _engarde_cpu_move(self, match):
+        state = match.state
+        move = self.tablebase.best_move(state) if self.tablebase else None
+        if move is None and match.offload:
+            loop = asyncio.get_running_loop()
+            try:
+                move = await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, search_move, match.difficulty, state.copy()), CPU_TIMEOUT_S)
+                self.counters["offloaded"] += 1
+            except asyncio.TimeoutError:
+                self.counters["cpu_timeouts"] += 1
+        if move is None:
+            move = match.player.choose(state)
+        state.apply(move)
+        return move
+
+    def _touch(self, match_id):
+        timer = self.timers.get(match_id)
+        if timer:
+            timer.cancel()
+        self.timers[match_id] = asyncio.get_running_loop().call_later(self.idle_timeout, self._expire, match_id)
+
+    def _expire(self, match_id):
+        entry = self.matches.get(match_id)
+        if entry is None:
+            return
+        self._end(match_id)
+        self.counters["expired"] += 1
+        asyncio.create_task(self._notify(entry[1], {"event": "expired", "match": match_id}))
+
+    async def _notify(self, conn, message):
+        try:
+            await conn.send(message)
+        except ConnectionError:
+            pass
+
+    def _end(self, match_id):
+        match, conn = self.matches.pop(match_id)
+        conn.matches.discard(match_id)
+        timer = self.timers.pop(match_id, None)
+        if timer:
+            timer.cancel()
+
+
+async def serve(args):
+    server = MatchServer(args.idle_timeout, args.max_matches, args.workers, args.tablebase, args.policy)
+    await server.start()
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.serve_connection, args.unix, limit=MAX_LINE)
+        where = args.unix
+    else:
+        listener = await asyncio.start_server(server.serve_connection, args.host, args.port, limit=MAX_LINE)
+        where = f"{args.host}:{args.port}"
+    print(f"Serving matches on {where} ({server.workers} search workers)")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+# Load generator
+
+class Client:
+    # One connection with any number of requests in flight, matched to responses by "req"
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_req = 0
+        self.expired = 0
+        self.reading = asyncio.create_task(self._read())
+
+    async def call(self, message):
+        self.next_req += 1
+        message["req"] = self.next_req
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_req] = future
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                future = self.pending.pop(message.get("req"), None)
+                if future:
+                    future.set_result(message)
+                elif message.get("event") == "expired":
+                    self.expired += 1
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("server closed the connection"))
+
+    async def close(self):
+        self.writer.close()
+        await self.reading
+
+
+async def play_match(client, game, cpu, rng, latencies):
+    response = await client.call({"op": "new", "game": game, "cpu": cpu, "seed": rng.getrandbits(32)})
+    if not response["ok"]:
+        raise ProtocolError(response["error"])
+    match_id, state = response["match"], response["state"]
+    moves = 0
+    while True:
+        move = rng.choice(MOVES) if game == "rps" else rng.choice(state["legal"])
+        start = time.perf_counter()
+        response = await client.call({"op": "move", "match": match_id, "move": move})
+        latencies.append(time.perf_counter() - start)
+        if not response["ok"]:
+            raise ProtocolError(response["error"])
+        moves += 1
+        state = response["state"]
+        if "winner" in response:
+            return moves
+
+
+async def load(args):
+    clients = []
+    for _ in range(args.connections):
+        if args.unix:
+            reader, writer = await asyncio.open_unix_connection(args.unix)
+        else:
+            reader, writer = await asyncio.open_connection(args.host, args.port)
+        clients.append(Client(reader, writer))
+    games = ["rps", "engarde"] if args.game == "mixed" else [args.game]
+    cpus = {"rps": args.rps_cpu, "engarde": args.engarde_cpu}
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    errors = []
+    rng = random.Random(args.seed)
+
+    async def one(number):
+        async with slots:
+            game = games[number % len(games)]
+            try:
+                return await play_match(clients[number % len(clients)], game, cpus[game],
+                                        random.Random(rng.getrandbits(32)), latencies)
+            except (ProtocolError, ConnectionError) as e:
+                errors.append(str(e))
+                return 0
+
+    start = time.perf_counter()
+    moves = sum(await asyncio.gather(*(one(number) for number in range(args.matches))))
+    elapsed = time.perf_counter() - start
+    stats = await clients[0].call({"op": "stats"})
+    for client in clients:
+        await client.close()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+    print(f"{args.matches - len(errors)} matches ({args.game}) over {args.connections} connections, "
+          f"up to {args.concurrency} at once, in {elapsed:.2f}s")
+    print(f"  {(args.matches - len(errors)) / elapsed:.0f} matches/s, {moves / elapsed:.0f} moves/s")
+    print(f"  move latency: p50 {percentile(0.5):.2f} ms, p99 {percentile(0.99):.2f} ms, max {percentile(1):.2f} ms")
+    print(f"  errors: {len(errors)}" + (f" (first: {errors[0]})" if errors else "")
+          + f", expired: {sum(client.expired for client in clients)}")
+    print(f"  server: {stats['active']} active, {stats['started']} started, {stats['offloaded']} offloaded moves, "
+          f"{stats['cpu_timeouts']} CPU timeouts, {stats['rejected']} rejected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve headless LoliRPS and En Garde matches, or load-test a server")
+    parser.add_argument("command", choices=["serve", "load"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="use a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="serve: processes for search CPU moves (default: all cores)")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT_S, help="serve: seconds before an idle match is dropped")
+    parser.add_argument("--max-matches", type=int, default=MAX_MATCHES, help="serve: concurrent matches before new ones are refused")
+    parser.add_argument("--tablebase", default=TABLEBASE_PATH, help="serve: En Garde endgame tablebase (skipped if missing)")
+    parser.add_argument("--policy", default=POLICY_PATH, help="serve: policy file for the policy CPU (skipped if missing)")
+    parser.add_argument("--matches", type=int, default=2000, help="load: matches to play")
+    parser.add_argument("--concurrency", type=int, default=500, help="load: matches in progress at once")
+    parser.add_argument("--connections", type=int, default=20, help="load: connections to spread them over")
+    parser.add_argument("--game", choices=["rps", "engarde", "mixed"], default="mixed", help="load: which game to play")
+    parser.add_argument("--rps-cpu", choices=RPS_CPUS, default="random", help="load: CPU for RPS matches")
+    parser.add_argument("--engarde-cpu", choices=ENGARDE_CPUS, default="heuristic", help="load: CPU for En Garde matches")
+    parser.add_argument("--seed", type=int, default=0, help="load: seed for the generated moves")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args) if args.command == "serve" else load(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Opt-in event-loop profiling for both games.
+
+Times every Tk callback (key bindings, button commands, after() callbacks) plus any functions handed to
+instrument(), measures how late the event loop gets round to a heartbeat, and tracks animation frame
+intervals. Every interval the histograms are written as one JSON line and/or shown in an overlay, then reset.
+"""
+import functools
+import json
+import time
+import tkinter as tk
+
+FRAME_BUDGET_MS = 16
+HEARTBEAT_MS = 50  # Expected spacing of the stall probe
+BUCKETS_MS = (1, 2, 4, 8, 16, 32, 64, 128, 256)  # Upper bounds; anything slower lands in the last bucket
+INTERNAL = ("_heartbeat", "_periodic")  # The profiler's own after() callbacks, not worth reporting
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        bucket = 0
+        while bucket < len(BUCKETS_MS) and ms > BUCKETS_MS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def over(self, budget_ms):
+        return sum(count for bound, count in zip(BUCKETS_MS + (float("inf"),), self.counts) if bound > budget_ms)
+
+    def snapshot(self, budget_ms):
+        labels = [f"<={bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "max_ms": round(self.max, 3),
+            "over_budget": self.over(budget_ms),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+def callback_name(wrapper):
+    # A readable name for whatever Tk is about to call
+    func = wrapper.func
+    qualname = getattr(func, "__qualname__", type(func).__name__)
+    if qualname.endswith("after.<locals>.callit"):
+        return "after:" + func.__name__  # tkinter copies the scheduled function's name onto its shim
+    return ("bind:" if wrapper.subst else "command:") + qualname
+
+
+class Profiler:
+    def __init__(self, path=None, overlay=False, interval_ms=1000, budget_ms=FRAME_BUDGET_MS):
+        self.path = path
+        self.overlay = overlay
+        self.interval_ms = interval_ms
+        self.budget_ms = budget_ms
+        self.histograms = {}
+        self.out = open(path, "a", buffering=64 * 1024) if path else None
+        self.start = time.perf_counter()
+        self.interval_start = self.start
+        self.root = None
+        self.label = None
+        self._original_call = None
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds * 1000)
+
+    def wrap(self, name, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def instrument(self, owner, *names, prefix=None):
+        # Replace owner.name (a module function or a class method) with a timed version
+        prefix = prefix or getattr(owner, "__name__", type(owner).__name__)
+        for name in names:
+            setattr(owner, name, self.wrap(f"{prefix}.{name}", getattr(owner, name)))
+
+    def track_animator(self, animator):
+        # Frame intervals and their deviation from the target while an animation is running
+        tick = animator._tick
+        frame = animator.frame_ms / 1000
+
+        def timed_tick():
+            interval = time.monotonic() - animator._last_tick  # Since the previous frame, or since the tween was added
+            self.record("frame_interval", interval)
+            self.record("frame_jitter", abs(interval - frame))
+            tick()
+        animator._tick = timed_tick
+
+    def hook(self):
+        # Time Tk's calls into Python. tkinter keeps the bound CallWrapper.__call__ when a command, binding or
+        # after() is registered, so only those registered after this are timed: call it before building widgets.
+        if self._original_call is not None:
+            return
+        original = self._original_call = tk.CallWrapper.__call__
+        profiler = self
+
+        def timed_call(wrapper, *args):
+            start = time.perf_counter()
+            try:
+                return original(wrapper, *args)
+            finally:
+                name = callback_name(wrapper)
+                if not name.endswith(INTERNAL):
+                    profiler.record(name, time.perf_counter() - start)
+        tk.CallWrapper.__call__ = timed_call
+
+    def install(self, root):
+        # Start the stall probe and periodic report (hooking the callbacks too, if that hasn't happened yet)
+        self.hook()
+        self.root = root
+        if self.overlay:
+            self.label = tk.Label(root, justify=tk.LEFT, anchor=tk.NW, font=("Courier", 10), bg="black", fg="lime")
+            self.label.place(x=4, y=4)
+        self._expected = time.perf_counter() + HEARTBEAT_MS / 1000
+        root.after(HEARTBEAT_MS, self._heartbeat)
+        root.after(self.interval_ms, self._periodic)
+
+    def _heartbeat(self):
+        # How late the event loop was for this callback: the longest stall any handler caused
+        now = time.perf_counter()
+        self.record("loop_stall", max(0.0, now - self._expected))
+        self._expected = now + HEARTBEAT_MS / 1000
+        self.root.after(HEARTBEAT_MS, self._heartbeat)
+
+    def _periodic(self):
+        self.flush()
+        self.root.after(self.interval_ms, self._periodic)
+
+    def flush(self):
+        now = time.perf_counter()
+        snapshot = {name: histogram.snapshot(self.budget_ms) for name, histogram in sorted(self.histograms.items())}
+        if self.out:
+            self.out.write(json.dumps({
+                "t": round(now - self.start, 3),
+                "interval_s": round(now - self.interval_start, 3),
+                "budget_ms": self.budget_ms,
+                "handlers": snapshot,
+            }) + "\n")
+        if self.label is not None:
+            self.label.config(text=self.overlay_text(snapshot))
+            self.label.lift()
+        self.histograms = {}
+        self.interval_start = now
+
+    def overlay_text(self, snapshot):
+        # The slowest handlers of the last interval, worst first
+        worst = sorted(snapshot.items(), key=lambda item: -item[1]["max_ms"])[:8]
+        lines = [f"{'handler':<32} {'n':>4} {'max ms':>7} {'>budget':>7}"]
+        for name, stats in worst:
+            lines.append(f"{name[-32:]:<32} {stats['count']:>4} {stats['max_ms']:>7.1f} {stats['over_budget']:>7}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._original_call is not None:
+            tk.CallWrapper.__call__ = self._original_call
+            self._original_call = None
+        self.label = None  # The window may already be gone
+        if self.out:
+            self.flush()
+            self.out.close()
+            self.out = None
@@ -0,0 +1,164 @@
+"""Session seeds and compact binary replay logs for both games.
+
+A log is a fixed header (game, seed, CPU name) followed by 7-byte events, appended through a buffered file:
+
+    kind (uint8), milliseconds since the session started (uint32), a (int8), b (int8)
+
+Both games take --seed, --record LOG and --replay LOG. A replay re-executes the log headlessly and checks
+every outcome against the recording; add --realtime to watch it in the window at the recorded pace instead.
+"""
+import argparse
+import random
+import struct
+import time
+
+from rps_engine import MOVES, STARTING_HP, Match, get_random_move
+from engarde_engine import EngardeState, PLAYER, CPU as CPU_SIDE, heuristic_move
+
+FORMAT_VERSION = 1
+MAGIC = b"MJREPLAY"
+HEADER = struct.Struct("<8sH4sQ16s")  # magic, version, game, seed, CPU player name
+EVENT = struct.Struct("<BIbb")  # kind, ms, a, b
+WRITE_BUFFER = 64 * 1024
+
+GAME_RPS = b"LRPS"
+GAME_ENGARDE = b"ENGD"
+
+# Event kinds
+NEW_GAME = 1  # a: 1 if the win counters were reset
+INPUT = 2  # a: player's move (RPS: index into MOVES, En Garde: signed step)
+CPU = 3  # a: CPU's move, same encoding; En Garde b: 1 if it came from the tablebase
+RESULT = 4  # RPS: a round winner (0 tie, 1, 2), b game winner (0 if still running). En Garde: a winner
+
+
+def session_seed(seed=None):
+    # Pick a fresh seed unless one was given, so every session can be reproduced from its log or console line
+    return random.SystemRandom().getrandbits(63) if seed is None else seed
+
+
+def seed_arg(text):
+    # argparse type for --seed: the log header stores it unsigned, so refuse what it can't hold up front
+    seed = int(text)
+    if not 0 <= seed < 2 ** 64:
+        raise argparse.ArgumentTypeError(f"seeds go from 0 to 2**64 - 1, not {seed}")
+    return seed
+
+
+class ReplayWriter:
+    def __init__(self, path, game, seed, cpu=""):
+        self.file = open(path, "wb", buffering=WRITE_BUFFER)
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, game, seed, cpu.encode()))
+        self.start = time.perf_counter()
+        self.events = 0
+
+    def event(self, kind, a=0, b=0):
+        ms = int((time.perf_counter() - self.start) * 1000)
+        self.file.write(EVENT.pack(kind, ms, a, b))
+        self.events += 1
+
+    def flush(self):
+        # Called at the end of every game, so a crash loses at most the game in progress
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class Replay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.game, self.seed, cpu = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} replay log")
+        self.cpu = cpu.rstrip(b"\0").decode()
+        body = len(data) - HEADER.size
+        # A log cut short by a crash just ends early
+        self.events = list(EVENT.iter_unpack(data[HEADER.size:HEADER.size + body - body % EVENT.size]))
+
+    def inputs(self):
+        return [(ms, kind, a) for kind, ms, a, b in self.events if kind in (INPUT, NEW_GAME)]
+
+    def cpu_moves(self):
+        return [a for kind, ms, a, b in self.events if kind == CPU]
+
+
+def verify_rps(replay):
+    # Re-run the recorded inputs through the rules; returns a list of mismatches (empty if the log reproduces)
+    rng = random.Random(replay.seed)
+    match = Match(STARTING_HP)
+    reproducible = replay.cpu in ("", "random")  # The adaptive CPU depends on the profile it started from
+    errors = []
+    player = winner = None
+    for number, (kind, ms, a, b) in enumerate(replay.events):
+        if kind == NEW_GAME:
+            if a:
+                match = Match(STARTING_HP)
+            else:
+                match.new_game()
+        elif kind == INPUT:
+            player = MOVES[a]
+        elif kind == CPU:
+            cpu = get_random_move(rng) if reproducible else MOVES[a]
+            if MOVES.index(cpu) != a:
+                errors.append(f"event {number}: CPU played {cpu}, log says {MOVES[a]}")
+            if match.over:
+                errors.append(f"event {number}: a round after the game was over")
+                break
+            winner = match.play_round(player, MOVES[a])
+        elif kind == RESULT:
+            if (winner or 0, match.winner or 0) != (a, b):
+                errors.append(f"event {number}: result {(winner or 0, match.winner or 0)}, log says {(a, b)}")
+    return errors
+
+
+def verify_engarde(replay):
+    rng = random.Random(replay.seed)
+    state = EngardeState.new_game(rng)  # Same deal as the recorded session
+    reproducible = replay.cpu == "heuristic"  # Search CPUs depend on the clock, so only their legality is checked
+    errors = []
+    for number, (kind, ms, a, b) in enumerate(replay.events):
+        if kind in (INPUT, CPU):
+            side = PLAYER if kind == INPUT else CPU_SIDE
+            if state.turn != side or not state.is_legal(a):
+                errors.append(f"event {number}: {a:+d} is not a legal move here")
+                break
+            if kind == CPU and not b and reproducible:
+                expected = heuristic_move(state, rng)
+                if expected != a:
+                    errors.append(f"event {number}: CPU played {expected:+d}, log says {a:+d}")
+            state.apply(a)
+        elif kind == RESULT and state.winner != a:
+            errors.append(f"event {number}: winner {state.winner}, log says {a}")
+    return errors
+
+
+def verify(path):
+    replay = Replay(path)
+    start = time.perf_counter()
+    errors = verify_rps(replay) if replay.game == GAME_RPS else verify_engarde(replay)
+    elapsed = time.perf_counter() - start
+    for error in errors:
+        print(error)
+    print(f"{path}: seed {replay.seed}, {len(replay.events)} events re-executed in {elapsed * 1000:.1f} ms, "
+          f"{'MISMATCH' if errors else 'outcomes match'}")
+    return not errors
+
+
+class ScriptedPlayer:
+    # CPU that repeats the moves of a recording, for real-time replays of non-reproducible CPUs (either game)
+    def __init__(self, moves):
+        self.moves = list(moves)
+        self.next = 0
+
+    def choose(self, state=None):
+        move = self.moves[self.next]
+        self.next += 1
+        return move
+
+    def observe(self, *moves):
+        pass  # Nothing to learn, the moves are already known
+
+    def stats(self):
+        return {}
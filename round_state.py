@@ -0,0 +1,112 @@
+"""Round state machine and input queue for LoliRPS.
+
+Every key press and button click goes through submit(). A round only starts from IDLE, so a press during
+an animation can never start a second one; what happens to it instead is the input policy:
+
+    buffer    keep up to queue_size presses and play them in order
+    coalesce  keep only the latest press
+    drop      ignore presses unless idle
+"""
+import time
+from collections import deque
+
+IDLE = "idle"
+ANIMATING = "animating"
+RESOLVING = "resolving"
+GAME_OVER = "game-over"
+
+BUFFER = "buffer"
+COALESCE = "coalesce"
+DROP = "drop"
+INPUT_POLICIES = (BUFFER, COALESCE, DROP)
+
+
+class RoundMachine:
+    def __init__(self, start_round, policy=BUFFER, queue_size=2):
+        if policy not in INPUT_POLICIES:
+            raise ValueError(f"Unknown input policy {policy!r}, expected one of {INPUT_POLICIES}")
+        if queue_size < 1:
+            raise ValueError(f"The input queue must hold at least 1 press, not {queue_size}")
+        self.start_round = start_round  # Called with the move when a round begins
+        self.policy = policy
+        self.queue_size = queue_size if policy == BUFFER else 1
+        self.state = IDLE
+        self.queue = deque()  # (move, time of the press)
+        self.pressed_at = None  # Press time of the round in progress
+        self.submitted = 0
+        self.started = 0
+        self.resolved = 0
+        self.dropped = 0  # Presses ignored or pushed out of a full queue
+        self.feedback_latency = []  # Seconds from press to the icons appearing
+        self.result_latency = []  # Seconds from press to the round result being shown
+
+    def submit(self, move):
+        self.submitted += 1
+        now = time.perf_counter()
+        if self.state == IDLE:
+            self._start(move, now)
+        elif self.state == GAME_OVER or self.policy == DROP:
+            self.dropped += 1
+        else:
+            if len(self.queue) >= self.queue_size:
+                self.queue.popleft()  # Full: the oldest press gives way, so the newest intent wins
+                self.dropped += 1
+            self.queue.append((move, now))
+
+    def _start(self, move, pressed_at):
+        self.state = ANIMATING
+        self.pressed_at = pressed_at
+        self.started += 1
+        self.start_round(move)
+
+    def feedback(self):
+        # The round's icons are on the canvas
+        self.feedback_latency.append(time.perf_counter() - self.pressed_at)
+
+    def resolving(self):
+        self.state = RESOLVING
+
+    def done(self, game_over):
+        # The result is on screen; play the next queued press straight away unless the game ended
+        self.result_latency.append(time.perf_counter() - self.pressed_at)
+        self.resolved += 1
+        if game_over:
+            self.state = GAME_OVER
+            self.dropped += len(self.queue)
+            self.queue.clear()
+        else:
+            self.state = IDLE
+            if self.queue:
+                self._start(*self.queue.popleft())
+
+    def reset(self):
+        # A new game (only offered once the last one is over): back to idle with nothing pending
+        self.dropped += len(self.queue)
+        self.queue.clear()
+        self.state = IDLE
+
+    def stats(self):
+        def percentiles(samples):
+            samples = sorted(samples)
+            if not samples:
+                return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            return {
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+
+        in_flight = 1 if self.state in (ANIMATING, RESOLVING) else 0
+        return {
+            "policy": self.policy,
+            "submitted": self.submitted,
+            "started": self.started,
+            "resolved": self.resolved,
+            "dropped": self.dropped,
+            "pending": len(self.queue),
+            # Every press is started, dropped or still pending, and every started round resolves exactly once
+            "consistent": self.submitted == self.started + self.dropped + len(self.queue)
+                          and self.started == self.resolved + in_flight,
+            "feedback": percentiles(self.feedback_latency),
+            "result": percentiles(self.result_latency),
+        }
@@ -0,0 +1,73 @@
+"""Display-free rules for LoliRPS: moves, round resolution, match state and music tiers."""
+import random
+
+MOVES = ("rock", "paper", "scissors")  # Index order matters: (i - j) % 3 == 1 means move i beats move j
+STARTING_HP = 4
+INTENSE_HP = 1  # At or below this HP the music escalates
+
+# Music tiers, from calmest to most intense
+BACKGROUND = "background"
+INTENSE = "intense"
+SUPERINTENSE = "superintense"
+GAMEOVER = "gameover"
+
+
+def get_random_move(rng=random):
+    return rng.choice(MOVES)
+
+
+def determine_winner(move1, move2):
+    # None for a tie, otherwise the number (1 or 2) of the player who won the round
+    outcome = (MOVES.index(move1) - MOVES.index(move2)) % 3
+    if outcome == 0:
+        return None
+    return 1 if outcome == 1 else 2
+
+
+def music_tier(hp1, hp2):
+    if hp1 <= 0 or hp2 <= 0:
+        return GAMEOVER
+    if hp1 <= INTENSE_HP and hp2 <= INTENSE_HP:
+        return SUPERINTENSE
+    if hp1 <= INTENSE_HP or hp2 <= INTENSE_HP:
+        return INTENSE
+    return BACKGROUND
+
+
+class Match:
+    def __init__(self, hp=STARTING_HP):
+        self.starting_hp = hp
+        self.hp = [hp, hp]
+        self.wins = [0, 0]
+        self.rounds = 0
+
+    def new_game(self):
+        # Restore HP but keep the win counters, like "Play Again"
+        self.hp = [self.starting_hp, self.starting_hp]
+        self.rounds = 0
+
+    @property
+    def over(self):
+        return min(self.hp) <= 0
+
+    @property
+    def winner(self):
+        # 1 or 2 once the game is over, otherwise None
+        if not self.over:
+            return None
+        return 1 if self.hp[1] <= 0 else 2
+
+    def play_round(self, move1, move2):
+        if self.over:
+            raise ValueError("The game is already over")
+        self.rounds += 1
+        winner = determine_winner(move1, move2)
+        if winner is not None:
+            loser = 2 if winner == 1 else 1
+            self.hp[loser - 1] -= 1
+            if self.hp[loser - 1] == 0:
+                self.wins[winner - 1] += 1
+        return winner
+
+    def music_tier(self):
+        return music_tier(self.hp[0], self.hp[1])
@@ -0,0 +1,262 @@
+"""Adaptive LoliRPS opponent that learns to predict the player's next move.
+
+    python rps_opponent.py evaluate --rounds 2000
+    python rps_opponent.py info --player alice
+
+A fixed set of context tables counts what the player did after each recent pattern: their last 1-4 moves,
+and the last 1-2 rounds of both moves. Counts decay so old habits fade, and each update touches one row per
+table. Every table's prediction, plus the two "player is second-guessing it" rotations of it, keeps a decayed
+score of how the counter-move would have fared; the CPU mixes them by that score and plays the best answer,
+or a random move while nothing predicts better than chance.
+
+The tables are saved per player profile as a small array file, so the next session starts warm.
+"""
+import argparse
+import os
+import random
+import re
+import struct
+import time
+from array import array
+
+from rps_engine import MOVES
+
+PROFILE_DIR = "profiles"
+FORMAT_VERSION = 1
+MAGIC = b"RPSMODEL"
+HEADER = struct.Struct("<8sH16sQ")  # magic, version, table layout, rounds observed
+PLAYER_ORDERS = (1, 2, 3, 4)  # Contexts of the player's own last N moves
+JOINT_ORDERS = (1, 2)  # Contexts of the last N rounds, both moves
+LAYOUT = ("p" + "".join(map(str, PLAYER_ORDERS)) + "j" + "".join(map(str, JOINT_ORDERS))).encode()
+COUNT_DECAY = 0.95  # Per round; a habit from 20 rounds ago counts about a third as much as a new one
+SCORE_DECAY = 0.9  # Per round, for the predictors' track record
+PRIOR = 0.5  # Pseudo-count per move, so a context seen once isn't taken as certain
+NOISE = 0.05  # Chance of a random move regardless, so the CPU is never fully predictable itself
+RESCALE_AT = 1e100
+
+# BEATS[m] is the move that beats m
+BEATS = (1, 2, 0)
+PAYOFF = [[(a - b + 1) % 3 - 1 for b in range(3)] for a in range(3)]  # PAYOFF[cpu][player]: +1 CPU wins, -1 loses
+
+
+def profile_path(name):
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,32}", name):
+        raise ValueError(f"Profile names are 1-32 letters, digits, '-' or '_', not {name!r}")
+    return os.path.join(PROFILE_DIR, name + ".rpsm")
+
+
+class AdaptiveOpponent:
+    def __init__(self, rng=random):
+        self.rng = rng
+        # (base, modulus) per table: its context is the last N symbols in that base, kept as a rolling number
+        self.tables = [(3, 3 ** n) for n in PLAYER_ORDERS] + [(9, 9 ** n) for n in JOINT_ORDERS]
+        self.counts = [[0.0] * (modulus * 3) for base, modulus in self.tables]
+        self.contexts = [0] * len(self.tables)
+        self.scores = [0.0] * (len(self.tables) * 3)  # Per table and rotation
+        self.scale = 1.0  # Counts are stored multiplied by this, so decaying them all is one multiplication
+        self.rounds = 0
+        self._guesses = None  # Per predictor, the move it expected this round
+        self.random_moves = 0
+
+    def _distributions(self):
+        prior = PRIOR * self.scale
+        distributions = []
+        for counts, context in zip(self.counts, self.contexts):
+            row = context * 3
+            r, p, s = counts[row] + prior, counts[row + 1] + prior, counts[row + 2] + prior
+            total = r + p + s
+            distributions.append((r / total, p / total, s / total))
+        return distributions
+
+    def predict(self):
+        # Probability of each of the player's moves next round, mixed by how well each predictor has been doing
+        mixed = [0.0, 0.0, 0.0]
+        guesses = []
+        weight = 0.0
+        scores = self.scores
+        for t, dist in enumerate(self._distributions()):
+            top = max(range(3), key=dist.__getitem__)
+            for rotation in range(3):
+                guesses.append((top + rotation) % 3)
+                score = scores[t * 3 + rotation]
+                if score > 0:
+                    weight += score
+                    for move in range(3):
+                        mixed[(move + rotation) % 3] += score * dist[move]
+        self._guesses = guesses
+        if weight == 0:
+            return None  # Nothing beats chance yet
+        return [m / weight for m in mixed]
+
+    def choose(self):
+        mixed = self.predict()
+        if mixed is None or self.rng.random() < NOISE:
+            self.random_moves += 1
+            return MOVES[self.rng.randrange(3)]
+        # Best expected payoff against the mixed prediction
+        best = max(range(3), key=lambda cpu: sum(PAYOFF[cpu][player] * mixed[player] for player in range(3)))
+        return MOVES[best]
+
+    def observe(self, player_move, cpu_move):
+        player = MOVES.index(player_move)
+        cpu = MOVES.index(cpu_move)
+        if self._guesses is None:
+            self.predict()
+        scores = self.scores
+        for i, guess in enumerate(self._guesses):
+            scores[i] = scores[i] * SCORE_DECAY + PAYOFF[BEATS[guess]][player]
+        self._guesses = None
+
+        self.scale /= COUNT_DECAY
+        increment = self.scale
+        symbol = (player, player * 3 + cpu)
+        for t, (base, modulus) in enumerate(self.tables):
+            context = self.contexts[t]
+            self.counts[t][context * 3 + player] += increment
+            self.contexts[t] = (context * base + symbol[base == 9]) % modulus
+        if self.scale > RESCALE_AT:
+            self._rescale()
+        self.rounds += 1
+
+    def _rescale(self):
+        for counts in self.counts:
+            for i, count in enumerate(counts):
+                counts[i] = count / self.scale
+        self.scale = 1.0
+
+    def stats(self):
+        best = max(range(len(self.scores)), key=self.scores.__getitem__)
+        orders = [f"player-{n}" for n in PLAYER_ORDERS] + [f"joint-{n}" for n in JOINT_ORDERS]
+        return {
+            "rounds": self.rounds,
+            "random_moves": self.random_moves,
+            "best_predictor": f"{orders[best // 3]}+{best % 3}",
+            "best_score": round(self.scores[best] * (1 - SCORE_DECAY), 3),  # Recent average payoff, -1 to 1
+        }
+
+    # Persistence: header, then contexts (uint32), scores and counts (float32, normalised to scale 1)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._rescale()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, FORMAT_VERSION, LAYOUT, self.rounds))
+            array("I", self.contexts).tofile(out)
+            array("f", self.scores).tofile(out)
+            for counts in self.counts:
+                array("f", counts).tofile(out)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, rng=random):
+        # A model with the saved tables, or a fresh one when there is no usable profile yet
+        model = cls(rng)
+        if not os.path.exists(path):
+            return model
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, layout, rounds = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != FORMAT_VERSION or layout.rstrip(b"\0") != LAYOUT:
+                raise ValueError("saved by a different version of the model")
+            offset = HEADER.size
+            sections = [("I", len(model.contexts)), ("f", len(model.scores))] + [("f", len(c)) for c in model.counts]
+            if len(data) != offset + sum(array(code).itemsize * size for code, size in sections):
+                raise ValueError("truncated")
+            values = []
+            for code, size in sections:
+                section = array(code)
+                section.frombytes(data[offset:offset + section.itemsize * size])
+                offset += section.itemsize * size
+                values.append(section.tolist())
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring opponent profile {path}: {e}")
+            return model
+        model.contexts, model.scores, model.counts = values[0], values[1], values[2:]
+        model.rounds = rounds
+        return model
+
+
+# Scripted players for evaluate: each gets the history of (player, cpu) move indices and returns a move index
+
+def cycle_player(rng, history):
+    return (history[-1][0] + 1) % 3 if history else 0
+
+
+def biased_player(rng, history):
+    return rng.choices(range(3), weights=(5, 3, 2))[0]
+
+
+def beat_last_player(rng, history):
+    # Plays whatever would have beaten the CPU's previous move
+    return BEATS[history[-1][1]] if history else rng.randrange(3)
+
+
+def win_stay_lose_shift_player(rng, history):
+    if not history:
+        return rng.randrange(3)
+    player, cpu = history[-1]
+    return player if PAYOFF[player][cpu] > 0 else BEATS[player]
+
+
+def uniform_player(rng, history):
+    return rng.randrange(3)
+
+
+SCRIPTED_PLAYERS = {
+    "cycle": cycle_player,
+    "biased": biased_player,
+    "beat-last": beat_last_player,
+    "win-stay-lose-shift": win_stay_lose_shift_player,
+    "uniform": uniform_player,
+}
+
+
+def evaluate(rounds=2000, seed=0):
+    for name, player in SCRIPTED_PLAYERS.items():
+        rng = random.Random(seed)
+        model = AdaptiveOpponent(random.Random(seed + 1))
+        history = []
+        tally = [0, 0, 0]  # CPU wins, ties, CPU losses
+        elapsed = 0.0
+        for _ in range(rounds):
+            move = player(rng, history)
+            start = time.perf_counter()
+            cpu = model.choose()
+            model.observe(MOVES[move], cpu)
+            elapsed += time.perf_counter() - start
+            cpu = MOVES.index(cpu)
+            tally[1 - PAYOFF[cpu][move]] += 1
+            history.append((move, cpu))
+        print(f"  {name:<20} CPU wins {tally[0] / rounds:6.1%}  ties {tally[1] / rounds:6.1%}  "
+              f"losses {tally[2] / rounds:6.1%}  {elapsed / rounds * 1e6:5.1f} us per round")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or evaluate the adaptive LoliRPS opponent")
+    parser.add_argument("command", choices=["evaluate", "info"])
+    parser.add_argument("--player", help="profile name, for info")
+    parser.add_argument("--rounds", type=int, default=2000, help="rounds against each scripted player")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "evaluate":
+        print(f"Adaptive CPU against scripted players, {args.rounds} rounds each:")
+        evaluate(args.rounds, args.seed)
+    else:
+        if not args.player:
+            parser.error("info needs --player")
+        try:
+            path = profile_path(args.player)
+        except ValueError as e:
+            parser.error(str(e))
+        if not os.path.exists(path):
+            raise SystemExit(f"No profile at {path}")
+        stats = AdaptiveOpponent.load(path).stats()
+        print(f"{path}: {os.path.getsize(path)} bytes, {stats['rounds']} rounds observed, "
+              f"best predictor {stats['best_predictor']} (recent payoff {stats['best_score']:+.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Vectorised bulk simulation of LoliRPS matches.
+
+    python rps_sim.py --matches 1000000 --opponent uniform
+"""
+import argparse
+import importlib
+import time
+
+import numpy as np
+
+from rps_engine import MOVES, STARTING_HP, INTENSE_HP
+
+# A policy takes (rng, own_hp, other_hp) arrays for the still-running matches and returns move indices into MOVES
+
+
+def uniform_policy(rng, own_hp, other_hp):
+    return rng.integers(0, len(MOVES), size=own_hp.shape[0], dtype=np.int8)
+
+
+def rock_policy(rng, own_hp, other_hp):
+    return np.zeros(own_hp.shape[0], dtype=np.int8)
+
+
+def biased_policy(weights):
+    probabilities = np.asarray(weights, dtype=np.float64)
+    probabilities /= probabilities.sum()
+
+    def policy(rng, own_hp, other_hp):
+        return rng.choice(len(MOVES), size=own_hp.shape[0], p=probabilities).astype(np.int8)
+    return policy
+
+
+POLICIES = {
+    "uniform": uniform_policy,  # Same as get_random_move
+    "rock": rock_policy,
+    "paper-heavy": biased_policy([0.25, 0.5, 0.25]),
+}
+
+
+def load_policy(name):
+    # Either a name from POLICIES or "module:function" for a policy defined elsewhere
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown policy {name!r}, expected one of {sorted(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def simulate(matches, player_policy=uniform_policy, opponent_policy=uniform_policy, hp=STARTING_HP, seed=None,
+             max_rounds=1000):
+    rng = np.random.default_rng(seed)
+    hp1 = np.full(matches, hp, dtype=np.int16)
+    hp2 = np.full(matches, hp, dtype=np.int16)
+    rounds = np.zeros(matches, dtype=np.int32)
+    ties = np.zeros(matches, dtype=np.int32)
+    intense = np.zeros(matches, dtype=bool)
+    superintense = np.zeros(matches, dtype=bool)
+
+    active = np.arange(matches)
+    for _ in range(max_rounds):  # Two deterministic policies can tie forever
+        if not active.size:
+            break
+        a1, a2 = hp1[active], hp2[active]
+        move1 = player_policy(rng, a1, a2)
+        move2 = opponent_policy(rng, a2, a1)
+        outcome = (move1.astype(np.int16) - move2) % 3  # 0 tie, 1 player wins, 2 opponent wins
+        a1 = a1 - (outcome == 2)
+        a2 = a2 - (outcome == 1)
+        hp1[active], hp2[active] = a1, a2
+        rounds[active] += 1
+        ties[active] += outcome == 0
+        low1, low2 = a1 == INTENSE_HP, a2 == INTENSE_HP
+        intense[active] |= low1 | low2
+        superintense[active] |= low1 & low2
+        active = active[(a1 > 0) & (a2 > 0)]
+
+    total_rounds = int(rounds.sum())
+    finished = matches - active.size
+    return {
+        "matches": matches,
+        "unfinished": int(active.size),
+        "player_win_rate": int(np.count_nonzero(hp2 == 0)) / finished if finished else 0.0,  # Of finished matches
+        "tie_rate": float(ties.sum()) / total_rounds if total_rounds else 0.0,
+        "mean_length": float(rounds.mean()) if matches else 0.0,
+        "length_histogram": np.bincount(rounds).tolist(),  # index = rounds played in the match
+        "intense_rate": float(intense.mean()) if matches else 0.0,
+        "superintense_rate": float(superintense.mean()) if matches else 0.0,
+    }
+
+
+def print_report(stats, elapsed):
+    print(f"{stats['matches']} matches in {elapsed:.2f}s ({stats['matches'] / elapsed:,.0f} matches/s)")
+    if stats["unfinished"]:
+        print(f"Unfinished matches:   {stats['unfinished']} (hit the round limit, left out of the win rate)")
+    print(f"Player win rate:      {stats['player_win_rate']:.4f}")
+    print(f"Tie rate per round:   {stats['tie_rate']:.4f}")
+    print(f"Mean match length:    {stats['mean_length']:.2f} rounds")
+    print(f"Intense triggered:    {stats['intense_rate']:.4f}")
+    print(f"Superintense reached: {stats['superintense_rate']:.4f}")
+    histogram = stats["length_histogram"]
+    print("Match length distribution:")
+    for length, count in enumerate(histogram):
+        if count:
+            print(f"  {length:3d} rounds: {count / stats['matches']:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate LoliRPS matches in bulk")
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--hp", type=int, default=STARTING_HP)
+    parser.add_argument("--player", default="uniform", help="policy for the human side")
+    parser.add_argument("--opponent", default="uniform", help="policy for the CPU side")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    args = parser.parse_args()
+    if args.matches < 1 or args.hp < 1:
+        parser.error("--matches and --hp must be at least 1")
+
+    start = time.perf_counter()
+    stats = simulate(args.matches, load_policy(args.player), load_policy(args.opponent), args.hp, args.seed, args.max_rounds)
+    print_report(stats, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Pre-thumbnailed sprite atlas for LoliRPS.
+
+Build it once after changing anything under images/:
+
+    python sprite_atlas.py build
+
+The game memory-maps the atlas and falls back to the loose folders when it is missing or stale. Every
+image is stored at the size levels the kiosks use (sprite_cache.ATLAS_LEVELS, or the ones given with --levels),
+so the game never resamples at startup or after a resize as long as the atlas has the level the window needs.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import struct
+
+from PIL import Image  # You need to install Pillow library
+
+from sprite_cache import SPRITE_LEVELS, ICON_LEVELS, ATLAS_LEVELS, MOVE_ICONS, list_pngs
+
+ATLAS_PATH = os.path.join("images", "sprites.atlas")
+FORMAT_VERSION = 2
+MAGIC = b"LRPSATLS"
+HEADER = struct.Struct("<8sH32sIQ")  # magic, version, source fingerprint, entry count, index offset
+ENTRY = struct.Struct("<24shB64sHH4sQI")  # prefix, hp, level, file, width, height, mode, data offset, data size
+MAX_PREFIX_BYTES = 24  # Longer names would be cut short by ENTRY and no longer match the folders
+MAX_FILE_BYTES = 64
+ICON_PREFIX = "icon"  # Move icons are stored under this prefix with hp -1
+FOLDER_PATTERN = re.compile(r"^(.+)_(\d+)$")  # images/{prefix}_{hp}
+
+
+def iter_sources(image_dir):
+    # Yields (prefix, hp, file, path) for every image that goes into the atlas
+    for name in sorted(os.listdir(image_dir)):
+        match = FOLDER_PATTERN.match(name)
+        folder_path = os.path.join(image_dir, name)
+        if match and os.path.isdir(folder_path):
+            for file in list_pngs(folder_path) or []:
+                yield match.group(1), int(match.group(2)), file, os.path.join(folder_path, file)
+    for move in MOVE_ICONS:
+        path = os.path.join(image_dir, f"{move}.png")
+        if os.path.exists(path):
+            yield ICON_PREFIX, -1, f"{move}.png", path
+
+
+def source_fingerprint(image_dir):
+    # Cheap staleness check: names, sizes and mtimes of the sources plus the target sizes, no decoding
+    digest = hashlib.sha256(repr((FORMAT_VERSION, SPRITE_LEVELS, ICON_LEVELS)).encode())
+    for prefix, hp, file, path in iter_sources(image_dir):
+        stat = os.stat(path)
+        digest.update(f"{prefix}\0{hp}\0{file}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.digest()
+
+
+def build_atlas(image_dir="images", atlas_path=ATLAS_PATH, levels=ATLAS_LEVELS):
+    entries = []
+    tmp_path = atlas_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(b"\0" * HEADER.size)
+        for prefix, hp, file, path in iter_sources(image_dir):
+            if len(prefix.encode()) > MAX_PREFIX_BYTES or len(file.encode()) > MAX_FILE_BYTES:
+                print(f"Skipping {path}: the atlas holds folder prefixes up to {MAX_PREFIX_BYTES} bytes "
+                      f"and file names up to {MAX_FILE_BYTES}")
+                continue
+            source = Image.open(path)
+            source.load()  # Decode once, then scale to every level
+            for level in levels:
+                if prefix == ICON_PREFIX:
+                    image = source.resize((ICON_LEVELS[level],) * 2, Image.LANCZOS)
+                else:
+                    image = source.copy()
+                    image.thumbnail((SPRITE_LEVELS[level],) * 2, Image.LANCZOS)
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA")
+                data = image.tobytes()
+                entries.append((prefix, hp, level, file, image.width, image.height, image.mode, out.tell(), len(data)))
+                out.write(data)
+        index_offset = out.tell()
+        for prefix, hp, level, file, width, height, mode, offset, size in entries:
+            out.write(ENTRY.pack(prefix.encode(), hp, level, file.encode(), width, height, mode.encode(), offset, size))
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, source_fingerprint(image_dir), len(entries), index_offset))
+    os.replace(tmp_path, atlas_path)  # Never leave a half-written atlas where the game looks for it
+    return len(entries), index_offset
+
+
+class SpriteAtlas:
+    def __init__(self, atlas_path):
+        with open(atlas_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.fingerprint, count, index_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{atlas_path} is not a version {FORMAT_VERSION} sprite atlas")
+        self._entries = {}  # (prefix, hp, file, level) -> (width, height, mode, offset, size)
+        self._listings = {}  # (prefix, hp) -> sorted file names
+        self.levels = set()
+        for i in range(count):
+            prefix, hp, level, file, width, height, mode, offset, size = ENTRY.unpack_from(self._mm, index_offset + i * ENTRY.size)
+            prefix, file = prefix.rstrip(b"\0").decode(), file.rstrip(b"\0").decode()
+            self._entries[(prefix, hp, file, level)] = (width, height, mode.rstrip(b"\0").decode(), offset, size)
+            listing = self._listings.setdefault((prefix, hp), [])
+            if not listing or listing[-1] != file:  # The levels of one file are stored together
+                listing.append(file)
+            self.levels.add(level)
+
+    @classmethod
+    def open_if_fresh(cls, atlas_path=ATLAS_PATH, image_dir="images"):
+        # The atlas, or None when the game should use the loose folders instead
+        if not os.path.exists(atlas_path):
+            return None
+        try:
+            atlas = cls(atlas_path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring sprite atlas: {e}")
+            return None
+        if atlas.fingerprint != source_fingerprint(image_dir):
+            print(f"Sprite atlas {atlas_path} is stale, run 'python sprite_atlas.py build'")
+            atlas.close()
+            return None
+        return atlas
+
+    def list_files(self, prefix, hp):
+        return self._listings.get((prefix, hp))
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def load(self, prefix, hp, file, level):
+        width, height, mode, offset, size = self._entries[(prefix, hp, file, level)]
+        # Copy the pixels out of the mapping so the image stays valid if the atlas is closed
+        return Image.frombytes(mode, (width, height), self._mm[offset:offset + size])
+
+    def has_icon(self, move, level):
+        return (ICON_PREFIX, -1, f"{move}.png", level) in self._entries
+
+    def load_icon(self, move, level):
+        return self.load(ICON_PREFIX, -1, f"{move}.png", level)
+
+    def close(self):
+        self._mm.close()
+
+
+def level_list(text):
+    # argparse type for --levels
+    try:
+        levels = [int(level) for level in text.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated level numbers, not {text!r}")
+    for level in levels:
+        if not 0 <= level < len(SPRITE_LEVELS):
+            raise argparse.ArgumentTypeError(f"levels go from 0 to {len(SPRITE_LEVELS) - 1}, not {level}")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or check the LoliRPS sprite atlas")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--images", default="images", help="folder with the loliN_HP folders and move icons")
+    parser.add_argument("--atlas", default=None, help="atlas file (default: sprites.atlas inside --images)")
+    parser.add_argument("--levels", type=level_list, default=ATLAS_LEVELS, help="comma-separated size levels to store, out of "
+                                         + ", ".join(f"{i}={size}px" for i, size in enumerate(SPRITE_LEVELS))
+                                         + " (default: " + ",".join(map(str, ATLAS_LEVELS)) + ")")
+    args = parser.parse_args()
+    atlas_path = args.atlas or os.path.join(args.images, os.path.basename(ATLAS_PATH))
+
+    if args.command == "build":
+        count, size = build_atlas(args.images, atlas_path, args.levels)
+        print(f"Wrote {count} sprites ({size / 1024 / 1024:.1f} MiB of pixels) to {atlas_path}")
+    else:
+        atlas = SpriteAtlas.open_if_fresh(atlas_path, args.images)
+        if atlas is None:
+            print(f"{atlas_path} is missing or stale")
+            raise SystemExit(1)
+        print(f"{atlas_path} is up to date, levels " + ", ".join(f"{SPRITE_LEVELS[level]}px" for level in sorted(atlas.levels)))
+
+
+if __name__ == "__main__":
+    main()
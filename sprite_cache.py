@@ -0,0 +1,263 @@
+"""Shared in-memory cache of thumbnailed character sprites for LoliRPS.
+
+Sprites and move icons come in a few pre-scaled levels so a 720p kiosk and a 4K one both get images that
+fit the window. The cache serves the current level; anything missing there is shown at the nearest level it
+already has while the right one is built on the worker thread.
+"""
+import math
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageTk  # You need to install Pillow library
+
+SPRITE_LEVELS = (250, 375, 500, 750, 1000)  # Bounding-box side of each pre-scaled sprite level
+ICON_LEVELS = (53, 80, 107, 160, 213)  # Move icon side at the same levels, in the original 80:375 proportion
+DEFAULT_LEVEL = 1  # The original fixed sizes, used until the window size is known
+ATLAS_LEVELS = (1, 2)  # What 720p and 1080p fullscreen kiosks pick; the atlas stores these unless told otherwise
+SPRITE_SIZE = (SPRITE_LEVELS[DEFAULT_LEVEL],) * 2  # Bounding box every character image is thumbnailed to
+ICON_SIZE = (ICON_LEVELS[DEFAULT_LEVEL],) * 2  # Rock/paper/scissors icons are resized to exactly this
+ICONS = "icon"  # Pending-work key prefix for a level's move icons
+MOVE_ICONS = ("rock", "paper", "scissors")
+PREFETCH_POLL_MS = 20  # How often the Tk thread picks up sprites decoded by the prefetch worker
+
+
+def load_sprite(image_path, max_size=SPRITE_SIZE):
+    # Decode and downscale a single image; this is the expensive part we cache
+    image = Image.open(image_path)
+    image.thumbnail(max_size, Image.LANCZOS)
+    return image
+
+
+def load_icon(image_path, size=ICON_SIZE):
+    return Image.open(image_path).resize(size, Image.LANCZOS)
+
+
+def nearest_level(side):
+    # Level whose sprites are closest to `side` pixels by ratio, so 360 px gets 375 rather than 250
+    return min(range(len(SPRITE_LEVELS)), key=lambda level: abs(math.log(SPRITE_LEVELS[level] / max(side, 1))))
+
+
+def list_pngs(folder_path):
+    try:
+        return sorted(file for file in os.listdir(folder_path) if file.endswith(".png"))
+    except FileNotFoundError:
+        return None
+
+
+class SpriteCache:
+    def __init__(self, budget_bytes=64 * 1024 * 1024, image_dir="images", atlas=None, level=DEFAULT_LEVEL):
+        self.base_budget_bytes = budget_bytes  # Budget at DEFAULT_LEVEL
+        self.budget_bytes = self._budget_for(level)  # Upper bound on the estimated size of cached sprites
+        self.image_dir = image_dir
+        self.atlas = atlas  # Optional SpriteAtlas; when set, listings and misses come from it instead of the folders
+        self.level = level  # Index into SPRITE_LEVELS / ICON_LEVELS that get() and load_icon() serve
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stand_ins = 0  # Lookups answered from another level while the right one was being built
+        self._sprites = OrderedDict()  # (prefix, hp, file, level) -> (PhotoImage, size in bytes), oldest first
+        self._icons = {}  # (move, level) -> PhotoImage
+        self._listings = {}  # (prefix, hp) -> sorted list of png names, or None if the folder is missing
+        self._executor = None  # Created on the first prefetch
+        self._decoded = queue.Queue()  # Worker -> Tk thread handoff of decoded PIL images
+        self._pending = set()  # (prefix, hp, level) tiers and (ICONS, -1, level) icon sets the worker is still decoding
+        self._root = None  # Known once anything has been prefetched, so get() can queue builds too
+        self._on_ready = None  # set_level()'s callback, until its level is fully decoded
+        self._stood_in = set()  # (prefix, hp, level) tiers that get() answered with a stand-in
+        self.on_tier_ready = None  # Called as f(prefix, hp) on the Tk thread once such a tier has been built
+        self.prefetched = 0
+
+    def _budget_for(self, level):
+        # Scaled with the sprite area, so a larger level still keeps as many sprites as the default one
+        return round(self.base_budget_bytes * (SPRITE_LEVELS[level] / SPRITE_LEVELS[DEFAULT_LEVEL]) ** 2)
+
+    def folder_path(self, prefix, hp):
+        return os.path.join(self.image_dir, f"{prefix}_{hp}")
+
+    def list_files(self, prefix, hp):
+        key = (prefix, hp)
+        if key not in self._listings:
+            self._listings[key] = self._list_source(prefix, hp)
+        return self._listings[key]
+
+    def _list_source(self, prefix, hp):
+        if self.atlas is not None:
+            return self.atlas.list_files(prefix, hp)
+        return list_pngs(self.folder_path(prefix, hp))
+
+    def _load_source(self, prefix, hp, file, level):
+        # Safe to call from the prefetch worker: the atlas is read-only once opened
+        if self.atlas is not None and (prefix, hp, file, level) in self.atlas:
+            return self.atlas.load(prefix, hp, file, level)
+        return load_sprite(os.path.join(self.folder_path(prefix, hp), file), (SPRITE_LEVELS[level],) * 2)
+
+    def _load_icon_source(self, move, level):
+        if self.atlas is not None and self.atlas.has_icon(move, level):
+            return self.atlas.load_icon(move, level)
+        return load_icon(os.path.join(self.image_dir, f"{move}.png"), (ICON_LEVELS[level],) * 2)
+
+    def load_icon(self, move):
+        # After set_level()'s callback the worker has already decoded these, so this is a lookup
+        key = (move, self.level)
+        if key not in self._icons:
+            self._icons[key] = ImageTk.PhotoImage(self._load_icon_source(move, self.level))
+        return self._icons[key]
+
+    def is_warm(self, prefix, hp):
+        files = self._listings.get((prefix, hp), ())
+        if files is None:
+            return True  # Missing folder, nothing to load
+        return bool(files) and all((prefix, hp, file, self.level) in self._sprites for file in files)
+
+    def get(self, prefix, hp, file):
+        key = (prefix, hp, file, self.level)
+        entry = self._sprites.get(key)
+        if entry is not None:
+            self._sprites.move_to_end(key)  # Mark as most recently used
+            self.hits += 1
+            return entry[0]
+        # Rather than resample on the Tk thread, show the nearest size we have and build this one on the worker
+        for level in sorted(range(len(SPRITE_LEVELS)), key=lambda level: abs(level - self.level)):
+            entry = self._sprites.get((prefix, hp, file, level))
+            if entry is not None:
+                self.stand_ins += 1
+                self._stood_in.add((prefix, hp, self.level))
+                if self._root is not None:
+                    self.prefetch(self._root, prefix, hp)
+                return entry[0]
+        self.misses += 1
+        image = self._load_source(prefix, hp, file, self.level)
+        photo = ImageTk.PhotoImage(image)
+        self._store(key, photo, image.width * image.height * 4)
+        return photo
+
+    def set_level(self, root, level, tiers=(), on_ready=None):
+        # Switch sizes, e.g. after the window was resized. Only the new level is built: the move icons and the
+        # given (prefix, hp) tiers, on the worker. on_ready(level) runs on the Tk thread once they are all cached.
+        if level == self.level:
+            return
+        self.level = level
+        self.budget_bytes = self._budget_for(level)
+        self._evict()
+        self._on_ready = on_ready
+        for prefix, hp in tiers:
+            self.prefetch(root, prefix, hp)
+        if any((move, level) not in self._icons for move in MOVE_ICONS):
+            self._submit(root, (ICONS, -1, level), self._decode_icons, level)
+        self._check_ready()
+
+    def prefetch(self, root, prefix, hp):
+        # Decode a whole HP tier on a worker thread; only PhotoImage creation happens on the Tk thread
+        key = (prefix, hp, self.level)
+        if key in self._pending or self.is_warm(prefix, hp):
+            return
+        cached = {file for (p, h, file, level) in list(self._sprites) if (p, h, level) == key}
+        self._submit(root, key, self._decode_tier, prefix, hp, self.level, self._listings.get((prefix, hp), ()), cached)
+
+    def _submit(self, root, key, fn, *args):
+        self._root = root
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sprite-prefetch")
+        self._pending.add(key)
+        self._executor.submit(fn, *args)
+        if len(self._pending) == 1:
+            root.after(PREFETCH_POLL_MS, self._drain, root)
+
+    def _decode_tier(self, prefix, hp, level, files, cached):
+        # Runs on the worker thread: touches the disk and the resampler, never Tk or the cache itself.
+        # Always posts a result, even an empty one, or the key would stay pending and _drain would poll forever.
+        images = []
+        try:
+            if files == ():
+                files = self._list_source(prefix, hp)
+            for file in files or []:
+                if file in cached:
+                    continue
+                try:
+                    images.append((file, self._load_source(prefix, hp, file, level)))
+                except Exception as e:  # Not just OSError: PIL's DecompressionBombError, a corrupt atlas entry...
+                    print(f"Could not prefetch {file}: {e}")
+        except Exception as e:
+            print(f"Could not list {prefix}_{hp}: {e}")
+        finally:
+            self._decoded.put(((prefix, hp, level), files, images))
+
+    def _decode_icons(self, level):
+        images = []
+        try:
+            for move in MOVE_ICONS:
+                try:
+                    images.append((move, self._load_icon_source(move, level)))
+                except Exception as e:
+                    print(f"Could not load the {move} icon: {e}")
+        finally:
+            self._decoded.put(((ICONS, -1, level), None, images))
+
+    def _drain(self, root):
+        while True:
+            try:
+                key, files, images = self._decoded.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.discard(key)
+            prefix, hp, level = key
+            if prefix == ICONS:
+                for move, image in images:
+                    if (move, level) not in self._icons:
+                        self._icons[(move, level)] = ImageTk.PhotoImage(image)
+                continue
+            self._listings[(prefix, hp)] = files
+            for file, image in images:
+                if (prefix, hp, file, level) not in self._sprites:
+                    self._store((prefix, hp, file, level), ImageTk.PhotoImage(image), image.width * image.height * 4)
+                    self.prefetched += 1
+            if key in self._stood_in:
+                self._stood_in.discard(key)
+                if self.on_tier_ready is not None and level == self.level:
+                    self.on_tier_ready(prefix, hp)
+        self._check_ready()
+        if self._pending:
+            root.after(PREFETCH_POLL_MS, self._drain, root)
+
+    def _check_ready(self):
+        if self._on_ready is not None and not any(key[2] == self.level for key in self._pending):
+            on_ready, self._on_ready = self._on_ready, None
+            on_ready(self.level)
+
+    def _store(self, key, photo, size):
+        if key in self._sprites:
+            self.used_bytes -= self._sprites.pop(key)[1]
+        self._sprites[key] = (photo, size)
+        self.used_bytes += size
+        self._evict()
+
+    def _evict(self):
+        # Evict least recently used sprites, but always keep the newest one
+        while self.used_bytes > self.budget_bytes and len(self._sprites) > 1:
+            _, (_, evicted_size) = self._sprites.popitem(last=False)
+            self.used_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._sprites.clear()
+        self._icons.clear()
+        self._listings.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "prefetched": self.prefetched,
+            "stand_ins": self.stand_ins,
+            "level": self.level,
+            "entries": len(self._sprites),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+        }
@@ -0,0 +1,90 @@
+import random
+
+from engarde_engine import EngardeState, PLAYER, DRAW, HAND_SIZE, DECK, heuristic_move, lethal_moves
+
+
+def snapshot(state):
+    return (state.pos[:], [hand[:] for hand in state.hands], state.hand_size[:], list(state.deck),
+            state.deck_counts[:], state.turn, state.winner, state.hash)
+
+
+def playout(state, rng):
+    # Random legal moves until the game ends (or nobody can move)
+    moves = 0
+    while state.winner is None and state.legal_moves():
+        state.apply(rng.choice(state.legal_moves()))
+        moves += 1
+    return moves
+
+
+def test_new_game_deals_alternately():
+    state = EngardeState.new_game(random.Random(3))
+    assert state.hand_size == [HAND_SIZE, HAND_SIZE]
+    assert len(state.deck) == len(DECK) - 2 * HAND_SIZE
+    assert state.pos == [0, state.board_size - 1] and state.turn == PLAYER and state.winner is None
+
+
+def test_incremental_hash_matches_full_hash():
+    for seed in range(20):
+        rng = random.Random(seed)
+        state = EngardeState.new_game(rng)
+        while state.winner is None and state.legal_moves():
+            state.apply(rng.choice(state.legal_moves()))
+            assert state.hash == state.full_hash()
+
+
+def test_undo_restores_every_position():
+    for seed in range(20):
+        rng = random.Random(seed)
+        state = EngardeState.new_game(rng)
+        before = [snapshot(state)]
+        while state.winner is None and state.legal_moves():
+            state.apply(rng.choice(state.legal_moves()))
+            before.append(snapshot(state))
+        before.pop()
+        while state.history:
+            state.undo()
+            assert snapshot(state) == before.pop()
+
+
+def test_explicit_draws_undo_without_touching_the_deck():
+    state = EngardeState(hands=((1, 2), (3,)), deck=(4, 5))
+    start = snapshot(state)
+    state.apply(2, draw=5)  # Search branches on the drawn value instead of the deck order
+    assert state.hands[PLAYER][5] == 1 and list(state.deck) == [4, 5] and state.deck_counts[5] == 0
+    state.undo()
+    assert snapshot(state) == start
+
+
+def test_legal_moves_stay_on_the_board():
+    for seed in range(20):
+        rng = random.Random(seed)
+        state = EngardeState.new_game(rng)
+        while state.winner is None and state.legal_moves():
+            for step in state.legal_moves():
+                assert state.is_legal(step)
+                assert 0 <= state.pos[state.turn] + step < state.board_size
+            state.apply(rng.choice(state.legal_moves()))
+
+
+def test_landing_on_the_opponent_wins():
+    state = EngardeState(positions=(3, 5), hands=((2, 4), (1,)))
+    assert lethal_moves(state) == [2]
+    assert heuristic_move(state, random.Random(0)) == 2
+    state.apply(2)
+    assert state.winner == PLAYER and state.legal_moves() == []
+
+
+def test_running_out_of_cards_is_a_draw():
+    state = EngardeState(positions=(0, 10), hands=((1,), (1,)))
+    state.apply(1)
+    state.apply(-1)
+    assert state.winner == DRAW
+
+
+def test_copy_is_independent():
+    state = EngardeState.new_game(random.Random(1))
+    other = state.copy()
+    playout(other, random.Random(2))
+    assert snapshot(state) == snapshot(EngardeState.new_game(random.Random(1)))
+    assert other.hash == other.full_hash()
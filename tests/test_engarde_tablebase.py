@@ -0,0 +1,77 @@
+import itertools
+import random
+
+import pytest
+
+from engarde_engine import EngardeState, PLAYER, CPU, DRAW, CARD_VALUES
+from engarde_tablebase import Tablebase, build_tablebase, parent_score, hand_multisets, layers, WIN_SCORE
+
+BOARD = 9
+MAX_CARDS = 4
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("tb") / "small.tb")
+    build_tablebase(path, max_cards=MAX_CARDS, board_size=BOARD, workers=1, verbose=False)
+    table = Tablebase(path)
+    yield table
+    table.close()
+
+
+def minimax(state):
+    # Brute force over the engine, scored like the table: WIN_SCORE - n wins in n plies, 0 draws
+    if state.winner == DRAW:
+        return 0
+    moves = state.legal_moves()
+    if not moves:
+        return -WIN_SCORE  # Cards left but none fits on the board, same as the generator
+    best = -WIN_SCORE
+    for step in moves:
+        if state.pos[state.turn] + step == state.pos[1 - state.turn]:
+            return WIN_SCORE - 1
+        state.apply(step)
+        best = max(best, parent_score(minimax(state)))
+        state.undo()
+    return best
+
+
+def hand_values(counts):
+    return [value for value in CARD_VALUES for _ in range(counts[value])]
+
+
+def endgames():
+    # Every deck-empty position the small table covers, with the player to move
+    for a, b in layers(MAX_CARDS):
+        for mine, theirs in itertools.product(hand_multisets(a), hand_multisets(b)):
+            for me, op in itertools.permutations(range(BOARD), 2):
+                yield EngardeState(BOARD, (me, op), (hand_values(mine), hand_values(theirs)), turn=PLAYER)
+
+
+def test_table_matches_brute_force_minimax(tablebase):
+    checked = 0
+    for state in endgames():
+        assert tablebase.covers(state)
+        assert tablebase.value(state) == minimax(state), (state.pos, state.hands)
+        checked += 1
+    assert checked > 10000
+
+
+def test_best_move_achieves_the_table_value(tablebase):
+    rng = random.Random(0)
+    states = [state for state in endgames() if state.legal_moves()]
+    for state in rng.sample(states, 500):
+        value = tablebase.value(state)
+        step = tablebase.best_move(state)
+        if state.pos[PLAYER] + step == state.pos[CPU]:
+            assert value == WIN_SCORE - 1
+            continue
+        state.apply(step)
+        assert parent_score(minimax(state)) == value
+
+
+def test_positions_outside_the_table(tablebase):
+    state = EngardeState(BOARD, (0, 8), ((1, 2, 3), (1, 2)), deck=(4,))
+    assert not tablebase.covers(state) and tablebase.best_move(state) is None
+    state = EngardeState(BOARD, (0, 8), ((1, 2, 3), (1, 2)))  # Five cards, the table stops at four
+    assert tablebase.value(state) is None
@@ -0,0 +1,111 @@
+import argparse
+import random
+
+import pytest
+
+from engarde_engine import EngardeState, heuristic_move
+from replay import (GAME_RPS, GAME_ENGARDE, NEW_GAME, INPUT, CPU, RESULT, HEADER, EVENT, Replay, ReplayWriter,
+                    ScriptedPlayer, seed_arg, verify, verify_rps, verify_engarde)
+from rps_engine import MOVES, Match, get_random_move
+
+
+def record_rps(path, seed, games=3, cpu_name="random"):
+    # A LoliRPS session: the CPU draws from the seeded RNG, the player from another one
+    rng = random.Random(seed)
+    player_rng = random.Random(seed + 1)
+    writer = ReplayWriter(path, GAME_RPS, seed, cpu_name)
+    match = Match()
+    for game in range(games):
+        if game:
+            match.new_game()
+        writer.event(NEW_GAME, int(game == 0))
+        while not match.over:
+            player, cpu = get_random_move(player_rng), get_random_move(rng)
+            winner = match.play_round(player, cpu)
+            writer.event(INPUT, MOVES.index(player))
+            writer.event(CPU, MOVES.index(cpu))
+            writer.event(RESULT, winner or 0, match.winner or 0)
+        writer.flush()
+    writer.close()
+
+
+def record_engarde(path, seed):
+    rng = random.Random(seed)
+    player_rng = random.Random(seed + 1)
+    state = EngardeState.new_game(rng)
+    writer = ReplayWriter(path, GAME_ENGARDE, seed, "heuristic")
+    while state.winner is None and state.legal_moves():
+        if state.turn == 0:
+            step = player_rng.choice(state.legal_moves())
+            writer.event(INPUT, step)
+        else:
+            step = heuristic_move(state, rng)
+            writer.event(CPU, step, 0)
+        state.apply(step)
+    writer.event(RESULT, state.winner if state.winner is not None else -1)
+    writer.close()
+
+
+def test_rps_round_trip(tmp_path):
+    path = str(tmp_path / "rps.log")
+    record_rps(path, seed=2 ** 64 - 1)
+    replay = Replay(path)
+    assert (replay.game, replay.seed, replay.cpu) == (GAME_RPS, 2 ** 64 - 1, "random")
+    assert replay.inputs()[0][1:] == (NEW_GAME, 1)
+    assert verify_rps(replay) == []
+    assert verify(path)
+
+
+def test_rps_tampered_cpu_move_is_caught(tmp_path):
+    path = str(tmp_path / "rps.log")
+    record_rps(path, seed=5)
+    data = bytearray(open(path, "rb").read())
+    kind, ms, a, b = EVENT.unpack_from(data, HEADER.size + EVENT.size * 2)
+    assert kind == CPU
+    EVENT.pack_into(data, HEADER.size + EVENT.size * 2, kind, ms, (a + 1) % 3, b)
+    open(path, "wb").write(data)
+    assert verify_rps(Replay(path))
+    assert not verify(path)
+
+
+def test_adaptive_cpu_logs_are_only_checked_for_consistency(tmp_path):
+    path = str(tmp_path / "rps.log")
+    record_rps(path, seed=5, cpu_name="adaptive")  # Its moves need not follow the seeded RNG
+    assert verify_rps(Replay(path)) == []
+
+
+def test_engarde_round_trip(tmp_path):
+    for seed in range(5):
+        path = str(tmp_path / f"engarde{seed}.log")
+        record_engarde(path, seed)
+        replay = Replay(path)
+        assert replay.game == GAME_ENGARDE
+        assert verify_engarde(replay) == []
+
+
+def test_truncated_log_ends_early(tmp_path):
+    path = str(tmp_path / "rps.log")
+    record_rps(path, seed=9, games=1)
+    data = open(path, "rb").read()
+    open(path, "wb").write(data[:-3])
+    replay = Replay(path)
+    assert len(replay.events) == (len(data) - HEADER.size) // EVENT.size - 1
+
+
+def test_not_a_replay(tmp_path):
+    path = tmp_path / "bogus.log"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Replay(str(path))
+
+
+def test_scripted_player_repeats_moves():
+    player = ScriptedPlayer(iter(["rock", "paper"]))
+    assert [player.choose(), player.choose()] == ["rock", "paper"]
+
+
+def test_seed_arg():
+    assert seed_arg("0") == 0 and seed_arg(str(2 ** 64 - 1)) == 2 ** 64 - 1
+    for text in ("-1", str(2 ** 64)):
+        with pytest.raises(argparse.ArgumentTypeError):
+            seed_arg(text)
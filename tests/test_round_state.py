@@ -0,0 +1,70 @@
+import pytest
+
+from round_state import RoundMachine, BUFFER, COALESCE, DROP, IDLE, ANIMATING, GAME_OVER
+
+
+def machine(policy=BUFFER, queue_size=2):
+    started = []
+    return RoundMachine(started.append, policy, queue_size), started
+
+
+def finish(rounds, game_over=False):
+    rounds.feedback()
+    rounds.resolving()
+    rounds.done(game_over)
+
+
+def test_idle_press_starts_a_round():
+    rounds, started = machine()
+    rounds.submit("rock")
+    assert started == ["rock"] and rounds.state == ANIMATING
+    finish(rounds)
+    assert rounds.state == IDLE and rounds.stats()["consistent"]
+
+
+def test_buffer_keeps_the_newest_presses_in_order():
+    rounds, started = machine(BUFFER, 2)
+    for move in ("rock", "paper", "scissors", "rock"):
+        rounds.submit(move)
+    assert [move for move, _ in rounds.queue] == ["scissors", "rock"] and rounds.dropped == 1
+    finish(rounds)
+    finish(rounds)
+    finish(rounds)
+    assert started == ["rock", "scissors", "rock"] and rounds.state == IDLE
+    assert rounds.stats()["consistent"]
+
+
+def test_coalesce_keeps_only_the_latest_press():
+    rounds, started = machine(COALESCE, 5)
+    for move in ("rock", "paper", "scissors"):
+        rounds.submit(move)
+    finish(rounds)
+    assert started == ["rock", "scissors"] and rounds.dropped == 1
+
+
+def test_drop_ignores_presses_while_busy():
+    rounds, started = machine(DROP)
+    rounds.submit("rock")
+    rounds.submit("paper")
+    finish(rounds)
+    assert started == ["rock"] and rounds.state == IDLE and rounds.dropped == 1
+
+
+def test_game_over_discards_the_queue_until_reset():
+    rounds, started = machine()
+    rounds.submit("rock")
+    rounds.submit("paper")
+    finish(rounds, game_over=True)
+    assert rounds.state == GAME_OVER and not rounds.queue
+    rounds.submit("scissors")
+    assert started == ["rock"]
+    rounds.reset()
+    rounds.submit("scissors")
+    assert started == ["rock", "scissors"] and rounds.stats()["consistent"]
+
+
+def test_rejects_bad_configuration():
+    with pytest.raises(ValueError):
+        RoundMachine(print, "queue")
+    with pytest.raises(ValueError):
+        RoundMachine(print, BUFFER, 0)
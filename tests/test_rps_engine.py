@@ -0,0 +1,55 @@
+import pytest
+
+from rps_engine import MOVES, Match, determine_winner, music_tier, BACKGROUND, INTENSE, SUPERINTENSE, GAMEOVER
+from rps_sim import simulate, load_policy
+
+
+def test_determine_winner():
+    assert determine_winner("rock", "scissors") == 1
+    assert determine_winner("scissors", "paper") == 1
+    assert determine_winner("paper", "rock") == 1
+    assert determine_winner("rock", "paper") == 2
+    for move in MOVES:
+        assert determine_winner(move, move) is None
+
+
+def test_match_plays_to_a_winner():
+    match = Match(hp=2)
+    assert match.play_round("rock", "rock") is None
+    assert match.play_round("rock", "scissors") == 1
+    assert match.hp == [2, 1] and not match.over
+    assert match.play_round("paper", "rock") == 1
+    assert match.over and match.winner == 1
+    assert match.wins == [1, 0] and match.rounds == 3
+    with pytest.raises(ValueError):
+        match.play_round("rock", "paper")
+
+
+def test_new_game_keeps_wins():
+    match = Match(hp=1)
+    match.play_round("rock", "paper")
+    match.new_game()
+    assert match.hp == [1, 1] and match.rounds == 0 and match.wins == [0, 1]
+
+
+def test_music_tier():
+    assert music_tier(4, 4) == BACKGROUND
+    assert music_tier(1, 3) == INTENSE
+    assert music_tier(1, 1) == SUPERINTENSE
+    assert music_tier(0, 2) == GAMEOVER
+
+
+def test_simulate_uniform_is_fair():
+    stats = simulate(20000, seed=1)
+    assert stats["unfinished"] == 0
+    assert abs(stats["player_win_rate"] - 0.5) < 0.02
+    assert abs(stats["tie_rate"] - 1 / 3) < 0.01
+    assert sum(stats["length_histogram"]) == 20000
+
+
+def test_simulate_leaves_unfinished_matches_out_of_the_win_rate():
+    rock = load_policy("rock")
+    stats = simulate(100, rock, rock, seed=1, max_rounds=5)  # Rock against rock ties forever
+    assert stats["unfinished"] == 100
+    assert stats["player_win_rate"] == 0.0
+    assert simulate(0)["tie_rate"] == 0.0
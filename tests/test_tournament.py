@@ -0,0 +1,63 @@
+import pytest
+
+from tournament import Ratings, game_seed, play_shard, run_tournament, swiss_pairings
+
+
+def test_shards_are_reproducible_and_independent_of_sharding():
+    whole = play_shard("rps", "random", "cycle", 7, 1, 0, 12)
+    assert whole == play_shard("rps", "random", "cycle", 7, 1, 0, 12)
+    assert whole == play_shard("rps", "random", "cycle", 7, 1, 0, 5) + play_shard("rps", "random", "cycle", 7, 1, 5, 7)
+    engarde = play_shard("engarde", "random", "heuristic", 7, 1, 0, 6)
+    assert engarde == play_shard("engarde", "random", "heuristic", 7, 1, 0, 3) + play_shard("engarde", "random", "heuristic", 7, 1, 3, 3)
+    assert [first for _, first, _, _ in engarde] == [True, False] * 3
+
+
+def test_rematches_in_later_rounds_play_new_games():
+    assert game_seed(0, 1, "a", "b", 3) != game_seed(0, 2, "a", "b", 3)
+    assert play_shard("rps", "random", "uniform", 0, 1, 0, 20) != play_shard("rps", "random", "uniform", 0, 2, 0, 20)
+
+
+def test_swiss_avoids_rematches_and_rotates_byes():
+    names = ["a", "b", "c", "d", "e"]
+    ratings = Ratings(names)
+    points = dict.fromkeys(names, 0.0)
+    met, byes = set(), set()
+    for number in range(1, 6):
+        pairs = swiss_pairings(names, points, ratings, met, byes)
+        assert len(pairs) == 2
+        if number <= 2:  # Pairing is greedy, so only the early rounds are sure to be rematch-free
+            assert len(met) == 2 * number
+    assert byes == set(names)
+
+
+def test_swiss_falls_back_to_a_rematch():
+    names = ["a", "b"]
+    met, byes = set(), set()
+    points = dict.fromkeys(names, 0.0)
+    assert swiss_pairings(names, points, Ratings(names), met, byes) == [("a", "b")]
+    assert swiss_pairings(names, points, Ratings(names), met, byes) == [("a", "b")]
+
+
+def test_ratings_do_not_depend_on_result_order():
+    results = [(0, 1, 70, 100), (1, 2, 60, 100), (0, 2, 80, 100)]
+    forward, backward = Ratings("abc"), Ratings("abc")
+    for i, j, points, games in results:
+        forward.add(i, j, points, games)
+    for i, j, points, games in reversed(results):
+        backward.add(i, j, points, games)
+    forward.refresh(iterations=10_000, tolerance=1e-12)
+    backward.refresh(iterations=10_000, tolerance=1e-12)
+    assert [row[0] for row in forward.table()] == ["a", "b", "c"]
+    for row, other in zip(forward.table(), backward.table()):
+        assert row[0] == other[0] and row[1] == pytest.approx(other[1])
+
+
+def test_run_tournament(tmp_path):
+    output = tmp_path / "games.csv"
+    ratings, played, _ = run_tournament("rps", ["random", "cycle", "biased"], games_per_pair=10, workers=1,
+                                        output=str(output), shard_size=4, verbose=False)
+    assert played == 30
+    assert len(output.read_text().splitlines()) == 31
+    assert sum(row[3] for row in ratings.table()) == 60
+    with pytest.raises(ValueError):
+        run_tournament("rps", ["random", "cycle"], games_per_pair=10, workers=1, shard_size=0, verbose=False)
@@ -0,0 +1,331 @@
+"""Bot-vs-bot tournaments for LoliRPS and En Garde, spread over all cores.
+
+    python tournament.py rps random adaptive cycle beat-last --games 2000
+    python tournament.py engarde heuristic random policy search-d2 --swiss 6 --games 500 --output results.csv
+
+Strategies are names from RPS_STRATEGIES / ENGARDE_STRATEGIES or "module:factory" for one defined elsewhere.
+A factory takes a random.Random and returns a player: for RPS with choose() -> move and
+observe(opponent_move, own_move), for En Garde with choose(state) -> step.
+
+Every game is seeded from (--seed, the two strategies, its index), so a game's result doesn't depend on which
+worker played it or in which order, and the same command always produces the same results. Games are
+shipped to the pool in shards, each shard's rows are appended to the CSV as soon as it comes back, and the
+Elo ratings (a Bradley-Terry fit, warm-started from the previous one) are refreshed as results arrive.
+"""
+import argparse
+import csv
+import importlib
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from rps_engine import MOVES, Match, get_random_move
+from engarde_engine import EngardeState, PLAYER, CPU, DRAW
+from engarde_ai import HeuristicPlayer, SearchPlayer
+from engarde_policy import POLICY_PATH, PolicyPlayer, PolicyTable
+from rps_opponent import AdaptiveOpponent, SCRIPTED_PLAYERS
+
+SHARD_SIZE = 250  # Games per job sent to a worker
+MAX_RPS_ROUNDS = 1000  # Two deterministic bots can tie forever; call it a draw
+ELO_BASE = 1500
+ELO_SCALE = 400 / math.log(10)  # Elo points per unit of log-strength
+PRIOR_DRAWS = 1  # Virtual drawn games between every pair, so a strategy that never scores still gets a finite rating
+REPORT_EVERY_S = 2
+
+
+class RandomRps:
+    # get_random_move, as the game's CPU plays
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self):
+        return get_random_move(self.rng)
+
+    def observe(self, opponent_move, own_move):
+        pass
+
+
+class ScriptedRps:
+    # One of rps_opponent's scripted players, which look at the history of (own, opponent) move indices
+    def __init__(self, rng, play):
+        self.rng = rng
+        self.play = play
+        self.history = []
+
+    def choose(self):
+        return MOVES[self.play(self.rng, self.history)]
+
+    def observe(self, opponent_move, own_move):
+        self.history.append((MOVES.index(own_move), MOVES.index(opponent_move)))
+
+
+class RandomEngarde:
+    # Any legal card, either direction
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, state):
+        return self.rng.choice(state.legal_moves())
+
+
+_policy_path = POLICY_PATH  # Per worker process, set by _init_worker
+_policy_table = None
+
+
+def policy_player(rng):
+    global _policy_table
+    if _policy_table is None:
+        _policy_table = PolicyTable(_policy_path)
+    return PolicyPlayer(rng=rng, table=_policy_table)
+
+
+def search_player(depth):
+    # A budget it never reaches, so the result only depends on the position and the game stays reproducible
+    return lambda rng: SearchPlayer(budget_ms=600_000, max_depth=depth, tt_bits=14)
+
+
+RPS_STRATEGIES = {
+    "random": RandomRps,
+    "adaptive": AdaptiveOpponent,
+}
+RPS_STRATEGIES.update({name: (lambda play: lambda rng: ScriptedRps(rng, play))(play)
+                       for name, play in SCRIPTED_PLAYERS.items()})
+
+ENGARDE_STRATEGIES = {
+    "random": RandomEngarde,
+    "heuristic": HeuristicPlayer,  # cpu_move's rule
+    "policy": policy_player,
+    "search-d1": search_player(1),
+    "search-d2": search_player(2),
+    "search-d3": search_player(3),
+}
+
+STRATEGIES = {"rps": RPS_STRATEGIES, "engarde": ENGARDE_STRATEGIES}
+
+
+def load_strategy(game, name):
+    if name in STRATEGIES[game]:
+        return STRATEGIES[game][name]
+    module_name, _, factory_name = name.partition(":")
+    if not factory_name:
+        raise ValueError(f"Unknown {game} strategy {name!r}, expected one of {sorted(STRATEGIES[game])} or module:factory")
+    return getattr(importlib.import_module(module_name), factory_name)
+
+
+def play_rps(a, b):
+    # Score for a (1, 0.5 or 0) and the number of rounds
+    match = Match()
+    while not match.over and match.rounds < MAX_RPS_ROUNDS:
+        move_a, move_b = a.choose(), b.choose()
+        match.play_round(move_a, move_b)
+        a.observe(move_b, move_a)
+        b.observe(move_a, move_b)
+    if not match.over:
+        return 0.5, match.rounds
+    return (1.0 if match.winner == 1 else 0.0), match.rounds
+
+
+def play_engarde(a, b, rng, a_first):
+    state = EngardeState.new_game(rng)
+    players = (a, b) if a_first else (b, a)  # Indexed by side; PLAYER moves first
+    moves = 0
+    while state.winner is None:
+        state.apply(players[state.turn].choose(state))
+        moves += 1
+    if state.winner == DRAW:
+        return 0.5, moves
+    return (1.0 if state.winner == (PLAYER if a_first else CPU) else 0.0), moves
+
+
+def game_seed(seed, round_number, a, b, index):
+    # String seeds are hashed with SHA-512, so they are the same in every process and on every run. The round
+    # keeps a Swiss rematch from replaying the very same games.
+    return f"{seed}:{round_number}:{a}:{b}:{index}"
+
+
+def _init_worker(policy_path):
+    global _policy_path
+    _policy_path = policy_path
+
+
+def play_shard(game, a, b, seed, round_number, start, count):
+    # Worker: games start..start+count-1 between strategies a and b, each with fresh players and its own seed.
+    # Returns (index, a moved first, a's score, length) per game.
+    factory_a, factory_b = load_strategy(game, a), load_strategy(game, b)
+    results = []
+    for index in range(start, start + count):
+        rng = random.Random(game_seed(seed, round_number, a, b, index))
+        a_first = index % 2 == 0  # Alternate who opens
+        if game == "rps":
+            score, length = play_rps(factory_a(rng), factory_b(rng))
+        else:
+            score, length = play_engarde(factory_a(rng), factory_b(rng), rng, a_first)
+        results.append((index, a_first, score, length))
+    return results
+
+
+class Ratings:
+    """Bradley-Terry strengths fitted by minorization-maximization, reported as Elo with 95% intervals.
+
+    Results only ever add to the per-pair totals, so the fit is the same whatever order they arrived in;
+    refresh() just takes a few more iterations from wherever the last fit stopped.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        n = len(self.names)
+        self.points = [[0.0] * n for _ in range(n)]  # points[i][j]: what i scored against j
+        self.games = [[0] * n for _ in range(n)]
+        self.gamma = [1.0] * n
+
+    def add(self, i, j, points, games):
+        self.points[i][j] += points
+        self.points[j][i] += games - points
+        self.games[i][j] += games
+        self.games[j][i] += games
+
+    def refresh(self, iterations=5, tolerance=0.0):
+        n = len(self.names)
+        gamma = self.gamma
+        for _ in range(iterations):
+            change = 0.0
+            for i in range(n):
+                won = sum(self.points[i][j] + PRIOR_DRAWS / 2 for j in range(n) if j != i)
+                expected = sum((self.games[i][j] + PRIOR_DRAWS) / (gamma[i] + gamma[j]) for j in range(n) if j != i)
+                new = won / expected
+                change = max(change, abs(math.log(new / gamma[i])))
+                gamma[i] = new
+            mean = math.exp(sum(math.log(g) for g in gamma) / n)
+            self.gamma = gamma = [g / mean for g in gamma]
+            if change <= tolerance:
+                break
+
+    def table(self):
+        # (name, elo, 95% half-width, games, score) best first
+        rows = []
+        for i, name in enumerate(self.names):
+            information = 0.0
+            for j in range(len(self.names)):
+                if j != i and self.games[i][j]:
+                    p = self.gamma[i] / (self.gamma[i] + self.gamma[j])
+                    information += self.games[i][j] * p * (1 - p)
+            margin = 1.96 * ELO_SCALE / math.sqrt(information) if information else float("inf")
+            games = sum(self.games[i])
+            rows.append((name, ELO_BASE + ELO_SCALE * math.log(self.gamma[i]), margin, games,
+                         sum(self.points[i]) / games if games else 0.0))
+        return sorted(rows, key=lambda row: -row[1])
+
+
+def round_robin(names):
+    return [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+
+
+def swiss_pairings(names, points, ratings, met, byes):
+    # Neighbours in the standings play, avoiding rematches where possible; with an odd field the lowest
+    # player without a bye yet sits out
+    elo = {row[0]: row[1] for row in ratings.table()}
+    standings = sorted(names, key=lambda name: (-points[name], -elo[name], name))
+    if len(standings) % 2:
+        bye = next((name for name in reversed(standings) if name not in byes), standings[-1])
+        standings.remove(bye)
+        byes.add(bye)
+    pairs = []
+    while standings:
+        a = standings.pop(0)
+        b = next((name for name in standings if frozenset((a, name)) not in met), standings[0])
+        standings.remove(b)
+        met.add(frozenset((a, b)))
+        pairs.append((a, b))
+    return pairs
+
+
+def run_tournament(game, names, games_per_pair=1000, swiss_rounds=0, workers=None, seed=0, output=None,
+                   shard_size=SHARD_SIZE, policy_path=POLICY_PATH, verbose=True):
+    for name in names:
+        load_strategy(game, name)  # Fail on a typo before starting any workers
+    if len(set(names)) != len(names) or len(names) < 2:
+        raise ValueError("A tournament needs at least two different strategies")
+    if games_per_pair < 1 or shard_size < 1:
+        raise ValueError("games_per_pair and shard_size must be at least 1")
+    workers = workers or os.cpu_count() or 1
+    ratings = Ratings(names)
+    index = {name: i for i, name in enumerate(names)}
+    points = dict.fromkeys(names, 0.0)  # Swiss standings: match points, a share of each pairing's games
+    met, byes = set(), set()
+    out = open(output, "w", newline="") if output else None
+    writer = csv.writer(out) if out else None
+    if writer:
+        writer.writerow(["game", "round", "a", "b", "index", "a_first", "score_a", "length"])
+    played = 0
+    start = last_report = time.perf_counter()
+    total = games_per_pair * (swiss_rounds * (len(names) // 2) if swiss_rounds else len(names) * (len(names) - 1) // 2)
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(policy_path,)) as pool:
+        for round_number in range(1, max(1, swiss_rounds) + 1):
+            pairs = swiss_pairings(names, points, ratings, met, byes) if swiss_rounds else round_robin(names)
+            jobs = [(game, a, b, seed, round_number, first, min(shard_size, games_per_pair - first))
+                    for a, b in pairs for first in range(0, games_per_pair, shard_size)]
+            pair_points = {pair: 0.0 for pair in pairs}
+            for job, results in pool.imap_unordered(_play_job, jobs):
+                a, b = job[1], job[2]
+                score = sum(result[2] for result in results)
+                ratings.add(index[a], index[b], score, len(results))
+                pair_points[a, b] += score
+                played += len(results)
+                if writer:
+                    writer.writerows((game, round_number, a, b, i, int(first), s, length) for i, first, s, length in results)
+                    out.flush()
+                ratings.refresh()
+                now = time.perf_counter()
+                if verbose and now - last_report >= REPORT_EVERY_S:
+                    last_report = now
+                    leader = ratings.table()[0]
+                    print(f"  {played}/{total} games, {played / (now - start):.0f}/s, "
+                          f"leading: {leader[0]} {leader[1]:.0f} +/- {leader[2]:.0f}")
+            for (a, b), score in pair_points.items():
+                points[a] += score / games_per_pair
+                points[b] += 1 - score / games_per_pair
+            for name in set(names) - {name for pair in pairs for name in pair}:
+                points[name] += 1  # Bye
+    if out:
+        out.close()
+    ratings.refresh(iterations=10_000, tolerance=1e-10)
+    return ratings, played, time.perf_counter() - start
+
+
+def _play_job(job):
+    return job, play_shard(*job)
+
+
+def print_standings(ratings, played, elapsed, workers):
+    print(f"{played} games in {elapsed:.1f}s: {played / elapsed:.0f} games/s on {workers} worker(s)")
+    print(f"  {'strategy':<22} {'elo':>6} {'95% CI':>8} {'games':>8} {'score':>7}")
+    for name, elo, margin, games, score in ratings.table():
+        print(f"  {name:<22} {elo:6.0f} {'+/-':>3}{margin:5.0f} {games:8d} {score:7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a bot-vs-bot tournament between LoliRPS or En Garde strategies")
+    parser.add_argument("game", choices=sorted(STRATEGIES))
+    parser.add_argument("strategies", nargs="+", help="strategy names or module:factory")
+    parser.add_argument("--games", type=int, default=1000, help="games per pairing")
+    parser.add_argument("--swiss", type=int, default=0, metavar="ROUNDS", help="Swiss rounds instead of a round robin")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="games per job sent to a worker")
+    parser.add_argument("--output", metavar="CSV", help="stream every game's result to this file")
+    parser.add_argument("--policy", default=POLICY_PATH, help="policy file for the policy strategy")
+    args = parser.parse_args()
+    if args.games < 1 or args.shard_size < 1:
+        parser.error("--games and --shard-size must be at least 1")
+
+    workers = args.workers or os.cpu_count() or 1
+    ratings, played, elapsed = run_tournament(args.game, args.strategies, args.games, args.swiss, workers, args.seed,
+                                              args.output, args.shard_size, args.policy)
+    print_standings(ratings, played, elapsed, workers)
+
+
+if __name__ == "__main__":
+    main()